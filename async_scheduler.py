@@ -0,0 +1,135 @@
+import asyncio
+import queue
+import threading
+
+from task_scheduler import TaskScheduler
+
+
+class AsyncTaskScheduler:
+    """Асинхронный фасад TaskScheduler для использования из asyncio.
+
+    Все изменения выполняет отдельный поток записи. Он забирает из очереди
+    все накопившиеся запросы (до max_batch) и выполняет их в одной
+    транзакции с одним commit, поэтому много одновременных производителей
+    не ждут отдельного fsync на каждую задачу. Чтение выполняется в пуле
+    потоков asyncio через соединения для чтения DB_Connector.
+
+    async with AsyncTaskScheduler("scheduler.db") as scheduler:
+        record_id = await scheduler.add_task(...)
+    """
+
+    def __init__(self, db_file, max_batch=500):
+        self.scheduler = TaskScheduler(db_file)
+        self.max_batch = max_batch
+        self._requests = queue.Queue()
+        self._writer = threading.Thread(target=self._write_loop,
+                                        name="AsyncTaskScheduler-writer",
+                                        daemon=True)
+        self._writer.start()
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, exc_type, exc, traceback):
+        await self.close()
+
+    async def add_task(self,
+                       task_name, description,
+                       priority, status, deadline, comment):
+        """Добавляет задачу и возвращает id новой записи."""
+        return await self._write(self.scheduler.add_task,
+                                 task_name, description,
+                                 priority, status, deadline, comment)
+
+    async def update_task(self, record_id,
+                          task_name, description, priority,
+                          status, deadline, comment):
+        """Обновляет задачу и возвращает обновленную запись."""
+        return await self._write(self.scheduler.update_task, record_id,
+                                 task_name, description, priority,
+                                 status, deadline, comment)
+
+    async def delete_task(self, record_id):
+        """Удаляет задачу и возвращает Tombstone или None."""
+        return await self._write(self.scheduler.delete_task, record_id)
+
+    async def get_all_tasks(self):
+        return await asyncio.to_thread(self.scheduler.get_all_tasks)
+
+    async def get_tasks_by_params(self, **params):
+        return await asyncio.to_thread(self.scheduler.get_tasks_by_params,
+                                       **params)
+
+    async def close(self):
+        """Дожидается выполнения поставленных изменений и закрывает базу."""
+        self._requests.put(None)
+        await asyncio.to_thread(self._writer.join)
+        self.scheduler.close()
+
+    def _write(self, fn, *args):
+        """Ставит изменение в очередь потока записи и возвращает future."""
+        loop = asyncio.get_running_loop()
+        future = loop.create_future()
+        self._requests.put((fn, args, loop, future))
+        return future
+
+    def _write_loop(self):
+        """Выполняет изменения из очереди группами в общих транзакциях."""
+        stopping = False
+        while not stopping:
+            request = self._requests.get()
+            if request is None:
+                break
+            batch = [request]
+            while len(batch) < self.max_batch:
+                try:
+                    request = self._requests.get_nowait()
+                except queue.Empty:
+                    break
+                if request is None:
+                    stopping = True
+                    break
+                batch.append(request)
+            self._run_batch(batch)
+
+    def _run_batch(self, batch):
+        """Выполняет группу изменений с одним commit и отдает результаты.
+
+        Каждый запрос выполняется под своей точкой сохранения: если он
+        завершился ошибкой на середине, его изменения откатываются, а
+        изменения остальных запросов группы сохраняются.
+        """
+        outcomes = []
+        connector = self.scheduler.db_connector
+        try:
+            with self.scheduler.batch():
+                for fn, args, loop, future in batch:
+                    try:
+                        with connector.savepoint("request"):
+                            result = fn(*args)
+                    except Exception as ex:
+                        outcomes.append((loop, future, None, ex))
+                    else:
+                        outcomes.append((loop, future, result, None))
+        except Exception as ex:
+            # Не удалось зафиксировать транзакцию: ни одно изменение
+            # группы не сохранено
+            outcomes = [(loop, future, None, ex)
+                        for _, _, loop, future in batch]
+        for loop, future, result, error in outcomes:
+            try:
+                loop.call_soon_threadsafe(_resolve, future, result, error)
+            except RuntimeError:
+                # Цикл событий вызывающего уже закрыт, результат никто
+                # не ждет; поток записи продолжает работу
+                pass
+
+
+def _resolve(future, result, error):
+    """Передает результат в future, если его еще ждут."""
+    if future.done():
+        return
+    if error is not None:
+        future.set_exception(error)
+    else:
+        future.set_result(result)
@@ -0,0 +1,317 @@
+import argparse
+import json
+import os
+import platform
+import random
+import sqlite3
+import statistics
+import sys
+import tempfile
+import time
+from datetime import date, datetime, timedelta
+
+from db import COLUMNS, DB_Connector
+from task import PRIORITY_LABELS, STATUS_LABELS
+from task_scheduler import TaskScheduler
+
+# Размеры синтетических баз по умолчанию
+SIZES = [1000, 100000, 1000000]
+
+# Допустимое замедление относительно базовых замеров, доля
+THRESHOLD = 0.2
+
+# Меньшее замедление в мс не считается регрессией: разброс быстрых
+# операций сравним с их временем
+MIN_DELTA_MS = 0.5
+
+# Слова для названий, описаний и комментариев синтетических задач
+WORDS = ["отчет", "встреча", "релиз", "бюджет", "ревью", "план", "звонок",
+         "договор", "тест", "сборка", "report", "review", "deploy", "budget"]
+
+# Первый день диапазона дедлайнов синтетических задач
+FIRST_DEADLINE = date(2025, 1, 1)
+
+
+def generate_records(size, seed):
+    """Возвращает генератор size синтетических записей Scheduler.
+
+    При одинаковом seed записи совпадают, поэтому замеры на разных
+    версиях кода выполняются на одних и тех же данных.
+    """
+    rng = random.Random(seed)
+    for number in range(size):
+        deadline = FIRST_DEADLINE + timedelta(days=rng.randrange(730))
+        yield (f"{rng.choice(WORDS)} {rng.choice(WORDS)} {number}",
+               " ".join(rng.choices(WORDS, k=6)),
+               rng.choice(PRIORITY_LABELS),
+               rng.choice(STATUS_LABELS),
+               deadline.isoformat(),
+               rng.choice(WORDS) if rng.random() < 0.3 else "")
+
+
+def measure(fn, repeat, before=None):
+    """Выполняет fn repeat раз и возвращает статистику времени в мс.
+
+    before вызывается перед каждым замером и в него не входит, например
+    для сброса кэша. Для списков в результате сохраняется число строк.
+    """
+    samples = []
+    result = None
+    for _ in range(repeat):
+        if before is not None:
+            before()
+        start = time.perf_counter()
+        result = fn()
+        samples.append((time.perf_counter() - start) * 1000)
+    samples.sort()
+    metric = {
+        "ms": round(statistics.median(samples), 4),
+        "p95_ms": round(samples[round(0.95 * (len(samples) - 1))], 4),
+        "min_ms": round(samples[0], 4),
+        "n": len(samples),
+    }
+    if isinstance(result, list):
+        metric["rows"] = len(result)
+    return metric
+
+
+def bench_connector(connector, size, seed, repeat, scans):
+    """Замеряет чтение через DB_Connector на заполненной базе."""
+    results = {}
+    rng = random.Random(seed + 1)
+    ids = [rng.randint(1, size) for _ in range(repeat)]
+    sample = connector.get_record(ids[0])
+
+    results["get_record"] = measure(
+        lambda: connector.get_record(rng.choice(ids)), repeat)
+    results["get_all_records"] = measure(connector.get_all_records, scans)
+    results["get_records_page"] = measure(
+        lambda: connector.get_records_page(limit=200), repeat)
+
+    # Фильтр по значению каждой колонки и страница в порядке колонки
+    for index, column in enumerate(COLUMNS):
+        params = {column: sample[index]}
+        results[f"get_records_by_params.{column}"] = measure(
+            lambda: connector.get_records_by_params(**params), scans)
+        results[f"order_by.{column}"] = measure(
+            lambda: connector.get_records_by_params(order_by=column,
+                                                    limit=200), repeat)
+
+    # Частое слово, редкое слово (номер задачи) и префикс
+    results["search.common"] = measure(
+        lambda: connector.search(WORDS[0], limit=100), repeat)
+    results["search.rare"] = measure(
+        lambda: connector.search(str(size // 2), limit=100), repeat)
+    results["search.prefix"] = measure(
+        lambda: connector.search(WORDS[0][:2], limit=100), repeat)
+    return results
+
+
+def bench_scheduler(scheduler, repeat, scans):
+    """Замеряет чтение через TaskScheduler без кэша и из кэша."""
+    results = {}
+    cold = scheduler.invalidate_cache
+    results["scheduler.get_all_tasks"] = measure(
+        scheduler.get_all_tasks, scans, before=cold)
+    results["scheduler.get_tasks_page"] = measure(
+        lambda: scheduler.get_tasks_page(limit=200), repeat, before=cold)
+    results["scheduler.get_tasks_by_params.status"] = measure(
+        lambda: scheduler.get_tasks_by_params(status=STATUS_LABELS[1],
+                                              limit=200),
+        repeat, before=cold)
+    results["scheduler.get_tasks_by_params.cached"] = measure(
+        lambda: scheduler.get_tasks_by_params(status=STATUS_LABELS[1],
+                                              limit=200), repeat)
+    results["scheduler.search_tasks"] = measure(
+        lambda: scheduler.search_tasks(WORDS[1]), repeat, before=cold)
+    return results
+
+
+def bench_writes(connector, size, seed, repeat):
+    """Замеряет задержку добавления, изменения и удаления одной записи.
+
+    Выполняется последним, так как изменяет базу.
+    """
+    results = {}
+    rng = random.Random(seed + 2)
+    new_records = generate_records(repeat, seed + 3)
+    results["add_record"] = measure(
+        lambda: connector.add_record(*next(new_records)), repeat)
+
+    changes = generate_records(repeat, seed + 4)
+    results["update_record"] = measure(
+        lambda: connector.update_record(rng.randint(1, size),
+                                        *next(changes)), repeat)
+
+    # Каждый замер удаляет другую существующую запись
+    deleted = iter(rng.sample(range(1, size + 1), min(repeat, size)))
+    results["delete_record"] = measure(
+        lambda: connector.delete_record(next(deleted)), min(repeat, size))
+    return results
+
+
+def bench_window(directory, repeat):
+    """Замеряет MainWindow.load_tasks до показа первой страницы.
+
+    Окно работает с базой scheduler.db в directory. Возвращает None, если
+    PyQt6 не установлен.
+    """
+    try:
+        from PyQt6.QtWidgets import QApplication
+    except ImportError:
+        return None
+    import taskmanager
+
+    app = QApplication.instance() or QApplication([])
+    cwd = os.getcwd()
+    os.chdir(directory)
+    try:
+        # Перенос в архив изменил бы базу между замерами
+        window = taskmanager.MainWindow(archive=False)
+
+        def load():
+            window.load_tasks()
+            # Первая страница читается в фоновом потоке и добавляется
+            # в модель обработчиком сигнала в потоке интерфейса
+            window.runner.wait()
+            app.processEvents()
+
+        metric = measure(load, repeat,
+                         before=window.scheduler.invalidate_cache)
+        metric["rows"] = window.model.rowCount()
+        window.close()
+        return metric
+    finally:
+        os.chdir(cwd)
+
+
+def bench_size(size, workdir, seed, repeat, scans):
+    """Создает базу из size задач и выполняет на ней все замеры."""
+    directory = os.path.join(workdir, str(size))
+    os.makedirs(directory, exist_ok=True)
+    db_file = os.path.join(directory, "scheduler.db")
+    for suffix in ("", "-wal", "-shm"):
+        if os.path.exists(db_file + suffix):
+            os.remove(db_file + suffix)
+
+    connector = DB_Connector(db_file)
+    start = time.perf_counter()
+    connector.add_records(generate_records(size, seed))
+    elapsed = time.perf_counter() - start
+    results = {"add_records": {"ms": round(elapsed * 1000, 4),
+                               "rows": size,
+                               "rows_per_s": round(size / elapsed)}}
+    results.update(bench_connector(connector, size, seed, repeat, scans))
+
+    scheduler = TaskScheduler(db_file)
+    results.update(bench_scheduler(scheduler, repeat, scans))
+    scheduler.close()
+
+    window = bench_window(directory, scans)
+    results["load_tasks"] = (window if window is not None
+                             else {"skipped": "PyQt6 не установлен"})
+
+    results.update(bench_writes(connector, size, seed, repeat))
+    connector.close_connection()
+    return results
+
+
+def compare(results, baseline, threshold, min_delta=MIN_DELTA_MS):
+    """Сравнивает медианы замеров с базовыми.
+
+    Возвращает словарь "размер/замер" -> сравнение. Замедление больше
+    threshold и больше min_delta мс отмечается как регрессия.
+    """
+    comparison = {}
+    for size, metrics in results.items():
+        base_metrics = baseline.get("results", {}).get(size, {})
+        for name, metric in metrics.items():
+            base = base_metrics.get(name, {})
+            if not metric.get("ms") or not base.get("ms"):
+                continue
+            ratio = metric["ms"] / base["ms"]
+            comparison[f"{size}/{name}"] = {
+                "ms": metric["ms"],
+                "baseline_ms": base["ms"],
+                "ratio": round(ratio, 3),
+                "regression": (ratio > 1 + threshold
+                               and metric["ms"] - base["ms"] > min_delta),
+            }
+    return comparison
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(
+        description="Замеры производительности DB_Connector, TaskScheduler "
+                    "и загрузки таблицы MainWindow на синтетических базах.")
+    parser.add_argument("--sizes", type=int, nargs="+", default=SIZES,
+                        help="число задач в базах (по умолчанию %(default)s)")
+    parser.add_argument("--repeat", type=int, default=20,
+                        help="повторов быстрых операций")
+    parser.add_argument("--scans", type=int, default=3,
+                        help="повторов чтения всей таблицы и загрузки окна")
+    parser.add_argument("--seed", type=int, default=42,
+                        help="начальное значение генератора данных")
+    parser.add_argument("--workdir",
+                        help="каталог для баз (по умолчанию временный)")
+    parser.add_argument("--output", help="файл для результатов JSON")
+    parser.add_argument("--baseline",
+                        help="JSON предыдущего запуска для сравнения")
+    parser.add_argument("--threshold", type=float, default=THRESHOLD,
+                        help="допустимое замедление, доля "
+                             "(по умолчанию %(default)s)")
+    parser.add_argument("--min-delta", type=float, default=MIN_DELTA_MS,
+                        help="меньшее замедление в мс не считается "
+                             "регрессией (по умолчанию %(default)s)")
+    return parser.parse_args(argv)
+
+
+def main(argv=None):
+    """Выполняет замеры и возвращает 1, если найдены регрессии."""
+    args = parse_args(argv)
+    # Окно создается без дисплея
+    os.environ.setdefault("QT_QPA_PLATFORM", "offscreen")
+
+    report = {
+        "meta": {
+            "created": datetime.now().isoformat(" ", "seconds"),
+            "python": platform.python_version(),
+            "sqlite": sqlite3.sqlite_version,
+            "platform": platform.platform(),
+            "seed": args.seed,
+            "repeat": args.repeat,
+            "scans": args.scans,
+        },
+        "results": {},
+    }
+    with tempfile.TemporaryDirectory() as tmpdir:
+        workdir = args.workdir or tmpdir
+        for size in args.sizes:
+            print(f"Замеры на {size} задачах...", file=sys.stderr)
+            report["results"][str(size)] = bench_size(
+                size, workdir, args.seed, args.repeat, args.scans)
+
+    regressions = []
+    if args.baseline:
+        with open(args.baseline, encoding="utf-8") as file:
+            baseline = json.load(file)
+        report["comparison"] = compare(report["results"], baseline,
+                                       args.threshold, args.min_delta)
+        regressions = [name for name, item in report["comparison"].items()
+                       if item["regression"]]
+        for name in regressions:
+            item = report["comparison"][name]
+            print(f"Регрессия {name}: {item['baseline_ms']} мс -> "
+                  f"{item['ms']} мс (x{item['ratio']})", file=sys.stderr)
+
+    text = json.dumps(report, ensure_ascii=False, indent=2)
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as file:
+            file.write(text + "\n")
+    else:
+        print(text)
+    return 1 if regressions else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,361 @@
+import argparse
+import logging
+import os
+import sys
+from datetime import date
+
+from recurrence import FREQUENCIES
+from task import PRIORITY_LABELS, STATUS_LABELS
+
+# База по умолчанию - та же, что у окна taskmanager.py
+DB_FILE = "scheduler.db"
+
+# Форматы вывода списка задач: таблица для чтения, csv и jsonl для
+# других программ
+OUTPUT_FORMATS = ["table", "csv", "jsonl"]
+
+# Поля, по которым база сортирует по индексу (db.SORT_COLUMNS),
+# перечислены здесь, чтобы разбор аргументов не загружал модули работы с
+# базой
+SORT_COLUMNS = ["id", "task_name", "priority", "status", "deadline",
+                "created"]
+
+# Сколько задач читать из базы за один запрос при выводе списка
+PAGE_SIZE = 500
+
+
+def _date(value):
+    """Проверяет дату ГГГГ-ММ-ДД из аргумента командной строки."""
+    try:
+        return date.fromisoformat(value)
+    except ValueError:
+        raise argparse.ArgumentTypeError(
+            f"некорректная дата '{value}', нужен формат ГГГГ-ММ-ДД")
+
+
+def _add_filters(parser):
+    """Добавляет аргументы фильтра и сортировки задач."""
+    parser.add_argument("-s", "--status", choices=STATUS_LABELS)
+    parser.add_argument("-p", "--priority", choices=PRIORITY_LABELS)
+    parser.add_argument("--from", dest="deadline_from", type=_date,
+                        help="дедлайн не раньше даты")
+    parser.add_argument("--to", dest="deadline_to", type=_date,
+                        help="дедлайн не позже даты")
+    parser.add_argument("--order-by", default="deadline",
+                        choices=SORT_COLUMNS,
+                        help="поле сортировки (по умолчанию %(default)s)")
+    parser.add_argument("--desc", action="store_true",
+                        help="сортировка по убыванию")
+
+
+def _status_key(item):
+    """Ключ строки сводки: статусы по порядку STATUS_LABELS, затем прочие."""
+    label = "" if item[0] is None else str(item[0])
+    if label in STATUS_LABELS:
+        return (STATUS_LABELS.index(label), "")
+    return (len(STATUS_LABELS), label)
+
+
+def _filter_params(args):
+    """Возвращает параметры get_tasks_by_params по аргументам фильтра."""
+    params = {"order_by": args.order_by, "descending": args.desc}
+    if args.status:
+        params["status"] = args.status
+    if args.priority:
+        params["priority"] = args.priority
+    if args.deadline_from:
+        params["deadline__ge"] = args.deadline_from
+    if args.deadline_to:
+        params["deadline__le"] = args.deadline_to
+    return params
+
+
+def _write_tasks(tasks, fmt, stream):
+    """Выводит задачи в stream. Возвращает число задач."""
+    from task import to_db
+
+    if fmt != "table":
+        from task_io import write_records
+        return write_records(stream, (tuple(map(to_db, task))
+                                      for task in tasks), fmt)
+    count = 0
+    for task in tasks:
+        stream.write("\t".join(
+            str(to_db(value) or "") for value in (
+                task.id, task.status, task.priority, task.deadline,
+                task.task_name, task.description, task.comment)) + "\n")
+        count += 1
+    return count
+
+
+def cmd_add(scheduler, args):
+    """Добавляет задачу и выводит ее id."""
+    fields = (args.name, args.description, args.priority, args.status,
+              args.deadline, args.comment)
+    if args.repeat:
+        record_id = scheduler.add_recurring_task(
+            *fields, args.repeat, args.interval, args.until)
+    else:
+        record_id = scheduler.add_task(*fields)
+    print(record_id)
+    return 0
+
+
+def cmd_list(scheduler, args):
+    """Выводит задачи по фильтру постранично, не загружая их все в память.
+
+    Страницы читаются через get_tasks_by_params по ключу (значение поля
+    сортировки, id), поэтому в списке есть и вхождения повторяющихся
+    задач.
+    """
+    params = _filter_params(args)
+    if args.archive:
+        if args.limit is not None:
+            params["limit"] = args.limit
+        _write_tasks(scheduler.get_archived_tasks(**params), args.format,
+                     sys.stdout)
+        return 0
+    _write_tasks(_pages(scheduler, params, args.limit), args.format,
+                 sys.stdout)
+    return 0
+
+
+def _pages(scheduler, params, limit=None, page_size=PAGE_SIZE):
+    """Отдает задачи get_tasks_by_params страницами, не больше limit."""
+    order_by = params["order_by"]
+    after = None
+    while limit is None or limit > 0:
+        size = page_size if limit is None else min(page_size, limit)
+        page = scheduler.get_tasks_by_params(after=after, limit=size,
+                                             **params)
+        yield from page
+        if len(page) < size:
+            return
+        if limit is not None:
+            limit -= len(page)
+        after = (getattr(page[-1], order_by), page[-1].id)
+
+
+def cmd_search(scheduler, args):
+    """Выводит задачи, найденные по тексту, по релевантности."""
+    if args.archive:
+        tasks = scheduler.search_archive(args.text, args.limit)
+    else:
+        tasks = scheduler.get_tasks_by_ids(
+            scheduler.search_tasks(args.text, args.limit))
+    _write_tasks(tasks, args.format, sys.stdout)
+    return 0
+
+
+def cmd_update(scheduler, args):
+    """Меняет указанные поля задачи, остальные оставляет как есть."""
+    task = scheduler.get_task(args.id)
+    if task is None:
+        print(f"Задача {args.id} не найдена", file=sys.stderr)
+        return 1
+    changes = {field: getattr(args, field)
+               for field in ("task_name", "description", "priority",
+                             "status", "deadline", "comment")
+               if getattr(args, field) is not None}
+    task = task._replace(**changes)
+    updated = scheduler.update_task(task.id, *task[1:7])
+    _write_tasks([updated], "table", sys.stdout)
+    return 0
+
+
+def cmd_delete(scheduler, args):
+    """Удаляет задачи по id. Возвращает 1, если какой-то задачи нет."""
+    record_ids = list(dict.fromkeys(args.ids))
+    count = scheduler.delete_tasks(record_ids)
+    print(f"Удалено задач: {count}", file=sys.stderr)
+    if count < len(record_ids):
+        print(f"Не найдено задач: {len(record_ids) - count}",
+              file=sys.stderr)
+        return 1
+    return 0
+
+
+def cmd_import(scheduler, args):
+    """Загружает задачи из CSV или JSONL ("-" - стандартный ввод)."""
+    from task_io import ProgressPrinter
+
+    source = sys.stdin if args.file == "-" else args.file
+    progress = None if args.quiet else ProgressPrinter("Загрузка")
+    try:
+        count = scheduler.import_tasks(source, args.format, args.chunk_size,
+                                       not args.keep_indexes, progress)
+    finally:
+        if progress is not None:
+            progress.close()
+    print(f"Загружено задач: {count}", file=sys.stderr)
+    return 0
+
+
+def cmd_export(scheduler, args):
+    """Выгружает задачи в CSV или JSONL ("-" - стандартный вывод)."""
+    from task_io import ProgressPrinter
+
+    target = sys.stdout if args.file == "-" else args.file
+    progress = None if args.quiet else ProgressPrinter("Выгрузка")
+    try:
+        count = scheduler.export_tasks(target, args.format,
+                                       on_progress=progress,
+                                       **_filter_params(args))
+    finally:
+        if progress is not None:
+            progress.close()
+    print(f"Выгружено задач: {count}", file=sys.stderr)
+    return 0
+
+
+def cmd_stats(scheduler, args):
+    """Выводит сводку по задачам."""
+    stats = scheduler.stats()
+    print(f"Всего\t{stats.total}")
+    for status, count in sorted(stats.by_status.items(), key=_status_key):
+        print(f"{status}\t{count}")
+    print(f"Просрочено\t{stats.overdue}")
+    print(f"Сегодня\t{stats.due_today}")
+    print(f"На неделе\t{stats.due_week}")
+    return 0
+
+
+def cmd_archive(scheduler, args):
+    """Переносит старые завершенные задачи в архив."""
+    count = scheduler.archive_tasks(args.days, limit=args.limit)
+    print(f"Перенесено в архив задач: {count}", file=sys.stderr)
+    return 0
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(
+        description="Работа с задачами из командной строки, без окна.")
+    parser.add_argument("--db", default=DB_FILE,
+                        help="файл базы (по умолчанию %(default)s)")
+    parser.add_argument("-v", "--verbose", action="store_true",
+                        help="выводить журнал работы с базой")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    add = commands.add_parser("add", help="добавить задачу")
+    add.add_argument("name")
+    add.add_argument("-d", "--description", default="")
+    add.add_argument("-p", "--priority", choices=PRIORITY_LABELS,
+                     default=PRIORITY_LABELS[0])
+    add.add_argument("-s", "--status", choices=STATUS_LABELS,
+                     default=STATUS_LABELS[0])
+    add.add_argument("--deadline", type=_date)
+    add.add_argument("-c", "--comment", default="")
+    add.add_argument("--repeat", choices=FREQUENCIES,
+                     help="повторять задачу с дедлайна")
+    add.add_argument("--interval", type=int, default=1,
+                     help="повторять каждые N дней, недель или месяцев")
+    add.add_argument("--until", type=_date, help="последняя дата повторов")
+    add.set_defaults(handler=cmd_add)
+
+    listing = commands.add_parser("list", aliases=["filter"],
+                                  help="вывести задачи по фильтру")
+    _add_filters(listing)
+    listing.add_argument("-n", "--limit", type=int)
+    listing.add_argument("-f", "--format", choices=OUTPUT_FORMATS,
+                         default="table")
+    listing.add_argument("--archive", action="store_true",
+                         help="задачи из архива")
+    listing.set_defaults(handler=cmd_list)
+
+    search = commands.add_parser("search", help="найти задачи по тексту")
+    search.add_argument("text")
+    search.add_argument("-n", "--limit", type=int, default=100)
+    search.add_argument("-f", "--format", choices=OUTPUT_FORMATS,
+                        default="table")
+    search.add_argument("--archive", action="store_true",
+                        help="искать в архиве")
+    search.set_defaults(handler=cmd_search)
+
+    update = commands.add_parser("update", help="изменить поля задачи")
+    update.add_argument("id", type=int)
+    update.add_argument("--name", dest="task_name")
+    update.add_argument("-d", "--description")
+    update.add_argument("-p", "--priority", choices=PRIORITY_LABELS)
+    update.add_argument("-s", "--status", choices=STATUS_LABELS)
+    update.add_argument("--deadline", type=_date)
+    update.add_argument("-c", "--comment")
+    update.set_defaults(handler=cmd_update)
+
+    delete = commands.add_parser("delete", help="удалить задачи")
+    delete.add_argument("ids", type=int, nargs="+")
+    delete.set_defaults(handler=cmd_delete)
+
+    load = commands.add_parser("import",
+                               help="загрузить задачи из CSV или JSONL")
+    load.add_argument("file", help='файл или "-"')
+    load.add_argument("-f", "--format", choices=["csv", "jsonl"],
+                      help="по умолчанию по расширению файла")
+    load.add_argument("--chunk-size", type=int, default=5000)
+    load.add_argument("--keep-indexes", action="store_true",
+                      help="не перестраивать индексы после загрузки")
+    load.add_argument("-q", "--quiet", action="store_true")
+    load.set_defaults(handler=cmd_import)
+
+    export = commands.add_parser("export",
+                                 help="выгрузить задачи в CSV или JSONL")
+    export.add_argument("file", help='файл или "-"')
+    _add_filters(export)
+    export.add_argument("-f", "--format", choices=["csv", "jsonl"],
+                        help="по умолчанию по расширению файла")
+    export.add_argument("-q", "--quiet", action="store_true")
+    export.set_defaults(handler=cmd_export)
+
+    stats = commands.add_parser("stats", help="сводка по задачам")
+    stats.set_defaults(handler=cmd_stats)
+
+    archive = commands.add_parser(
+        "archive", help="перенести старые завершенные задачи в архив")
+    archive.add_argument("--days", type=int, default=90,
+                         help="старше скольких дней (по умолчанию "
+                              "%(default)s)")
+    archive.add_argument("-n", "--limit", type=int)
+    archive.set_defaults(handler=cmd_archive)
+
+    args = parser.parse_args(argv)
+    if args.command == "add" and args.repeat and args.deadline is None:
+        # Дедлайн - начало серии, без него повторов не будет
+        add.error("для --repeat нужен --deadline")
+    return args
+
+
+def main(argv=None):
+    """Выполняет команду и возвращает код завершения.
+
+    Модули работы с базой загружаются только здесь, после разбора
+    аргументов, поэтому --help и ошибки в аргументах не тратят на них
+    время. PyQt не загружается вовсе.
+    """
+    args = parse_args(argv)
+    if args.verbose:
+        from logging_setup import setup_logging
+        setup_logging(logging.DEBUG)
+
+    import sqlite3
+    from task_scheduler import TaskScheduler
+
+    try:
+        scheduler = TaskScheduler(args.db)
+    except sqlite3.Error as ex:
+        print(f"Ошибка базы данных: {ex}", file=sys.stderr)
+        return 1
+    try:
+        return args.handler(scheduler, args)
+    except BrokenPipeError:
+        # Читатель вывода завершился раньше, например head. Остаток
+        # вывода отбрасывается, чтобы интерпретатор не сообщал об ошибке
+        os.dup2(os.open(os.devnull, os.O_WRONLY), sys.stdout.fileno())
+        return 1
+    except (ValueError, OSError, sqlite3.Error) as ex:
+        print(f"Ошибка: {ex}", file=sys.stderr)
+        return 1
+    finally:
+        scheduler.close()
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -1,131 +1,1386 @@
-import sqlite3
-from sqlite3 import Error
-
-
-class DB_Connector:
-    def __init__(self, db_file):
-        """Инициализация подключения к базе данных."""
-        self.connection = self.create_connection(db_file)
-        self.create_table()
-
-    def create_connection(self, db_file):
-        """Создает соединение с указанной базой данных SQLite."""
-        self.conn = None
-        try:
-            self.conn = sqlite3.connect(db_file)
-        except Error as e:
-            print(f"Ошибка '{e}' произошла при подключении к БД.")
-        return self.conn
-
-    def create_table(self):
-        """Создает таблицу Scheduler, если она не существует."""
-        create_table_sql = """
-        CREATE TABLE IF NOT EXISTS Scheduler (
-            id INTEGER PRIMARY KEY AUTOINCREMENT,
-            task_name TEXT NOT NULL,
-            description TEXT,
-            priority TEXT,
-            status TEXT,
-            deadline TEXT,
-            comment TEXT,
-            created TIMESTAMP DEFAULT CURRENT_TIMESTAMP
-        );
-        """
-        try:
-            self.cursor = self.connection.cursor()
-            self.cursor.execute(create_table_sql)
-
-        except Error as ex:
-            print(f"Ошибка '{ex}' произошла при создании таблицы.")
-
-    def add_record(self,
-                   task_name,
-                   description, priority, status, deadline, comment):
-        """Добавляет запись в таблицу Scheduler."""
-        sql = """INSERT INTO Scheduler (
-            task_name, description, priority, status, deadline, comment
-            )
-                 VALUES (?, ?, ?, ?, ?, ?)"""
-        try:
-            self.cursor = self.connection.cursor()
-            self.cursor.execute(sql, (
-                task_name, description, priority, status, deadline, comment
-                ))
-            self.connection.commit()
-            print("Запись успешно добавлена.")
-        except Error as ex:
-            print(f"Ошибка '{ex}' произошла при добавлении записи.")
-
-    def delete_record(self, record_id):
-        """Удаляет запись из таблицы Scheduler по id."""
-        sql = """DELETE FROM Scheduler WHERE id = ?"""
-        try:
-            self.cursor = self.connection.cursor()
-            self.cursor.execute(sql, (record_id,))
-            self.connection.commit()
-            print("Запись успешно удалена.")
-        except Error as ex:
-            print(f"Ошибка '{ex}' произошла при удалении записи.")
-
-    def update_record(self, record_id,
-                      task_name, description, priority, status,
-                      deadline, comment):
-        """Обновляет запись в таблице Scheduler."""
-        sql = """UPDATE Scheduler
-                 SET task_name = ?, description = ?, priority = ?, status = ?,
-                 deadline = ?, comment = ?
-                 WHERE id = ?"""
-        try:
-            self.cursor = self.connection.cursor()
-            self.cursor.execute(sql, (
-                task_name, description,
-                priority, status, deadline, comment, record_id
-                ))
-            self.connection.commit()
-            print("Запись успешно обновлена.")
-        except Error as ex:
-            print(f"Ошибка '{ex}' произошла при обновлении записи.")
-
-    def get_all_records(self):
-        """Возвращает все записи из таблицы Scheduler."""
-        sql = """SELECT * FROM Scheduler ORDER BY deadline"""
-        try:
-            self.cursor = self.connection.cursor()
-            self.cursor.execute(sql)
-            records = self.cursor.fetchall()
-            return records
-        except Error as ex:
-            print(f"Ошибка '{ex}' произошла при получении всех записей.")
-            return []
-
-    def get_records_by_params(self, **params):
-        """Возвращает записи из таблицы Scheduler по указанным параметрам."""
-        query = "SELECT * FROM Scheduler WHERE "
-        conditions = []
-        values = []
-
-        for key, value in params.items():
-            conditions.append(f"{key} = ?")
-            values.append(value)
-
-        query += " AND ".join(conditions)
-
-        try:
-            self.cursor = self.connection.cursor()
-            self.cursor.execute(query, values)
-            records = self.cursor.fetchall()
-            return records
-        except Error as e:
-            print(f"Ошибка '{e}' произошла при получении записей.")
-            return []
-
-    def close_connection(self):
-        """Закрывает соединение с базой данных."""
-        if self.connection:
-            self.connection.close()
-            print("Соединение с базой данных закрыто.")
-
-
-if __name__ == '__main__':
-    connector = DB_Connector('TaskManager.db')
-    connector.create_connection('TaskManager.db')
+import logging
+import random
+import sqlite3
+import threading
+import time
+from collections import namedtuple
+from contextlib import contextmanager
+from itertools import islice
+from sqlite3 import Error
+
+from instrumentation import NullInstrumentation
+
+logger = logging.getLogger(__name__)
+
+# Текстовые поля, по которым работает полнотекстовый поиск
+SEARCH_COLUMNS = "task_name, description, priority, status, deadline, comment"
+
+
+# Поля таблицы Scheduler, по которым разрешены фильтры и сортировка
+COLUMNS = ("id", "task_name", "description", "priority",
+           "status", "deadline", "comment", "created")
+
+# Поля, сортировка по которым идет по индексу (миграции 1, 3 и 8): страница
+# по ключу (значение, id) читается без сортировки всей таблицы
+SORT_COLUMNS = ("id", "task_name", "priority", "status", "deadline",
+                "created")
+
+# Операторы фильтра: суффикс имени параметра -> оператор SQL
+OPERATORS = {
+    "eq": "=", "ne": "!=",
+    "lt": "<", "le": "<=", "gt": ">", "ge": ">=",
+    "in": "IN",
+}
+
+# Миграции схемы. Номер примененной миграции хранится в PRAGMA user_version
+MIGRATIONS = [
+    # 1: индексы для сортировки по дедлайну и частых фильтров
+    """
+    CREATE INDEX IF NOT EXISTS Scheduler_deadline
+        ON Scheduler (deadline);
+    CREATE INDEX IF NOT EXISTS Scheduler_status_deadline
+        ON Scheduler (status, deadline);
+    CREATE INDEX IF NOT EXISTS Scheduler_priority_deadline
+        ON Scheduler (priority, deadline);
+    """,
+    # 2: журнал изменений для синхронизации нескольких окон и процессов
+    """
+    CREATE TABLE IF NOT EXISTS Scheduler_changes (
+        version INTEGER PRIMARY KEY AUTOINCREMENT,
+        task_id INTEGER NOT NULL,
+        operation TEXT NOT NULL
+    );
+    CREATE TRIGGER IF NOT EXISTS Scheduler_changes_insert
+    AFTER INSERT ON Scheduler BEGIN
+        INSERT INTO Scheduler_changes (task_id, operation)
+        VALUES (new.id, 'insert');
+    END;
+    CREATE TRIGGER IF NOT EXISTS Scheduler_changes_update
+    AFTER UPDATE ON Scheduler BEGIN
+        INSERT INTO Scheduler_changes (task_id, operation)
+        VALUES (new.id, 'update');
+    END;
+    CREATE TRIGGER IF NOT EXISTS Scheduler_changes_delete
+    AFTER DELETE ON Scheduler BEGIN
+        INSERT INTO Scheduler_changes (task_id, operation)
+        VALUES (old.id, 'delete');
+    END;
+    """,
+    # 3: индекс для сортировки таблицы по имени задачи
+    """
+    CREATE INDEX IF NOT EXISTS Scheduler_task_name
+        ON Scheduler (task_name);
+    """,
+    # 4: зависимости задач: task_id нельзя начать до завершения depends_on
+    """
+    CREATE TABLE IF NOT EXISTS Scheduler_dependencies (
+        task_id INTEGER NOT NULL,
+        depends_on INTEGER NOT NULL,
+        PRIMARY KEY (task_id, depends_on)
+    ) WITHOUT ROWID;
+    CREATE INDEX IF NOT EXISTS Scheduler_dependencies_depends_on
+        ON Scheduler_dependencies (depends_on, task_id);
+    CREATE TRIGGER IF NOT EXISTS Scheduler_dependencies_delete
+    AFTER DELETE ON Scheduler BEGIN
+        DELETE FROM Scheduler_dependencies
+        WHERE task_id = old.id OR depends_on = old.id;
+    END;
+    """,
+    # 5: повторяющиеся задачи. Правило хранится один раз для серии, ее
+    # вхождения создаются при чтении (см. модуль recurrence). В
+    # Scheduler_occurrences - даты вхождений, замененных отдельной
+    # задачей task_id или удаленных (task_id NULL)
+    """
+    CREATE TABLE IF NOT EXISTS Scheduler_recurrence (
+        task_id INTEGER PRIMARY KEY,
+        frequency TEXT NOT NULL,
+        interval INTEGER NOT NULL DEFAULT 1,
+        until TEXT
+    );
+    CREATE TABLE IF NOT EXISTS Scheduler_occurrences (
+        series_id INTEGER NOT NULL,
+        occurrence TEXT NOT NULL,
+        task_id INTEGER,
+        PRIMARY KEY (series_id, occurrence)
+    ) WITHOUT ROWID;
+    CREATE INDEX IF NOT EXISTS Scheduler_occurrences_task_id
+        ON Scheduler_occurrences (task_id);
+    CREATE TRIGGER IF NOT EXISTS Scheduler_recurrence_delete
+    AFTER DELETE ON Scheduler BEGIN
+        DELETE FROM Scheduler_recurrence WHERE task_id = old.id;
+        DELETE FROM Scheduler_occurrences WHERE series_id = old.id;
+        UPDATE Scheduler_occurrences SET task_id = NULL
+        WHERE task_id = old.id;
+    END;
+    -- Вхождение исчезает из таблиц других окон как удаленная задача с
+    -- ИД recurrence.occurrence_id: сдвиг равен recurrence._DAY_BITS
+    CREATE TRIGGER IF NOT EXISTS Scheduler_occurrences_changes
+    AFTER INSERT ON Scheduler_occurrences BEGIN
+        INSERT INTO Scheduler_changes (task_id, operation)
+        VALUES (-((new.series_id << 22)
+                  | (CAST(julianday(new.occurrence)
+                          - julianday('0001-01-01') AS INTEGER) + 1)),
+                'delete');
+    END;
+    """,
+    # 6: счетчики задач по (статус, приоритет, дедлайн) для сводки.
+    # Дедлайн - день, поэтому строк не больше, чем разных дней дедлайнов,
+    # сколько бы ни было задач. NULL хранится пустой строкой
+    """
+    CREATE TABLE IF NOT EXISTS Scheduler_summary (
+        status TEXT NOT NULL,
+        priority TEXT NOT NULL,
+        deadline TEXT NOT NULL,
+        count INTEGER NOT NULL,
+        PRIMARY KEY (status, priority, deadline)
+    ) WITHOUT ROWID;
+    DELETE FROM Scheduler_summary;
+    INSERT INTO Scheduler_summary (status, priority, deadline, count)
+    SELECT IFNULL(status, ''), IFNULL(priority, ''), IFNULL(deadline, ''),
+           COUNT(*)
+    FROM Scheduler GROUP BY 1, 2, 3;
+    CREATE TRIGGER IF NOT EXISTS Scheduler_summary_insert
+    AFTER INSERT ON Scheduler BEGIN
+        INSERT INTO Scheduler_summary (status, priority, deadline, count)
+        VALUES (IFNULL(new.status, ''), IFNULL(new.priority, ''),
+                IFNULL(new.deadline, ''), 1)
+        ON CONFLICT (status, priority, deadline)
+        DO UPDATE SET count = count + 1;
+    END;
+    CREATE TRIGGER IF NOT EXISTS Scheduler_summary_delete
+    AFTER DELETE ON Scheduler BEGIN
+        UPDATE Scheduler_summary SET count = count - 1
+        WHERE status = IFNULL(old.status, '')
+        AND priority = IFNULL(old.priority, '')
+        AND deadline = IFNULL(old.deadline, '');
+        DELETE FROM Scheduler_summary
+        WHERE status = IFNULL(old.status, '')
+        AND priority = IFNULL(old.priority, '')
+        AND deadline = IFNULL(old.deadline, '') AND count <= 0;
+    END;
+    CREATE TRIGGER IF NOT EXISTS Scheduler_summary_update
+    AFTER UPDATE OF status, priority, deadline ON Scheduler
+    WHEN old.status IS NOT new.status OR old.priority IS NOT new.priority
+        OR old.deadline IS NOT new.deadline
+    BEGIN
+        UPDATE Scheduler_summary SET count = count - 1
+        WHERE status = IFNULL(old.status, '')
+        AND priority = IFNULL(old.priority, '')
+        AND deadline = IFNULL(old.deadline, '');
+        DELETE FROM Scheduler_summary
+        WHERE status = IFNULL(old.status, '')
+        AND priority = IFNULL(old.priority, '')
+        AND deadline = IFNULL(old.deadline, '') AND count <= 0;
+        INSERT INTO Scheduler_summary (status, priority, deadline, count)
+        VALUES (IFNULL(new.status, ''), IFNULL(new.priority, ''),
+                IFNULL(new.deadline, ''), 1)
+        ON CONFLICT (status, priority, deadline)
+        DO UPDATE SET count = count + 1;
+    END;
+    """,
+    # 7: архив завершенных задач. Задачи переносятся из Scheduler с
+    # прежними id (AUTOINCREMENT не выдаст их новым задачам), archived -
+    # время переноса. Поиск по архиву - отдельный индекс FTS5
+    f"""
+    CREATE TABLE IF NOT EXISTS Scheduler_archive (
+        id INTEGER PRIMARY KEY,
+        task_name TEXT NOT NULL,
+        description TEXT,
+        priority TEXT,
+        status TEXT,
+        deadline TEXT,
+        comment TEXT,
+        created TIMESTAMP,
+        archived TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+    );
+    CREATE INDEX IF NOT EXISTS Scheduler_archive_deadline
+        ON Scheduler_archive (deadline);
+    CREATE VIRTUAL TABLE IF NOT EXISTS Scheduler_archive_fts USING fts5(
+        {SEARCH_COLUMNS},
+        content='Scheduler_archive', content_rowid='id'
+    );
+    CREATE TRIGGER IF NOT EXISTS Scheduler_archive_fts_insert
+    AFTER INSERT ON Scheduler_archive BEGIN
+        INSERT INTO Scheduler_archive_fts (rowid, {SEARCH_COLUMNS})
+        VALUES (new.id, new.task_name, new.description, new.priority,
+                new.status, new.deadline, new.comment);
+    END;
+    CREATE TRIGGER IF NOT EXISTS Scheduler_archive_fts_delete
+    AFTER DELETE ON Scheduler_archive BEGIN
+        INSERT INTO Scheduler_archive_fts
+            (Scheduler_archive_fts, rowid, {SEARCH_COLUMNS})
+        VALUES ('delete', old.id, old.task_name, old.description,
+                old.priority, old.status, old.deadline, old.comment);
+    END;
+    """,
+    # 8: индексы для сортировки по остальным полям SORT_COLUMNS. Индекс
+    # по одному полю упорядочен по (поле, id), как ключ страницы
+    """
+    CREATE INDEX IF NOT EXISTS Scheduler_status
+        ON Scheduler (status);
+    CREATE INDEX IF NOT EXISTS Scheduler_priority
+        ON Scheduler (priority);
+    CREATE INDEX IF NOT EXISTS Scheduler_created
+        ON Scheduler (created);
+    CREATE INDEX IF NOT EXISTS Scheduler_archive_task_name
+        ON Scheduler_archive (task_name);
+    CREATE INDEX IF NOT EXISTS Scheduler_archive_status
+        ON Scheduler_archive (status);
+    CREATE INDEX IF NOT EXISTS Scheduler_archive_priority
+        ON Scheduler_archive (priority);
+    CREATE INDEX IF NOT EXISTS Scheduler_archive_created
+        ON Scheduler_archive (created);
+    """,
+]
+
+
+# Триггеры вставки, которые import_records отключает на время загрузки:
+# имя триггера -> запрос, выполняющий его работу для всех записей с
+# id > ? одним проходом
+BULK_INSERT_TRIGGERS = {
+    "Scheduler_fts_insert": f"""
+        INSERT INTO Scheduler_fts (rowid, {SEARCH_COLUMNS})
+        SELECT id, {SEARCH_COLUMNS} FROM Scheduler WHERE id > ?
+    """,
+    "Scheduler_changes_insert": """
+        INSERT INTO Scheduler_changes (task_id, operation)
+        SELECT id, 'insert' FROM Scheduler WHERE id > ? ORDER BY id
+    """,
+    "Scheduler_summary_insert": """
+        INSERT INTO Scheduler_summary (status, priority, deadline, count)
+        SELECT IFNULL(status, ''), IFNULL(priority, ''),
+               IFNULL(deadline, ''), COUNT(*)
+        FROM Scheduler WHERE id > ? GROUP BY 1, 2, 3
+        ON CONFLICT (status, priority, deadline)
+        DO UPDATE SET count = count + excluded.count
+    """,
+}
+
+
+def build_select(params, table="Scheduler"):
+    """Строит запрос SELECT к table по параметрам фильтра.
+
+    Параметры вида column=value дают условие равенства, column__op=value -
+    условие с оператором из OPERATORS (для "in" value - список значений).
+    Служебные параметры:
+        order_by - поле сортировки (к нему всегда добавляется id);
+        descending - сортировка по убыванию;
+        after - ключ (значение order_by, id) последней полученной записи
+                для постраничной выборки по ключу (NULL в order_by
+                считается меньше любых значений, как в ORDER BY);
+        limit - максимальное число записей.
+    Возвращает кортеж (sql, values). Имена полей проверяются по COLUMNS.
+    table - Scheduler или таблица с теми же полями, например архив.
+    """
+    params = dict(params)
+    order_by = params.pop("order_by", None)
+    descending = params.pop("descending", False)
+    after = params.pop("after", None)
+    limit = params.pop("limit", None)
+
+    conditions = []
+    values = []
+    for key, value in params.items():
+        column, _, operator = key.partition("__")
+        if column not in COLUMNS or (operator or "eq") not in OPERATORS:
+            raise ValueError(f"Недопустимый параметр фильтра '{key}'.")
+        if operator == "in":
+            value = list(value)
+            placeholders = ", ".join("?" * len(value))
+            conditions.append(f"{column} IN ({placeholders})")
+            values.extend(value)
+        else:
+            conditions.append(f"{column} {OPERATORS[operator or 'eq']} ?")
+            values.append(value)
+
+    if after is not None and order_by is None:
+        order_by = "id"
+    if order_by is not None and order_by not in COLUMNS:
+        raise ValueError(f"Недопустимое поле сортировки '{order_by}'.")
+    direction = "DESC" if descending else "ASC"
+
+    if after is not None:
+        sign = "<" if descending else ">"
+        if order_by == "id":
+            conditions.append(f"id {sign} ?")
+            values.append(after[-1])
+        elif after[0] is None:
+            # Сравнение с NULL ложно: NULL идут первыми при сортировке по
+            # возрастанию и последними при сортировке по убыванию
+            condition = f"({order_by} IS NULL AND id {sign} ?)"
+            if not descending:
+                condition = f"({condition} OR {order_by} IS NOT NULL)"
+            conditions.append(condition)
+            values.append(after[1])
+        else:
+            condition = f"({order_by}, id) {sign} (?, ?)"
+            if descending:
+                condition = f"({condition} OR {order_by} IS NULL)"
+            conditions.append(condition)
+            values.extend(after)
+
+    query = f"SELECT * FROM {table}"
+    if conditions:
+        query += " WHERE " + " AND ".join(conditions)
+    if order_by == "id":
+        query += f" ORDER BY id {direction}"
+    elif order_by is not None:
+        query += f" ORDER BY {order_by} {direction}, id {direction}"
+    if limit is not None:
+        query += " LIMIT ?"
+        values.append(limit)
+    return query, values
+
+
+def _chunks(iterable, size):
+    """Разбивает итерируемый объект на списки длиной не больше size."""
+    iterator = iter(iterable)
+    while True:
+        chunk = list(islice(iterator, size))
+        if not chunk:
+            return
+        yield chunk
+
+
+def _statements(script):
+    """Разбивает сценарий SQL на отдельные запросы.
+
+    executescript зафиксировал бы открытую транзакцию, поэтому миграции
+    выполняются по одному запросу. Запросы с точками с запятой внутри
+    (триггеры BEGIN ... END) не разрываются.
+    """
+    statement = ""
+    for line in script.splitlines(keepends=True):
+        statement += line
+        if sqlite3.complete_statement(statement):
+            yield statement
+            statement = ""
+    if statement.strip() and sqlite3.complete_statement(statement + ";"):
+        yield statement
+
+
+def _match_query(text):
+    """Строит запрос FTS5: каждое слово текста ищется как префикс."""
+    return " ".join('"{}"*'.format(word.replace('"', '""'))
+                    for word in text.split())
+
+
+def _columns_of(alias):
+    """Возвращает список полей поиска с префиксом new/old для триггера."""
+    return ", ".join(f"{alias}.{column.strip()}"
+                     for column in SEARCH_COLUMNS.split(","))
+
+
+# Настройки SQLite по умолчанию: журнал WAL позволяет читать базу во время
+# записи, synchronous=NORMAL в режиме WAL не делает fsync на каждый commit
+PERFORMANCE_PROFILE = {
+    "busy_timeout": 5000,       # Ожидание блокировки другим процессом, мс
+    "journal_mode": "WAL",
+    "synchronous": "NORMAL",
+    "cache_size": -20000,       # Кэш страниц, КиБ (отрицательное значение)
+    "mmap_size": 268435456,     # 256 МиБ файла базы читаются через mmap
+    "temp_store": "MEMORY",
+}
+
+
+# Повторы записи, если база занята другим процессом и busy_timeout истек:
+# число попыток и границы паузы перед повтором, секунды. Пауза растет
+# экспоненциально и выбирается случайно, чтобы писатели не повторяли
+# попытки одновременно.
+RetryPolicy = namedtuple("RetryPolicy",
+                         ["attempts", "base_delay", "max_delay"])
+RETRY_POLICY = RetryPolicy(attempts=6, base_delay=0.05, max_delay=2.0)
+
+
+def is_busy(error):
+    """Проверяет, что ошибка SQLite означает занятую базу (SQLITE_BUSY)."""
+    code = getattr(error, "sqlite_errorcode", None)
+    if code is not None:
+        # Расширенные коды (SQLITE_BUSY_SNAPSHOT и др.) в младшем байте
+        return code & 0xFF in (sqlite3.SQLITE_BUSY, sqlite3.SQLITE_LOCKED)
+    return "locked" in str(error) or "busy" in str(error)
+
+
+def connect(db_file, profile=None):
+    """Открывает соединение и применяет к нему PRAGMA из profile.
+
+    Соединение можно использовать из разных потоков, но не одновременно:
+    доступ к нему разграничивает ConnectionPool.
+    """
+    connection = sqlite3.connect(db_file, check_same_thread=False)
+    for name, value in (profile or {}).items():
+        connection.execute(f"PRAGMA {name} = {value}")
+    return connection
+
+
+class ConnectionPool:
+    """Потокобезопасный пул: одно соединение для записи и N для чтения.
+
+    Запись идет через единственное соединение под блокировкой, поэтому
+    писатели не мешают друг другу. Читатели получают отдельные соединения
+    и в режиме WAL не ждут окончания записи. Поток, который держит
+    соединение записи, читает через него же и видит свои незафиксированные
+    изменения. Для базы в памяти читатели используют соединение записи.
+    """
+
+    def __init__(self, db_file, writer, profile=None, readers=2):
+        self.db_file = db_file
+        self.profile = profile
+        self.writer_connection = writer
+        self._write_lock = threading.RLock()
+        self._writer_thread = None
+        self._write_depth = 0
+        self._shared = readers <= 0 or db_file == ":memory:"
+        self._reader_slots = threading.BoundedSemaphore(max(readers, 1))
+        self._idle_readers = []
+        self._all_readers = []
+        self._readers_lock = threading.Lock()
+        self._version_connection = None
+        self._version_lock = threading.Lock()
+
+    @contextmanager
+    def writer(self):
+        """Выдает соединение записи, блокируя другие потоки-писатели."""
+        with self._write_lock:
+            self._writer_thread = threading.get_ident()
+            self._write_depth += 1
+            try:
+                yield self.writer_connection
+            finally:
+                self._write_depth -= 1
+                if self._write_depth == 0:
+                    self._writer_thread = None
+
+    def holds_writer(self):
+        """Проверяет, держит ли текущий поток соединение записи."""
+        return self._writer_thread == threading.get_ident()
+
+    @contextmanager
+    def reader(self):
+        """Выдает соединение для чтения и возвращает его в пул."""
+        if self._shared or self.holds_writer():
+            with self.writer() as connection:
+                yield connection
+            return
+
+        with self._reader_slots:
+            with self._readers_lock:
+                connection = (self._idle_readers.pop()
+                              if self._idle_readers else None)
+            if connection is None:
+                connection = connect(self.db_file, self.profile)
+                connection.execute("PRAGMA query_only = ON")
+                with self._readers_lock:
+                    self._all_readers.append(connection)
+            try:
+                yield connection
+            finally:
+                with self._readers_lock:
+                    self._idle_readers.append(connection)
+
+    def data_version(self):
+        """Возвращает PRAGMA data_version отдельного соединения.
+
+        Значение меняется после каждого commit любого другого соединения,
+        в том числе из других процессов, поэтому по нему видно, что данные
+        могли измениться.
+        """
+        if self._shared:
+            with self.writer() as connection:
+                return connection.execute("PRAGMA data_version").fetchone()[0]
+        with self._version_lock:
+            if self._version_connection is None:
+                self._version_connection = connect(self.db_file)
+            return self._version_connection.execute(
+                "PRAGMA data_version").fetchone()[0]
+
+    def close(self):
+        """Закрывает все соединения пула."""
+        with self._version_lock:
+            if self._version_connection is not None:
+                self._version_connection.close()
+                self._version_connection = None
+        with self._readers_lock:
+            for connection in self._all_readers:
+                connection.close()
+            self._all_readers = []
+            self._idle_readers = []
+        self.writer_connection.close()
+
+
+class DB_Connector:
+    def __init__(self, db_file, profile=None, readers=2, row_factory=None,
+                 instrumentation=None, retry=None):
+        """Инициализация подключения к базе данных.
+
+        profile - словарь PRAGMA для соединений (по умолчанию
+        PERFORMANCE_PROFILE), readers - число соединений для чтения,
+        row_factory - фабрика для строк Scheduler (по умолчанию кортежи),
+        instrumentation - объект для замеров операций (см. модуль
+        instrumentation, по умолчанию замеры не ведутся), retry -
+        RetryPolicy повторов записи в занятую базу (по умолчанию
+        RETRY_POLICY).
+
+        Ошибки SQLite (sqlite3.Error) не перехватываются, а передаются
+        вызывающему коду, например, чтобы он мог повторить запись.
+        """
+        self.profile = PERFORMANCE_PROFILE if profile is None else profile
+        self.row_factory = row_factory
+        self.instrumentation = instrumentation or NullInstrumentation()
+        self.retry = RETRY_POLICY if retry is None else retry
+        self.connection = self.create_connection(db_file)
+        self.pool = ConnectionPool(db_file, self.connection,
+                                   self.profile, readers)
+        self._transaction_depth = 0  # Вложенность открытых транзакций
+        self.create_table()
+
+    def create_connection(self, db_file):
+        """Создает соединение с указанной базой данных SQLite."""
+        self.conn = connect(db_file, self.profile)
+        logger.debug("Открыта база данных %s", db_file)
+        return self.conn
+
+    def create_table(self):
+        """Создает таблицу Scheduler, если она не существует."""
+        create_table_sql = """
+        CREATE TABLE IF NOT EXISTS Scheduler (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            task_name TEXT NOT NULL,
+            description TEXT,
+            priority TEXT,
+            status TEXT,
+            deadline TEXT,
+            comment TEXT,
+            created TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+        );
+        """
+        self.cursor = self.connection.cursor()
+        self.cursor.execute(create_table_sql)
+
+        self.create_search_index()
+        self.migrate()
+
+    def migrate(self):
+        """Применяет к базе еще не примененные миграции из MIGRATIONS.
+
+        Каждая миграция выполняется в своей транзакции BEGIN IMMEDIATE
+        вместе с записью ее номера в user_version. Номер перечитывается
+        после захвата блокировки, поэтому если базу одновременно открыли
+        несколько процессов, миграцию применяет только первый из них.
+        """
+        self.cursor = self.connection.cursor()
+        while True:
+            self.cursor.execute("PRAGMA user_version")
+            if self.cursor.fetchone()[0] >= len(MIGRATIONS):
+                return
+            self._begin()
+            try:
+                self.cursor.execute("PRAGMA user_version")
+                version = self.cursor.fetchone()[0]
+                if version < len(MIGRATIONS):
+                    for statement in _statements(MIGRATIONS[version]):
+                        self.cursor.execute(statement)
+                    self.cursor.execute(
+                        f"PRAGMA user_version = {version + 1}")
+                self.connection.commit()
+            except BaseException:
+                self.connection.rollback()
+                raise
+
+    def create_search_index(self):
+        """Создает полнотекстовый индекс FTS5 по таблице Scheduler.
+
+        Индекс хранит только токены (content='Scheduler') и обновляется
+        триггерами при вставке, изменении и удалении записей.
+        """
+        create_index_sql = f"""
+        CREATE VIRTUAL TABLE IF NOT EXISTS Scheduler_fts USING fts5(
+            {SEARCH_COLUMNS},
+            content='Scheduler', content_rowid='id'
+        );
+        CREATE TRIGGER IF NOT EXISTS Scheduler_fts_insert
+        AFTER INSERT ON Scheduler BEGIN
+            INSERT INTO Scheduler_fts (rowid, {SEARCH_COLUMNS})
+            VALUES (new.id, {_columns_of("new")});
+        END;
+        CREATE TRIGGER IF NOT EXISTS Scheduler_fts_delete
+        AFTER DELETE ON Scheduler BEGIN
+            INSERT INTO Scheduler_fts (Scheduler_fts, rowid, {SEARCH_COLUMNS})
+            VALUES ('delete', old.id, {_columns_of("old")});
+        END;
+        CREATE TRIGGER IF NOT EXISTS Scheduler_fts_update
+        AFTER UPDATE ON Scheduler BEGIN
+            INSERT INTO Scheduler_fts (Scheduler_fts, rowid, {SEARCH_COLUMNS})
+            VALUES ('delete', old.id, {_columns_of("old")});
+            INSERT INTO Scheduler_fts (rowid, {SEARCH_COLUMNS})
+            VALUES (new.id, {_columns_of("new")});
+        END;
+        """
+        self.cursor = self.connection.cursor()
+        self.cursor.execute(
+            "SELECT 1 FROM sqlite_master WHERE name = 'Scheduler_fts'")
+        exists = self.cursor.fetchone() is not None
+        self.cursor.executescript(create_index_sql)
+        if not exists:
+            # Индексируем записи, созданные до появления индекса
+            self.cursor.execute(
+                "INSERT INTO Scheduler_fts (Scheduler_fts) "
+                "VALUES ('rebuild')")
+            self.connection.commit()
+
+    @contextmanager
+    def transaction(self):
+        """Объединяет все изменения внутри блока with в одну транзакцию.
+
+        Одиночные методы записи внутри блока не делают commit. Изменения
+        фиксируются при выходе из внешнего блока или откатываются, если
+        в нем возникло исключение. Блоки можно вкладывать друг в друга.
+        """
+        with self.pool.writer():
+            if self._transaction_depth == 0:
+                self._begin()
+            self._transaction_depth += 1
+            try:
+                yield self
+            except BaseException:
+                self._transaction_depth -= 1
+                if self._transaction_depth == 0:
+                    self.connection.rollback()
+                raise
+            self._transaction_depth -= 1
+            if self._transaction_depth == 0:
+                try:
+                    self._commit()
+                except BaseException:
+                    self.connection.rollback()
+                    raise
+
+    @contextmanager
+    def savepoint(self, name="step"):
+        """Отменяет изменения блока при ошибке, не отменяя транзакцию.
+
+        Блок выполняется внутри transaction() под SAVEPOINT. Если в нем
+        возникло исключение, его изменения откатываются ROLLBACK TO, а
+        внешняя транзакция продолжается и может быть зафиксирована.
+        """
+        with self.transaction():
+            self.connection.execute(f'SAVEPOINT "{name}"')
+            try:
+                yield self
+            except BaseException:
+                self.connection.execute(f'ROLLBACK TO "{name}"')
+                self.connection.execute(f'RELEASE "{name}"')
+                raise
+            self.connection.execute(f'RELEASE "{name}"')
+
+    def _commit(self):
+        """Фиксирует изменения, если не открыта внешняя транзакция."""
+        if self._transaction_depth == 0:
+            self._with_retry(self.connection.commit)
+
+    def _begin(self):
+        """Начинает транзакцию записи с немедленной блокировкой базы.
+
+        BEGIN IMMEDIATE захватывает блокировку записи сразу, поэтому
+        транзакция не может получить SQLITE_BUSY посередине, когда часть
+        изменений уже выполнена. Время ожидания блокировки записывается
+        в instrumentation как операция lock_wait.
+        """
+        if self.connection.in_transaction:
+            return
+        start = time.perf_counter()
+        try:
+            self._with_retry(self.connection.execute, "BEGIN IMMEDIATE")
+        except Error:
+            self.instrumentation.record("lock_wait",
+                                        time.perf_counter() - start,
+                                        error=True)
+            raise
+        self.instrumentation.record("lock_wait", time.perf_counter() - start)
+
+    def _with_retry(self, fn, *args):
+        """Выполняет fn, повторяя его, пока база занята другим процессом.
+
+        Перед повтором выдерживается случайная пауза до
+        base_delay * 2 ** попытка (не больше max_delay). Каждый повтор
+        записывается в instrumentation как операция busy_retry. Если база
+        занята и после последней попытки, ошибка передается вызывающему.
+        """
+        for attempt in range(self.retry.attempts):
+            try:
+                return fn(*args)
+            except sqlite3.OperationalError as ex:
+                if not is_busy(ex) or attempt + 1 >= self.retry.attempts:
+                    raise
+                delay = random.uniform(0, min(self.retry.max_delay,
+                                              self.retry.base_delay
+                                              * 2 ** attempt))
+                logger.info("База занята (%s), повтор %d через %.3f с",
+                            ex, attempt + 1, delay)
+                self.instrumentation.record("busy_retry", delay)
+                time.sleep(delay)
+
+    @contextmanager
+    def _writing(self, operation, sql, values):
+        """Захватывает соединение записи и замеряет одиночное изменение.
+
+        Вне transaction() изменение выполняется в своей транзакции
+        BEGIN IMMEDIATE с повторами при занятой базе. Если оно завершилось
+        ошибкой, транзакция откатывается, а ошибка передается вызывающему.
+        """
+        with self.pool.writer(), self.instrumentation.measure(
+                operation, self.connection, sql, values) as measured:
+            if self._transaction_depth == 0:
+                self._begin()
+            try:
+                yield measured
+            except Error:
+                if self._transaction_depth == 0:
+                    self.connection.rollback()
+                raise
+
+    def add_record(self,
+                   task_name,
+                   description, priority, status, deadline, comment):
+        """Добавляет запись в таблицу Scheduler и возвращает ее id."""
+        sql = """INSERT INTO Scheduler (
+            task_name, description, priority, status, deadline, comment
+            )
+                 VALUES (?, ?, ?, ?, ?, ?)"""
+        values = (task_name, description, priority, status, deadline,
+                  comment)
+        with self._writing("add_record", sql, values) as measured:
+            self.cursor = self.connection.cursor()
+            self.cursor.execute(sql, values)
+            self._commit()
+            lastrowid = self.cursor.lastrowid
+            measured.rows = self.cursor.rowcount
+        logger.debug("Запись %s добавлена", lastrowid)
+        return lastrowid
+
+    def delete_record(self, record_id):
+        """Удаляет запись из таблицы Scheduler по id.
+
+        Возвращает True, если запись была удалена.
+        """
+        sql = """DELETE FROM Scheduler WHERE id = ?"""
+        with self._writing("delete_record", sql, (record_id,)) as measured:
+            self.cursor = self.connection.cursor()
+            self.cursor.execute(sql, (record_id,))
+            self._commit()
+            measured.rows = self.cursor.rowcount
+            deleted = self.cursor.rowcount > 0
+        logger.debug("Запись %s удалена: %s", record_id, deleted)
+        return deleted
+
+    def update_record(self, record_id,
+                      task_name, description, priority, status,
+                      deadline, comment):
+        """Обновляет запись в таблице Scheduler.
+
+        Возвращает обновленную запись или None, если записи с таким id нет.
+        """
+        sql = """UPDATE Scheduler
+                 SET task_name = ?, description = ?, priority = ?, status = ?,
+                 deadline = ?, comment = ?
+                 WHERE id = ?"""
+        values = (task_name, description, priority, status, deadline,
+                  comment, record_id)
+        with self._writing("update_record", sql, values) as measured:
+            self.cursor = self.connection.cursor()
+            self.cursor.execute(sql, values)
+            measured.rows = self.cursor.rowcount
+            self._commit()
+            # Читаем через то же соединение, чтобы увидеть изменения
+            # внутри незавершенной транзакции
+            record = self.get_record(record_id)
+        logger.debug("Запись %s обновлена", record_id)
+        return record
+
+    def add_records(self, records, chunk_size=500):
+        """Добавляет записи пачками в одной транзакции.
+
+        records - итерируемый объект кортежей (task_name, description,
+        priority, status, deadline, comment). Возвращает число записей.
+        """
+        sql = """INSERT INTO Scheduler (
+            task_name, description, priority, status, deadline, comment
+            )
+                 VALUES (?, ?, ?, ?, ?, ?)"""
+        return self._execute_many(sql, records, chunk_size,
+                                  "add_records")
+
+    def update_records(self, records, chunk_size=500):
+        """Обновляет записи пачками в одной транзакции.
+
+        records - итерируемый объект кортежей (record_id, task_name,
+        description, priority, status, deadline, comment), как аргументы
+        update_record. Возвращает число обновленных записей: id, которых
+        нет в таблице, не считаются.
+        """
+        sql = """UPDATE Scheduler
+                 SET task_name = ?, description = ?, priority = ?, status = ?,
+                 deadline = ?, comment = ?
+                 WHERE id = ?"""
+        values = (record[1:] + record[:1] for record in map(tuple, records))
+        return self._execute_many(sql, values, chunk_size,
+                                  "update_records", count_rows=True)
+
+    def import_records(self, records, chunk_size=5000, rebuild_indexes=True,
+                       on_progress=None):
+        """Загружает большой поток записей в одной транзакции.
+
+        records - итерируемый объект кортежей (task_name, description,
+        priority, status, deadline, comment, created); created None
+        заменяется текущим временем. Записи читаются и вставляются пачками
+        по chunk_size, поэтому память не зависит от их числа.
+
+        Если rebuild_indexes включен, на время загрузки удаляются индексы
+        Scheduler и триггеры из BULK_INSERT_TRIGGERS. После загрузки
+        индексы строятся заново, а работа триггеров выполняется одним
+        запросом на все новые записи: это в несколько раз быстрее, чем
+        обновлять индексы на каждую строку. Все это происходит в той же
+        транзакции, поэтому другие соединения не видят базу без индексов.
+
+        on_progress(count) вызывается после каждой пачки. При ошибке
+        загрузка откатывается целиком. Возвращает число записей.
+        """
+        sql = """INSERT INTO Scheduler (
+            task_name, description, priority, status, deadline, comment,
+            created
+            )
+                 VALUES (?, ?, ?, ?, ?, ?, COALESCE(?, CURRENT_TIMESTAMP))"""
+        count = 0
+        with self.instrumentation.measure("import_records",
+                                          sql=sql) as measured, \
+                self.transaction():
+            self.cursor = self.connection.cursor()
+            deferred = []
+            if rebuild_indexes:
+                deferred = self._suspend_indexes()
+            last_id = self.cursor.execute(
+                "SELECT IFNULL(MAX(id), 0) FROM Scheduler").fetchone()[0]
+            for chunk in _chunks(records, chunk_size):
+                self.cursor.executemany(sql, chunk)
+                count += len(chunk)
+                measured.rows = count
+                if on_progress is not None:
+                    on_progress(count)
+            for name, create_sql in deferred:
+                if name in BULK_INSERT_TRIGGERS:
+                    self.cursor.execute(BULK_INSERT_TRIGGERS[name],
+                                        (last_id,))
+                self.cursor.execute(create_sql)
+        logger.info("Загружено записей: %d", count)
+        return count
+
+    def _suspend_indexes(self):
+        """Удаляет индексы и триггеры вставки Scheduler для загрузки.
+
+        Возвращает список (имя, запрос CREATE) для их восстановления.
+        """
+        deferred = self.cursor.execute(
+            "SELECT name, sql FROM sqlite_master WHERE tbl_name = 'Scheduler' "
+            "AND ((type = 'index' AND sql IS NOT NULL) OR (type = 'trigger' "
+            f"AND name IN ({', '.join('?' * len(BULK_INSERT_TRIGGERS))})))",
+            list(BULK_INSERT_TRIGGERS)).fetchall()
+        for name, create_sql in deferred:
+            kind = "TRIGGER" if name in BULK_INSERT_TRIGGERS else "INDEX"
+            self.cursor.execute(f'DROP {kind} "{name}"')
+        return deferred
+
+    def delete_records(self, record_ids, chunk_size=500):
+        """Удаляет записи по списку id в одной транзакции.
+
+        Возвращает число удаленных записей: id, которых нет в таблице,
+        не считаются.
+        """
+        sql = """DELETE FROM Scheduler WHERE id = ?"""
+        values = ((record_id,) for record_id in record_ids)
+        return self._execute_many(sql, values, chunk_size,
+                                  "delete_records", count_rows=True)
+
+    def _execute_many(self, sql, values, chunk_size, operation,
+                      count_rows=False):
+        """Выполняет запрос для всех наборов значений пачками по chunk_size.
+
+        Все пачки выполняются в одной транзакции с одним commit в конце.
+        Возвращает число наборов значений или, если count_rows, число
+        измененных запросом строк.
+        """
+        count = 0
+        with self.instrumentation.measure(operation, sql=sql) as measured, \
+                self.transaction():
+            self.cursor = self.connection.cursor()
+            for chunk in _chunks(values, chunk_size):
+                self.cursor.executemany(sql, chunk)
+                count += self.cursor.rowcount if count_rows else len(chunk)
+                measured.rows = count
+        logger.debug("%s: записей обработано %d", operation, count)
+        return count
+
+    def get_record(self, record_id):
+        """Возвращает запись из таблицы Scheduler по id или None."""
+        sql = """SELECT * FROM Scheduler WHERE id = ?"""
+        with self.pool.reader() as connection, \
+                self.instrumentation.measure("get_record", connection, sql,
+                                             (record_id,)) as measured:
+            cursor = connection.cursor()
+            cursor.row_factory = self.row_factory
+            cursor.execute(sql, (record_id,))
+            record = cursor.fetchone()
+            measured.rows = record is not None
+            return record
+
+    def get_all_records(self):
+        """Возвращает все записи из таблицы Scheduler."""
+        sql = """SELECT * FROM Scheduler ORDER BY deadline"""
+        with self.pool.reader() as connection, \
+                self.instrumentation.measure("get_all_records", connection,
+                                             sql) as measured:
+            cursor = connection.cursor()
+            cursor.row_factory = self.row_factory
+            cursor.execute(sql)
+            records = cursor.fetchall()
+            measured.rows = len(records)
+            return records
+
+    def get_records_page(self, after=None, limit=200):
+        """Возвращает страницу записей, упорядоченных по (deadline, id).
+
+        after - ключ (deadline, id) последней уже загруженной записи.
+        Пагинация по ключу не зависит от вставок перед текущей позицией,
+        в отличие от OFFSET.
+        """
+        return self.get_records_by_params(order_by="deadline",
+                                          after=after, limit=limit)
+
+    def get_records_by_ids(self, record_ids):
+        """Возвращает записи с указанными id в порядке следования id."""
+        if not record_ids:
+            return []
+        placeholders = ", ".join("?" * len(record_ids))
+        sql = f"""SELECT * FROM Scheduler WHERE id IN ({placeholders})"""
+        values = list(record_ids)
+        with self.pool.reader() as connection, \
+                self.instrumentation.measure("get_records_by_ids",
+                                             connection, sql,
+                                             values) as measured:
+            cursor = connection.cursor()
+            cursor.row_factory = self.row_factory
+            cursor.execute(sql, values)
+            records = {record[0]: record for record in cursor}
+            measured.rows = len(records)
+        return [records[record_id]
+                for record_id in record_ids if record_id in records]
+
+    def search(self, text, limit=100, offset=0):
+        """Ищет записи по тексту и возвращает id в порядке релевантности.
+
+        Каждое слово запроса ищется как префикс слова в любом текстовом
+        поле.
+        """
+        query = _match_query(text)
+        if not query:
+            return []
+        sql = """SELECT rowid FROM Scheduler_fts
+                 WHERE Scheduler_fts MATCH ?
+                 ORDER BY rank LIMIT ? OFFSET ?"""
+        values = (query, limit, offset)
+        with self.pool.reader() as connection, \
+                self.instrumentation.measure("search", connection, sql,
+                                             values) as measured:
+            cursor = connection.cursor()
+            cursor.execute(sql, values)
+            record_ids = [row[0] for row in cursor]
+            measured.rows = len(record_ids)
+            return record_ids
+
+    def get_records_by_params(self, **params):
+        """Возвращает записи из таблицы Scheduler по указанным параметрам.
+
+        Поддерживаемые параметры описаны в build_select, например:
+        get_records_by_params(status="в работе", deadline__lt="2025-01-01",
+                              order_by="deadline", limit=50)
+        """
+        query, values = build_select(params)
+
+        with self.pool.reader() as connection, \
+                self.instrumentation.measure("get_records_by_params",
+                                             connection, query,
+                                             values) as measured:
+            cursor = connection.cursor()
+            cursor.row_factory = self.row_factory
+            cursor.execute(query, values)
+            records = cursor.fetchall()
+            measured.rows = len(records)
+            return records
+
+    def add_dependency(self, task_id, depends_on):
+        """Добавляет зависимость задачи task_id от задачи depends_on.
+
+        Возвращает True, если зависимость добавлена, и False, если она
+        уже есть или одной из задач нет. Циклы здесь не проверяются, это
+        делает TaskScheduler.
+        """
+        sql = """INSERT OR IGNORE INTO Scheduler_dependencies
+                 (task_id, depends_on)
+                 SELECT ?, ? WHERE EXISTS (SELECT 1 FROM Scheduler
+                                           WHERE id = ?)
+                 AND EXISTS (SELECT 1 FROM Scheduler WHERE id = ?)"""
+        values = (task_id, depends_on, task_id, depends_on)
+        with self._writing("add_dependency", sql, values) as measured:
+            self.cursor = self.connection.cursor()
+            self.cursor.execute(sql, values)
+            self._commit()
+            measured.rows = self.cursor.rowcount
+            return self.cursor.rowcount > 0
+
+    def remove_dependency(self, task_id, depends_on):
+        """Удаляет зависимость. Возвращает True, если она была."""
+        sql = """DELETE FROM Scheduler_dependencies
+                 WHERE task_id = ? AND depends_on = ?"""
+        values = (task_id, depends_on)
+        with self._writing("remove_dependency", sql, values) as measured:
+            self.cursor = self.connection.cursor()
+            self.cursor.execute(sql, values)
+            self._commit()
+            measured.rows = self.cursor.rowcount
+            return self.cursor.rowcount > 0
+
+    def get_dependencies(self):
+        """Возвращает все зависимости списком (task_id, depends_on)."""
+        sql = """SELECT task_id, depends_on FROM Scheduler_dependencies"""
+        with self.pool.reader() as connection, \
+                self.instrumentation.measure("get_dependencies", connection,
+                                             sql) as measured:
+            edges = connection.execute(sql).fetchall()
+            measured.rows = len(edges)
+            return edges
+
+    def set_recurrence(self, task_id, frequency, interval=1, until=None):
+        """Задает правило повторения задачи task_id.
+
+        Возвращает True, если правило сохранено, и False, если задачи нет.
+        """
+        sql = """INSERT OR REPLACE INTO Scheduler_recurrence
+                 (task_id, frequency, interval, until)
+                 SELECT ?, ?, ?, ? WHERE EXISTS (SELECT 1 FROM Scheduler
+                                                 WHERE id = ?)"""
+        values = (task_id, frequency, interval, until, task_id)
+        with self._writing("set_recurrence", sql, values) as measured:
+            self.cursor = self.connection.cursor()
+            self.cursor.execute(sql, values)
+            self._commit()
+            measured.rows = self.cursor.rowcount
+            return self.cursor.rowcount > 0
+
+    def remove_recurrence(self, task_id):
+        """Удаляет правило повторения. Возвращает True, если оно было.
+
+        Задачи, на которые заменены вхождения, остаются обычными задачами.
+        """
+        sql = """DELETE FROM Scheduler_recurrence WHERE task_id = ?"""
+        with self._writing("remove_recurrence", sql,
+                           (task_id,)) as measured:
+            self.cursor = self.connection.cursor()
+            self.cursor.execute(sql, (task_id,))
+            removed = self.cursor.rowcount > 0
+            self.cursor.execute(
+                "DELETE FROM Scheduler_occurrences WHERE series_id = ?",
+                (task_id,))
+            self._commit()
+            measured.rows = removed
+            return removed
+
+    def mark_occurrence(self, series_id, occurrence, task_id=None):
+        """Отмечает вхождение серии на дату occurrence как измененное.
+
+        task_id - задача, на которую заменено вхождение, или None, если
+        вхождение удалено.
+        """
+        sql = """INSERT OR REPLACE INTO Scheduler_occurrences
+                 (series_id, occurrence, task_id) VALUES (?, ?, ?)"""
+        values = (series_id, occurrence, task_id)
+        with self._writing("mark_occurrence", sql, values) as measured:
+            self.cursor = self.connection.cursor()
+            self.cursor.execute(sql, values)
+            self._commit()
+            measured.rows = self.cursor.rowcount
+
+    def get_recurrences(self):
+        """Возвращает правила повторения списком кортежей.
+
+        Кортеж - (task_id, frequency, interval, until).
+        """
+        sql = """SELECT task_id, frequency, interval, until
+                 FROM Scheduler_recurrence"""
+        with self.pool.reader() as connection, \
+                self.instrumentation.measure("get_recurrences", connection,
+                                             sql) as measured:
+            rules = connection.execute(sql).fetchall()
+            measured.rows = len(rules)
+            return rules
+
+    def get_occurrence_exceptions(self):
+        """Возвращает (series_id, occurrence) измененных вхождений."""
+        sql = """SELECT series_id, occurrence FROM Scheduler_occurrences"""
+        with self.pool.reader() as connection, \
+                self.instrumentation.measure("get_occurrence_exceptions",
+                                             connection, sql) as measured:
+            exceptions = connection.execute(sql).fetchall()
+            measured.rows = len(exceptions)
+            return exceptions
+
+    def get_summary(self):
+        """Возвращает счетчики задач из Scheduler_summary.
+
+        Результат - список (status, priority, deadline, count), пустая
+        строка в ключе означает NULL. Таблицу ведут триггеры, поэтому
+        чтение не зависит от числа задач.
+        """
+        sql = """SELECT status, priority, deadline, count
+                 FROM Scheduler_summary"""
+        with self.pool.reader() as connection, \
+                self.instrumentation.measure("get_summary", connection,
+                                             sql) as measured:
+            rows = connection.execute(sql).fetchall()
+            measured.rows = len(rows)
+            return rows
+
+    def archive_records(self, statuses, before, batch_size=500, limit=None,
+                        on_progress=None):
+        """Переносит старые завершенные записи в Scheduler_archive.
+
+        Переносятся записи со статусом из statuses и дедлайном раньше
+        before, а без дедлайна - созданные раньше before. Образцы
+        повторяющихся задач остаются в Scheduler. Каждая пачка из
+        batch_size записей переносится своей короткой транзакцией, поэтому
+        перенос не держит блокировку записи дольше одной пачки и его можно
+        прервать между пачками. Триггеры удаления из Scheduler обновляют
+        поиск, сводку, зависимости и журнал изменений, как при обычном
+        удалении. limit - наибольшее число записей за вызов (по умолчанию
+        все). on_progress(count) вызывается после каждой пачки. Возвращает
+        число перенесенных записей.
+        """
+        statuses = list(statuses)
+        placeholders = ", ".join("?" * len(statuses))
+        # Две ветки вместо OR, чтобы обе шли по индексу (status, deadline)
+        select_sql = f"""SELECT id FROM Scheduler
+                 WHERE status IN ({placeholders}) AND deadline < ?
+                 AND id NOT IN (SELECT task_id FROM Scheduler_recurrence)
+                 UNION ALL
+                 SELECT id FROM Scheduler
+                 WHERE status IN ({placeholders}) AND deadline IS NULL
+                 AND created < ?
+                 AND id NOT IN (SELECT task_id FROM Scheduler_recurrence)
+                 LIMIT ?"""
+        columns = ", ".join(COLUMNS)
+        count = 0
+        with self.instrumentation.measure("archive_records",
+                                          sql=select_sql) as measured:
+            while limit is None or count < limit:
+                size = batch_size if limit is None else min(batch_size,
+                                                            limit - count)
+                values = statuses + [before] + statuses + [before, size]
+                with self.transaction():
+                    self.cursor = self.connection.cursor()
+                    record_ids = [row[0] for row in self.cursor.execute(
+                        select_sql, values)]
+                    if not record_ids:
+                        break
+                    id_placeholders = ", ".join("?" * len(record_ids))
+                    # Прежняя копия записи в архиве удаляется явно, а не
+                    # INSERT OR REPLACE: замена не вызывает триггер удаления
+                    # из поиска по архиву, и старый текст находился бы
+                    self.cursor.execute(
+                        f"DELETE FROM Scheduler_archive "
+                        f"WHERE id IN ({id_placeholders})", record_ids)
+                    self.cursor.execute(
+                        f"INSERT INTO Scheduler_archive "
+                        f"({columns}) SELECT {columns} FROM Scheduler "
+                        f"WHERE id IN ({id_placeholders})", record_ids)
+                    self.cursor.execute(
+                        f"DELETE FROM Scheduler "
+                        f"WHERE id IN ({id_placeholders})", record_ids)
+                count += len(record_ids)
+                measured.rows = count
+                if on_progress is not None:
+                    on_progress(count)
+                if len(record_ids) < size:
+                    break
+        logger.info("Перенесено в архив записей: %d", count)
+        return count
+
+    def restore_records(self, record_ids):
+        """Возвращает записи из архива в Scheduler с прежними id.
+
+        Зависимости записей, удаленные при переносе в архив, не
+        восстанавливаются: архив хранит только сами записи. Возвращает
+        число восстановленных записей.
+        """
+        record_ids = list(record_ids)
+        if not record_ids:
+            return 0
+        placeholders = ", ".join("?" * len(record_ids))
+        columns = ", ".join(COLUMNS)
+        sql = f"""INSERT OR IGNORE INTO Scheduler ({columns})
+                  SELECT {columns} FROM Scheduler_archive
+                  WHERE id IN ({placeholders})"""
+        with self._writing("restore_records", sql, record_ids) as measured:
+            self.cursor = self.connection.cursor()
+            self.cursor.execute(sql, record_ids)
+            restored = self.cursor.rowcount
+            self.cursor.execute(
+                f"DELETE FROM Scheduler_archive "
+                f"WHERE id IN ({placeholders}) "
+                f"AND id IN (SELECT id FROM Scheduler)", record_ids)
+            self._commit()
+            measured.rows = restored
+        logger.debug("Из архива восстановлено записей: %d", restored)
+        return restored
+
+    def get_archived_records(self, **params):
+        """Возвращает записи архива по параметрам фильтра (см. build_select).
+
+        Лишнее поле archived в строке пропускается фабрикой строк Task.
+        """
+        query, values = build_select(params, table="Scheduler_archive")
+        with self.pool.reader() as connection, \
+                self.instrumentation.measure("get_archived_records",
+                                             connection, query,
+                                             values) as measured:
+            cursor = connection.cursor()
+            cursor.row_factory = self.row_factory
+            cursor.execute(query, values)
+            records = cursor.fetchall()
+            measured.rows = len(records)
+            return records
+
+    def search_archive(self, text, limit=100, offset=0):
+        """Ищет записи архива по тексту, как search.
+
+        Возвращает сами записи в порядке релевантности.
+        """
+        query = _match_query(text)
+        if not query:
+            return []
+        sql = """SELECT a.* FROM Scheduler_archive_fts
+                 JOIN Scheduler_archive AS a
+                     ON a.id = Scheduler_archive_fts.rowid
+                 WHERE Scheduler_archive_fts MATCH ?
+                 ORDER BY rank LIMIT ? OFFSET ?"""
+        values = (query, limit, offset)
+        with self.pool.reader() as connection, \
+                self.instrumentation.measure("search_archive", connection,
+                                             sql, values) as measured:
+            cursor = connection.cursor()
+            cursor.row_factory = self.row_factory
+            cursor.execute(sql, values)
+            records = cursor.fetchall()
+            measured.rows = len(records)
+            return records
+
+    def get_change_version(self):
+        """Возвращает номер последнего изменения в журнале задач.
+
+        Если журнал очищен целиком, номер берется из sqlite_sequence:
+        AUTOINCREMENT не выдает номера повторно.
+        """
+        sql = """SELECT COALESCE(
+                     (SELECT MAX(version) FROM Scheduler_changes),
+                     (SELECT seq FROM sqlite_sequence
+                      WHERE name = 'Scheduler_changes'), 0)"""
+        with self.pool.reader() as connection:
+            return connection.execute(sql).fetchone()[0]
+
+    def get_change_horizon(self):
+        """Возвращает версию, изменения после которой есть в журнале.
+
+        Изменения до нее удалены prune_changes; читатель с более ранней
+        версией уже не получит их из журнала.
+        """
+        sql = """SELECT COALESCE(
+                     (SELECT MIN(version) - 1 FROM Scheduler_changes),
+                     (SELECT seq FROM sqlite_sequence
+                      WHERE name = 'Scheduler_changes'), 0)"""
+        with self.pool.reader() as connection:
+            return connection.execute(sql).fetchone()[0]
+
+    def get_changes_since(self, version, limit=1000):
+        """Возвращает изменения после указанной версии.
+
+        Результат - список (version, task_id, operation) по возрастанию
+        версии, operation - 'insert', 'update' или 'delete'.
+        """
+        sql = """SELECT version, task_id, operation FROM Scheduler_changes
+                 WHERE version > ? ORDER BY version LIMIT ?"""
+        with self.pool.reader() as connection, \
+                self.instrumentation.measure("get_changes_since",
+                                             connection, sql,
+                                             (version, limit)) as measured:
+            changes = connection.execute(sql, (version, limit)).fetchall()
+            measured.rows = len(changes)
+            return changes
+
+    def prune_changes(self, before_version):
+        """Удаляет из журнала изменения с версией меньше before_version."""
+        sql = """DELETE FROM Scheduler_changes WHERE version < ?"""
+        with self._writing("prune_changes", sql,
+                           (before_version,)) as measured:
+            self.cursor = self.connection.cursor()
+            self.cursor.execute(sql, (before_version,))
+            self._commit()
+            measured.rows = self.cursor.rowcount
+            return self.cursor.rowcount
+
+    def data_version(self):
+        """Возвращает счетчик изменений базы (см. ConnectionPool)."""
+        return self.pool.data_version()
+
+    def iter_records(self, batch_size=500, raw=False, **params):
+        """Построчно отдает записи Scheduler, не загружая их все в память.
+
+        Параметры фильтра и сортировки те же, что у get_records_by_params
+        (см. build_select). Строки читаются из базы пачками по batch_size
+        через fetchmany. Для продолжения прерванного обхода передайте
+        order_by и after - ключ последней полученной записи. raw отдает
+        строки кортежами значений базы без row_factory.
+
+        В замер входит только время чтения из базы, без обработки строк
+        вызывающим кодом между пачками.
+        """
+        query, values = build_select(params)
+        seconds = 0.0
+        rows = 0
+        with self.pool.reader() as connection:
+            cursor = connection.cursor()
+            cursor.row_factory = None if raw else self.row_factory
+            start = time.perf_counter()
+            try:
+                cursor.execute(query, values)
+                while True:
+                    records = cursor.fetchmany(batch_size)
+                    seconds += time.perf_counter() - start
+                    if not records:
+                        break
+                    rows += len(records)
+                    yield from records
+                    start = time.perf_counter()
+            except Error:
+                self.instrumentation.record("iter_records", seconds, rows,
+                                            error=True)
+                raise
+            self.instrumentation.record("iter_records", seconds, rows,
+                                        connection, query, values)
+
+    def close_connection(self):
+        """Закрывает соединение с базой данных."""
+        if self.connection:
+            self.pool.close()
+            logger.debug("Соединение с базой данных закрыто")
+
+
+if __name__ == '__main__':
+    connector = DB_Connector('TaskManager.db')
+    connector.create_connection('TaskManager.db')
@@ -0,0 +1,77 @@
+from PyQt6.QtCore import QObject, QTimer, pyqtSignal
+
+from deadlines import DeadlineWatcher
+
+# Самая длинная пауза таймера, мс: после нее время пересчитывается, даже
+# если часы системы перевели
+MAX_DELAY_MS = 60 * 60 * 1000
+
+
+class DeadlineNotifier(QObject):
+    """Сигналы due(task) и overdue(task) для дедлайнов задач.
+
+    Обертка DeadlineWatcher для интерфейса: один таймер взводится на
+    ближайшее событие, а не опрашивает базу. Задачи загружаются в фоне
+    через DbRunner, изменения приходят от TaskScheduler.
+    """
+
+    due = pyqtSignal(object)
+    overdue = pyqtSignal(object)
+    # Ближайшее событие могло измениться; подписчики TaskScheduler
+    # вызываются в фоновых потоках, а таймер взводится в потоке интерфейса
+    _rescheduled = pyqtSignal()
+
+    def __init__(self, scheduler, parent=None) -> None:
+        super().__init__(parent)
+        self.watcher = DeadlineWatcher(scheduler,
+                                       on_due=self.due.emit,
+                                       on_overdue=self.overdue.emit,
+                                       on_schedule=self._rescheduled.emit)
+        self.timer = QTimer(self)
+        self.timer.setSingleShot(True)
+        self.timer.timeout.connect(self._fire)
+        self._rescheduled.connect(self._arm)
+        self.runner = None
+
+    def start(self, runner=None) -> None:
+        """Загружает дедлайны (в фоне, если передан runner)."""
+        self.runner = runner
+        self._run(self.watcher.start)
+
+    def _run(self, load) -> None:
+        """Выполняет загрузку задач и затем проверяет события."""
+        if self.runner is None:
+            load()
+            self._fire()
+        else:
+            self.runner.submit(load, on_result=lambda _: self._fire(),
+                               channel=self)
+
+    def stop(self) -> None:
+        """Останавливает таймер и отписывается от изменений."""
+        self.timer.stop()
+        self.watcher.stop()
+
+    def apply_changes(self, changes) -> None:
+        """Учитывает изменения, сделанные другими окнами и процессами.
+
+        Если изменения потеряны (changes.reset), задачи загружаются
+        заново, в фоне, если при запуске был передан runner.
+        """
+        if changes.reset:
+            self._run(self.watcher.reload)
+        else:
+            self.watcher.apply_changes(changes)
+
+    def _fire(self) -> None:
+        """Отправляет сигналы наступивших событий и взводит таймер."""
+        self._arm(self.watcher.poll())
+
+    def _arm(self, delay=None) -> None:
+        """Взводит таймер на ближайшее событие."""
+        if delay is None:
+            delay = self.watcher.seconds_until_next()
+        if delay is None:
+            self.timer.stop()
+            return
+        self.timer.start(min(int(delay * 1000) + 1, MAX_DELAY_MS))
@@ -0,0 +1,174 @@
+import heapq
+import threading
+from datetime import date, datetime, time, timedelta
+from itertools import count
+
+from task import Status
+
+# События дедлайна: наступил день дедлайна, день дедлайна прошел
+DUE = "due"
+OVERDUE = "overdue"
+
+# Статусы незавершенных задач, за дедлайнами которых нужно следить
+OPEN_STATUSES = (Status.NEW, Status.IN_PROGRESS)
+
+
+class DeadlineWatcher:
+    """Следит за дедлайнами незавершенных задач без опроса таблицы.
+
+    Задачи загружаются один раз запросом по индексу (status, deadline),
+    затем очередь событий в куче обновляется по оповещениям
+    TaskScheduler (add_listener): изменение одной задачи стоит
+    O(log n). poll() вызывает on_due(task) в день дедлайна и
+    on_overdue(task) на следующий день, если задача еще не завершена.
+    Каждое событие приходит один раз для каждого значения дедлайна;
+    после завершения и повторного открытия задачи события приходят
+    заново.
+
+    Таймер ведет вызывающий код: seconds_until_next() говорит, когда
+    нужно вызвать poll(), а on_schedule() вызывается, когда ближайшее
+    событие могло измениться. clock возвращает текущее время.
+    """
+
+    def __init__(self, scheduler, on_due=None, on_overdue=None,
+                 on_schedule=None, clock=datetime.now):
+        self.scheduler = scheduler
+        self.on_due = on_due
+        self.on_overdue = on_overdue
+        self.on_schedule = on_schedule
+        self.clock = clock
+        self._lock = threading.RLock()
+        self._heap = []   # (время, номер, ИД задачи, дедлайн, событие)
+        self._tasks = {}  # ИД -> незавершенная задача с дедлайном
+        self._fired = {}  # ИД -> (дедлайн, последнее событие)
+        self._order = count()
+
+    def start(self):
+        """Загружает задачи и подписывается на их изменения.
+
+        Подписка оформляется до загрузки, поэтому изменения, сделанные
+        во время чтения, не теряются: они применяются после него.
+        """
+        self.scheduler.add_listener(self.apply_changes)
+        self.reload()
+
+    def reload(self):
+        """Заново загружает незавершенные задачи с дедлайнами.
+
+        Уже отправленные события сохраняются для задач с тем же
+        дедлайном, для остальных забываются.
+        """
+        now = self.clock()
+        with self._lock:
+            self._heap = []
+            self._tasks = {}
+            for task in self.scheduler.iter_tasks(status__in=OPEN_STATUSES,
+                                                  deadline__gt=""):
+                if isinstance(task.deadline, date):
+                    self._tasks[task.id] = task
+                    self._heap.append(self._event(task, now))
+            heapq.heapify(self._heap)
+            self._fired = {
+                record_id: fired for record_id, fired in self._fired.items()
+                if record_id in self._tasks
+                and self._tasks[record_id].deadline == fired[0]}
+        self._schedule()
+
+    def stop(self):
+        """Отписывается от изменений задач."""
+        self.scheduler.remove_listener(self.apply_changes)
+
+    def apply_changes(self, changes):
+        """Обновляет очередь событий по ChangeSet из TaskScheduler."""
+        if changes.reset:
+            self.reload()  # Изменения потеряны, задачи читаются заново
+            return
+        now = self.clock()
+        with self._lock:
+            for record_id in changes.deleted:
+                self._tasks.pop(record_id, None)
+                self._fired.pop(record_id, None)
+            for task in changes.tasks:
+                old = self._tasks.get(task.id)
+                if (task.status not in OPEN_STATUSES
+                        or not isinstance(task.deadline, date)):
+                    # Задача снова начнется с новыми событиями
+                    self._tasks.pop(task.id, None)
+                    self._fired.pop(task.id, None)
+                    continue
+                self._tasks[task.id] = task
+                if old is None or old.deadline != task.deadline:
+                    self._fired.pop(task.id, None)
+                    heapq.heappush(self._heap, self._event(task, now))
+            if len(self._heap) > 2 * len(self._tasks) + 64:
+                self._compact(now)
+        self._schedule()
+
+    def poll(self):
+        """Вызывает обработчики наступивших событий.
+
+        Возвращает число секунд до следующего события или None.
+        """
+        now = self.clock()
+        fired = []
+        with self._lock:
+            while self._heap and self._heap[0][0] <= now:
+                _, _, record_id, deadline, kind = heapq.heappop(self._heap)
+                task = self._tasks.get(record_id)
+                if not self._pending(task, deadline, kind):
+                    continue  # Задачу изменили, завершили или удалили
+                self._fired[record_id] = (deadline, kind)
+                fired.append((kind, task))
+                if kind == DUE:
+                    heapq.heappush(self._heap, self._event(task, now))
+        for kind, task in fired:
+            handler = self.on_due if kind == DUE else self.on_overdue
+            if handler is not None:
+                handler(task)
+        return self.seconds_until_next()
+
+    def seconds_until_next(self):
+        """Возвращает число секунд до ближайшего события или None."""
+        with self._lock:
+            if not self._heap:
+                return None
+            delay = (self._heap[0][0] - self.clock()).total_seconds()
+        return max(delay, 0.0)
+
+    def overdue(self):
+        """Возвращает незавершенные задачи с прошедшим дедлайном."""
+        today = self.clock().date()
+        with self._lock:
+            return sorted((task for task in self._tasks.values()
+                           if task.deadline < today),
+                          key=lambda task: (task.deadline, task.id))
+
+    def _event(self, task, now):
+        """Возвращает элемент кучи со следующим событием задачи."""
+        due = datetime.combine(task.deadline, time())
+        overdue = due + timedelta(days=1)
+        fired = self._fired.get(task.id)
+        if now >= overdue or fired == (task.deadline, DUE):
+            when, kind = overdue, OVERDUE
+        else:
+            when, kind = due, DUE
+        return (when, next(self._order), task.id, task.deadline, kind)
+
+    def _pending(self, task, deadline, kind):
+        """Проверяет, что событие из кучи еще актуально."""
+        if task is None or task.deadline != deadline:
+            return False
+        fired = self._fired.get(task.id)
+        return fired != (deadline, kind) and fired != (deadline, OVERDUE)
+
+    def _compact(self, now):
+        """Убирает из кучи устаревшие события после многих изменений."""
+        self._heap = [self._event(task, now) for task in self._tasks.values()
+                      if self._fired.get(task.id) != (task.deadline,
+                                                      OVERDUE)]
+        heapq.heapify(self._heap)
+
+    def _schedule(self):
+        """Сообщает, что время ближайшего события могло измениться."""
+        if self.on_schedule is not None:
+            self.on_schedule()
@@ -0,0 +1,202 @@
+import logging
+import os
+import threading
+import time
+from collections import deque, namedtuple
+from contextlib import contextmanager
+
+logger = logging.getLogger(__name__)
+
+# Границы корзин гистограммы длительности операций, секунды
+BUCKETS = (0.0005, 0.001, 0.005, 0.01, 0.05, 0.1, 0.5, 1.0, 5.0)
+
+# Медленный запрос: операция, длительность, текст, параметры, число строк
+# и план (строки EXPLAIN QUERY PLAN)
+SlowQuery = namedtuple("SlowQuery",
+                       ["operation", "ms", "sql", "params", "rows", "plan"])
+
+
+class Measurement:
+    """Замер одной операции. Блок measure записывает сюда число строк."""
+
+    __slots__ = ("rows",)
+
+    def __init__(self):
+        self.rows = 0
+
+
+class _OperationStats:
+    """Накопленные счетчики одной операции."""
+
+    __slots__ = ("count", "errors", "rows", "seconds", "max_seconds",
+                 "buckets")
+
+    def __init__(self):
+        self.count = 0
+        self.errors = 0
+        self.rows = 0
+        self.seconds = 0.0
+        self.max_seconds = 0.0
+        self.buckets = [0] * len(BUCKETS)
+
+
+class NullInstrumentation:
+    """Инструментирование по умолчанию: ничего не замеряет."""
+
+    @contextmanager
+    def measure(self, operation, connection=None, sql=None, params=None):
+        yield Measurement()
+
+    def record(self, operation, seconds, rows=0, connection=None,
+               sql=None, params=None, error=False):
+        pass
+
+
+class Instrumentation(NullInstrumentation):
+    """Счетчики времени и числа строк операций DB_Connector.
+
+    Для каждой операции (имени метода DB_Connector) считаются вызовы,
+    ошибки, строки, суммарное и максимальное время и гистограмма
+    длительностей. Запросы (замеры с текстом sql) дольше slow_ms
+    миллисекунд пишутся в журнал и сохраняются в slow_queries (последние
+    max_slow) вместе с планом EXPLAIN QUERY PLAN, если explain включен.
+    Ожидание блокировки записи DB_Connector записывает как операцию
+    lock_wait, а паузы перед повторами в занятую базу - как busy_retry.
+
+    connector = DB_Connector("scheduler.db", instrumentation=Instrumentation())
+    ...
+    connector.instrumentation.snapshot()
+    connector.instrumentation.dump_prometheus("db.prom")
+    """
+
+    def __init__(self, slow_ms=100.0, explain=True, max_slow=100):
+        self.slow_ms = slow_ms
+        self.explain = explain
+        self.slow_queries = deque(maxlen=max_slow)
+        self._stats = {}  # Операция -> _OperationStats
+        self._lock = threading.Lock()
+
+    @contextmanager
+    def measure(self, operation, connection=None, sql=None, params=None):
+        """Замеряет блок кода как одну операцию.
+
+        connection, sql и params нужны для плана медленного запроса;
+        блок должен выполняться, пока соединение еще захвачено.
+        """
+        measurement = Measurement()
+        start = time.perf_counter()
+        try:
+            yield measurement
+        except Exception:
+            self.record(operation, time.perf_counter() - start,
+                        measurement.rows, error=True)
+            raise
+        self.record(operation, time.perf_counter() - start,
+                    measurement.rows, connection, sql, params)
+
+    def record(self, operation, seconds, rows=0, connection=None,
+               sql=None, params=None, error=False):
+        """Добавляет замер операции длительностью seconds."""
+        with self._lock:
+            stats = self._stats.get(operation)
+            if stats is None:
+                stats = self._stats[operation] = _OperationStats()
+            stats.count += 1
+            stats.errors += error
+            stats.rows += rows
+            stats.seconds += seconds
+            stats.max_seconds = max(stats.max_seconds, seconds)
+            for index, bound in enumerate(BUCKETS):
+                if seconds <= bound:
+                    stats.buckets[index] += 1
+                    break
+        if sql is not None and seconds * 1000 >= self.slow_ms:
+            self._slow_query(operation, seconds * 1000, rows,
+                             connection, sql, params)
+
+    def _slow_query(self, operation, ms, rows, connection, sql, params):
+        """Сохраняет медленный запрос вместе с его планом."""
+        plan = None
+        if self.explain and connection is not None and sql is not None:
+            try:
+                plan = [row[-1] for row in connection.execute(
+                    "EXPLAIN QUERY PLAN " + sql, params or ())]
+            except Exception as ex:
+                plan = [f"нет плана: {ex}"]
+        self.slow_queries.append(
+            SlowQuery(operation, round(ms, 3), sql, params, rows, plan))
+        logger.warning("Медленный запрос %s: %.1f мс, строк %d, план %s",
+                       operation, ms, rows, plan,
+                       extra={"operation": operation, "ms": round(ms, 3),
+                              "rows": rows, "plan": plan})
+
+    def snapshot(self):
+        """Возвращает счетчики операций: операция -> словарь значений."""
+        with self._lock:
+            return {
+                operation: {
+                    "count": stats.count,
+                    "errors": stats.errors,
+                    "rows": stats.rows,
+                    "total_ms": stats.seconds * 1000,
+                    "avg_ms": stats.seconds * 1000 / stats.count,
+                    "max_ms": stats.max_seconds * 1000,
+                }
+                for operation, stats in self._stats.items()
+            }
+
+    def reset(self):
+        """Обнуляет счетчики и список медленных запросов."""
+        with self._lock:
+            self._stats = {}
+            self.slow_queries.clear()
+
+    def prometheus_text(self, prefix="taskmanager_db"):
+        """Возвращает счетчики в текстовом формате Prometheus."""
+        with self._lock:
+            items = sorted(self._stats.items())
+            slow = len(self.slow_queries)
+            lines = [
+                f"# HELP {prefix}_operation_seconds "
+                "Длительность операций DB_Connector.",
+                f"# TYPE {prefix}_operation_seconds histogram",
+            ]
+            for operation, stats in items:
+                label = f'operation="{operation}"'
+                cumulative = 0
+                for bound, count in zip(BUCKETS, stats.buckets):
+                    cumulative += count
+                    lines.append(f'{prefix}_operation_seconds_bucket'
+                                 f'{{{label},le="{bound}"}} {cumulative}')
+                lines.append(f'{prefix}_operation_seconds_bucket'
+                             f'{{{label},le="+Inf"}} {stats.count}')
+                lines.append(f"{prefix}_operation_seconds_sum{{{label}}} "
+                             f"{stats.seconds}")
+                lines.append(f"{prefix}_operation_seconds_count{{{label}}} "
+                             f"{stats.count}")
+            counters = (
+                ("rows_total", "rows", "Строки, обработанные операциями."),
+                ("errors_total", "errors", "Операции, завершенные ошибкой."),
+            )
+            for name, field, text in counters:
+                lines.append(f"# HELP {prefix}_{name} {text}")
+                lines.append(f"# TYPE {prefix}_{name} counter")
+                for operation, stats in items:
+                    lines.append(f'{prefix}_{name}{{operation="{operation}"}} '
+                                 f"{getattr(stats, field)}")
+        lines.append(f"# HELP {prefix}_slow_queries "
+                     "Сохраненные медленные запросы.")
+        lines.append(f"# TYPE {prefix}_slow_queries gauge")
+        lines.append(f"{prefix}_slow_queries {slow}")
+        return "\n".join(lines) + "\n"
+
+    def dump_prometheus(self, path, prefix="taskmanager_db"):
+        """Записывает счетчики в файл для textfile-сборщика Prometheus.
+
+        Файл заменяется целиком, поэтому сборщик не прочитает его
+        наполовину записанным.
+        """
+        temp_path = f"{path}.{os.getpid()}.tmp"
+        with open(temp_path, "w", encoding="utf-8") as file:
+            file.write(self.prometheus_text(prefix))
+        os.replace(temp_path, path)
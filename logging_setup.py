@@ -0,0 +1,103 @@
+import atexit
+import copy
+import json
+import logging
+import queue
+from logging.handlers import QueueHandler, QueueListener
+
+# Формат строк журнала по умолчанию
+LOG_FORMAT = "%(asctime)s %(levelname)s %(name)s [%(threadName)s] %(message)s"
+
+# Атрибуты любой записи журнала; остальные пришли через extra
+_RECORD_FIELDS = set(vars(logging.LogRecord("", 0, "", 0, "", (), None)))
+_RECORD_FIELDS.update({"message", "asctime"})
+
+_listener = None  # Запущенный QueueListener
+
+
+class _QueueHandler(QueueHandler):
+    """Кладет запись в очередь, сохраняя трассировку исключения отдельно.
+
+    Стандартный QueueHandler склеивает трассировку с сообщением, и она
+    не попала бы в отдельное поле JSON.
+    """
+
+    def prepare(self, record):
+        record = copy.copy(record)
+        record.msg = record.message = record.getMessage()
+        record.args = None
+        if record.exc_info:
+            record.exc_text = logging.Formatter().formatException(
+                record.exc_info)
+        record.exc_info = None
+        return record
+
+
+class JsonFormatter(logging.Formatter):
+    """Форматирует запись журнала одной строкой JSON.
+
+    Кроме времени, уровня, имени журнала и сообщения в строку попадают
+    поля, переданные через extra, например
+    logger.warning("Медленный запрос", extra={"operation": "search"}).
+    """
+
+    def format(self, record):
+        data = {
+            "time": self.formatTime(record),
+            "level": record.levelname,
+            "logger": record.name,
+            "thread": record.threadName,
+            "message": record.getMessage(),
+        }
+        data.update((key, value) for key, value in vars(record).items()
+                    if key not in _RECORD_FIELDS)
+        if record.exc_info and not record.exc_text:
+            record.exc_text = self.formatException(record.exc_info)
+        if record.exc_text:
+            data["exception"] = record.exc_text
+        return json.dumps(data, ensure_ascii=False, default=str)
+
+
+def setup_logging(level=logging.INFO, handlers=None, structured=False):
+    """Направляет журнал приложения через очередь в фоновый поток.
+
+    Вызывающий поток только кладет запись в очередь (QueueHandler), а
+    форматирование и вывод в handlers (по умолчанию stderr) выполняет
+    QueueListener в своем потоке. structured включает вывод строками JSON.
+    Повторный вызов заменяет прежнюю настройку. Очередь сбрасывается при
+    выходе из программы.
+    """
+    global _listener
+    stop_logging()
+
+    if handlers is None:
+        handlers = [logging.StreamHandler()]
+    formatter = JsonFormatter() if structured else logging.Formatter(
+        LOG_FORMAT)
+    for handler in handlers:
+        if handler.formatter is None:
+            handler.setFormatter(formatter)
+
+    log_queue = queue.SimpleQueue()
+    root = logging.getLogger()
+    for handler in list(root.handlers):
+        if isinstance(handler, QueueHandler):
+            root.removeHandler(handler)
+    root.addHandler(_QueueHandler(log_queue))
+    root.setLevel(level)
+
+    _listener = QueueListener(log_queue, *handlers,
+                              respect_handler_level=True)
+    _listener.start()
+    return _listener
+
+
+def stop_logging():
+    """Выводит оставшиеся в очереди записи и останавливает поток журнала."""
+    global _listener
+    if _listener is not None:
+        _listener.stop()
+        _listener = None
+
+
+atexit.register(stop_logging)
@@ -0,0 +1,84 @@
+import threading
+import time
+from collections import OrderedDict
+
+
+class QueryCache:
+    """Потокобезопасный LRU-кэш результатов запросов с временем жизни.
+
+    Хранит не больше maxsize результатов, каждый не дольше ttl секунд.
+    Считает попадания, промахи и сбросы для cache_stats().
+
+    Поколение generation растет при каждом сбросе. Результат запроса,
+    начатого до сброса, не сохраняется, чтобы в кэш не попали данные,
+    прочитанные до изменения.
+    """
+
+    def __init__(self, maxsize=128, ttl=60.0):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._entries = OrderedDict()  # Ключ -> (время записи, результат)
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.invalidations = 0
+        self.generation = 0
+
+    def get(self, key):
+        """Возвращает (True, результат) при попадании, иначе (False, None)."""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and time.monotonic() - entry[0] < self.ttl:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return True, entry[1]
+            if entry is not None:
+                del self._entries[key]  # Истекло время жизни
+            self.misses += 1
+            return False, None
+
+    def put(self, key, value, generation=None):
+        """Сохраняет результат, вытесняя самый давно использованный.
+
+        generation - поколение кэша на момент начала запроса.
+        """
+        if self.maxsize <= 0:
+            return
+        with self._lock:
+            if generation is not None and generation != self.generation:
+                return
+            self._entries[key] = (time.monotonic(), value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+
+    def clear(self):
+        """Сбрасывает все сохраненные результаты."""
+        with self._lock:
+            self.generation += 1
+            if self._entries:
+                self._entries.clear()
+                self.invalidations += 1
+
+    def stats(self):
+        """Возвращает счетчики кэша."""
+        with self._lock:
+            total = self.hits + self.misses
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": self.hits / total if total else 0.0,
+                "size": len(self._entries),
+                "maxsize": self.maxsize,
+                "invalidations": self.invalidations,
+            }
+
+
+def freeze(value):
+    """Делает значение параметра запроса пригодным для ключа кэша."""
+    if isinstance(value, dict):
+        return tuple(sorted((key, freeze(item))
+                            for key, item in value.items()))
+    if isinstance(value, (list, tuple, set, frozenset, range)):
+        return tuple(freeze(item) for item in value)
+    return value
@@ -0,0 +1,261 @@
+import calendar
+import operator
+from collections import namedtuple
+from datetime import date, timedelta
+
+from task import Status, to_db
+
+# Частоты повторения: каждые interval дней, недель или месяцев
+DAILY = "daily"
+WEEKLY = "weekly"
+MONTHLY = "monthly"
+FREQUENCIES = (DAILY, WEEKLY, MONTHLY)
+
+# На сколько дней вперед от сегодня разворачиваются повторы, если запрос
+# не ограничивает дедлайн сверху
+HORIZON_DAYS = 365
+
+# Правило повторения: задача-образец серии, частота, интервал и
+# последняя дата повторов (date или None)
+Recurrence = namedtuple("Recurrence",
+                        ["task_id", "frequency", "interval", "until"])
+
+# Серия: правило, задача-образец (первое вхождение, ее дедлайн - начало
+# серии) и даты вхождений, которые изменены отдельными задачами или
+# удалены
+Series = namedtuple("Series", ["rule", "template", "skipped"])
+
+# Младшие биты ИД вхождения - номер дня (date.toordinal), вмещают и
+# date.max. Триггер Scheduler_occurrences_changes (миграция 5 в
+# db.MIGRATIONS) пишет ИД вхождений в журнал изменений с тем же сдвигом
+_DAY_BITS = 22
+
+# Проверки фильтров build_select для вхождений, которых нет в базе
+_CHECKS = {
+    "eq": operator.eq, "ne": operator.ne,
+    "lt": operator.lt, "le": operator.le,
+    "gt": operator.gt, "ge": operator.ge,
+    "in": lambda value, values: value in values,
+}
+
+
+def occurrence_id(series_id, day):
+    """Возвращает ИД вхождения серии series_id на дату day.
+
+    ИД вхождений отрицательные и не пересекаются с ИД задач в базе, но
+    остаются числами: сортировка и постраничная выборка по ключу
+    (значение, ИД) работают с ними так же, как с задачами.
+    """
+    return -((series_id << _DAY_BITS) | day.toordinal())
+
+
+def is_occurrence(record_id):
+    """Проверяет, что ИД принадлежит вхождению серии, а не задаче."""
+    return isinstance(record_id, int) and record_id < 0
+
+
+def split_occurrence_id(record_id):
+    """Возвращает (ИД серии, дата) по ИД вхождения."""
+    value = -record_id
+    return (value >> _DAY_BITS,
+            date.fromordinal(value & ((1 << _DAY_BITS) - 1)))
+
+
+def _add_months(day, months):
+    """Сдвигает дату на months месяцев, не выходя за конец месяца."""
+    year, month = divmod(day.month - 1 + months, 12)
+    year += day.year
+    return day.replace(year=year, month=month + 1,
+                       day=min(day.day, calendar.monthrange(year,
+                                                            month + 1)[1]))
+
+
+def occurrence_dates(rule, start, first, last):
+    """Отдает даты повторов после start в диапазоне [first, last].
+
+    start - дедлайн задачи-образца. Повторы считаются от start, а не друг
+    от друга, поэтому ежемесячная серия с 31 числа попадает на последний
+    день коротких месяцев и возвращается к 31 числу.
+    """
+    if rule.until is not None:
+        last = min(last, rule.until)
+    if rule.frequency == MONTHLY:
+        months = (first.year - start.year) * 12 + first.month - start.month
+        number = max(1, months // rule.interval)
+        day = _add_months(start, number * rule.interval)
+        while day <= last:
+            if day >= first:
+                yield day
+            number += 1
+            day = _add_months(start, number * rule.interval)
+        return
+    step = rule.interval * (7 if rule.frequency == WEEKLY else 1)
+    number = max(1, -(-(first - start).days // step))
+    day = start + timedelta(days=number * step)
+    while day <= last:
+        yield day
+        day += timedelta(days=step)
+
+
+def occurrence(series, day):
+    """Возвращает вхождение серии на дату day в виде Task.
+
+    Вхождение повторяет поля образца, кроме ИД, дедлайна и статуса: оно
+    еще не начато.
+    """
+    template = series.template
+    return template._replace(id=occurrence_id(template.id, day),
+                             status=Status.NEW, deadline=day)
+
+
+def find_occurrence(series_list, record_id):
+    """Возвращает вхождение по ИД или None, если его нет в сериях."""
+    series_id, day = split_occurrence_id(record_id)
+    for series in series_list:
+        if series.template.id == series_id:
+            start = series.template.deadline
+            if (not isinstance(start, date) or day in series.skipped
+                    or not any(occurrence_dates(series.rule, start,
+                                                day, day))):
+                return None
+            return occurrence(series, day)
+    return None
+
+
+def make_series(rules, templates, exceptions):
+    """Собирает серии из строк базы.
+
+    rules - (task_id, frequency, interval, until), templates - задачи Task
+    серий, exceptions - (series_id, occurrence) измененных вхождений.
+    Правила без задачи-образца пропускаются.
+    """
+    templates = {task.id: task for task in templates}
+    skipped = {}
+    for series_id, day in exceptions:
+        skipped.setdefault(series_id, set()).add(_parse_date(day))
+    return [Series(Recurrence(task_id, frequency, interval,
+                              _parse_date(until)),
+                   templates[task_id], skipped.get(task_id, set()))
+            for task_id, frequency, interval, until in rules
+            if task_id in templates]
+
+
+def _parse_date(value):
+    """Разбирает дату ГГГГ-ММ-ДД, для других строк возвращает None."""
+    try:
+        day = date.fromisoformat(value)
+    except (TypeError, ValueError):
+        return None
+    return day if day.isoformat() == value else None
+
+
+def _window(params, horizon):
+    """Возвращает диапазон дедлайнов [first, last] по фильтрам запроса."""
+    first, last = date.min, horizon
+    for key, value in params.items():
+        column, _, operator_name = key.partition("__")
+        if column != "deadline":
+            continue
+        if operator_name == "in":
+            days = [day for day in map(_parse_date, value) if day]
+            first = max(first, min(days, default=date.max))
+            last = min(last, max(days, default=date.min))
+            continue
+        day = _parse_date(value)
+        if day is None:
+            continue
+        if operator_name in ("", "eq", "ge", "gt"):
+            first = max(first, day)
+        if operator_name in ("", "eq", "le", "lt"):
+            last = min(last, day)
+    return first, last
+
+
+def _matches(task, params):
+    """Проверяет вхождение фильтрами build_select, как это сделал бы SQL."""
+    for key, expected in params.items():
+        column, _, operator_name = key.partition("__")
+        value = to_db(getattr(task, column))
+        if value is None:
+            return False  # Сравнение с NULL в SQL ложно
+        if operator_name == "in":
+            expected = set(expected)
+        if not _CHECKS[operator_name or "eq"](value, expected):
+            return False
+    return True
+
+
+def sort_key(task, order_by):
+    """Ключ сортировки в порядке ORDER BY поле, id (NULL раньше всех)."""
+    if order_by is None or order_by == "id":
+        return task.id
+    value = to_db(getattr(task, order_by))
+    return ((0, "") if value is None else (1, value)), task.id
+
+
+def expand(tasks, series_list, params, horizon=None):
+    """Добавляет к странице задач вхождения серий из того же окна.
+
+    tasks - результат запроса с параметрами build_select params
+    (значения в виде для базы), series_list - серии Series. Вхождения
+    создаются только для дедлайнов в окне запроса: между фильтрами по
+    deadline, не дальше horizon (по умолчанию HORIZON_DAYS от сегодня),
+    а при сортировке по дедлайну - между ключом after и последней
+    задачей полной страницы. Возвращает страницу в порядке запроса и не
+    длиннее limit.
+    """
+    params = dict(params)
+    order_by = params.pop("order_by", None)
+    descending = params.pop("descending", False)
+    after = params.pop("after", None)
+    limit = params.pop("limit", None)
+    if after is not None and order_by is None:
+        order_by = "id"
+    if horizon is None:
+        horizon = date.today() + timedelta(days=HORIZON_DAYS)
+
+    first, last = _window(params, horizon)
+    if order_by == "deadline":
+        # Страница занимает дедлайны от ключа after до последней задачи,
+        # если страница полная: остальные вхождения попадут в другие
+        page_start = _parse_date(after[0]) if after is not None else None
+        page_end = None
+        if tasks and limit is not None and len(tasks) == limit:
+            page_end = _parse_date(to_db(tasks[-1].deadline))
+        if descending:
+            page_start, page_end = page_end, page_start
+        if page_start is not None:
+            first = max(first, page_start)
+        if page_end is not None:
+            last = min(last, page_end)
+
+    after_key = None
+    if after is not None:
+        after_key = (after[-1] if order_by == "id" else
+                     ((0, "") if after[0] is None else (1, after[0]),
+                      after[-1]))
+    found = []
+    for series in series_list:
+        start = series.template.deadline
+        if not isinstance(start, date):
+            continue
+        for day in occurrence_dates(series.rule, start, max(first, start),
+                                    last):
+            if day in series.skipped:
+                continue
+            task = occurrence(series, day)
+            if not _matches(task, params):
+                continue
+            if after_key is not None:
+                key = sort_key(task, order_by)
+                if (key <= after_key) if not descending else (
+                        key >= after_key):
+                    continue
+            found.append(task)
+    if not found:
+        return tasks
+    page = list(tasks) + found
+    if order_by is not None:
+        page.sort(key=lambda task: sort_key(task, order_by),
+                  reverse=descending)
+    return page if limit is None else page[:limit]
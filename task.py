@@ -0,0 +1,103 @@
+from datetime import date, datetime
+from enum import IntEnum
+from typing import NamedTuple, Union
+
+
+class Priority(IntEnum):
+    """Приоритет задачи. В базе хранится надписью из PRIORITY_LABELS."""
+
+    LOW = 0
+    MEDIUM = 1
+    HIGH = 2
+
+    @property
+    def label(self) -> str:
+        return PRIORITY_LABELS[self]
+
+    def __str__(self) -> str:
+        return self.label
+
+
+class Status(IntEnum):
+    """Статус задачи. В базе хранится надписью из STATUS_LABELS."""
+
+    NEW = 0
+    IN_PROGRESS = 1
+    CANCELLED = 2
+    DONE = 3
+
+    @property
+    def label(self) -> str:
+        return STATUS_LABELS[self]
+
+    def __str__(self) -> str:
+        return self.label
+
+
+# Надписи в том порядке, в котором они показаны в интерфейсе
+PRIORITY_LABELS = ["низкий", "средний", "высокий"]
+STATUS_LABELS = ["новая задача", "в работе", "отменена", "решено"]
+
+_PRIORITY_BY_LABEL = {label: Priority(i)
+                      for i, label in enumerate(PRIORITY_LABELS)}
+_STATUS_BY_LABEL = {label: Status(i) for i, label in enumerate(STATUS_LABELS)}
+
+
+class Task(NamedTuple):
+    """Запись таблицы Scheduler.
+
+    Кортеж без словаря атрибутов: поля доступны и по имени, и по индексу,
+    как у строки из sqlite3. Приоритет и статус хранятся общими
+    экземплярами перечислений, дедлайн и дата создания разобраны один раз
+    при чтении. Неизвестные надписи приоритета и статуса остаются строками,
+    как и даты не в том ISO-виде, в котором их сохраняет to_db: значение
+    поля сортировки должно совпадать с хранимым, иначе ключ постраничного
+    чтения (значение, id) не найдет следующую страницу.
+    """
+
+    id: int
+    task_name: str
+    description: str
+    priority: Union[Priority, str]
+    status: Union[Status, str]
+    deadline: Union[date, str, None]
+    comment: str
+    created: Union[datetime, str, None]
+
+    @classmethod
+    def from_row(cls, cursor, row) -> "Task":
+        """Фабрика строк для sqlite3 (Cursor.row_factory)."""
+        return cls(row[0], row[1], row[2],
+                   _PRIORITY_BY_LABEL.get(row[3], row[3]),
+                   _STATUS_BY_LABEL.get(row[4], row[4]),
+                   _parse(date, row[5]),
+                   row[6],
+                   _parse(datetime, row[7]))
+
+
+def _parse(kind, value):
+    """Разбирает дату из ISO-строки базы.
+
+    Если строка не разбирается или to_db не вернет ее в том же виде,
+    возвращает ее без изменений.
+    """
+    try:
+        parsed = kind.fromisoformat(value)
+    except (TypeError, ValueError):
+        return value
+    return parsed if to_db(parsed) == value else value
+
+
+def to_db(value):
+    """Преобразует значение поля задачи к виду, в котором оно хранится.
+
+    Перечисления сохраняются надписями, даты - ISO-строками, остальные
+    значения не изменяются.
+    """
+    if isinstance(value, (Priority, Status)):
+        return value.label
+    if isinstance(value, datetime):
+        return value.isoformat(" ", "seconds")
+    if isinstance(value, date):
+        return value.isoformat()
+    return value
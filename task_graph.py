@@ -0,0 +1,327 @@
+import logging
+import math
+import threading
+from collections import namedtuple
+from datetime import date
+
+from deadlines import OPEN_STATUSES
+
+logger = logging.getLogger(__name__)
+
+# Критический путь: задачи от первой к последней и запас в днях до
+# ближайшего дедлайна на пути (отрицательный - дедлайн будет сорван)
+CriticalPath = namedtuple("CriticalPath", ["task_ids", "slack"])
+
+
+class CycleError(ValueError):
+    """Зависимость замкнула бы цикл. cycle - id задач цикла по порядку."""
+
+    def __init__(self, cycle):
+        super().__init__("Зависимость образует цикл: "
+                         + " -> ".join(map(str, cycle)))
+        self.cycle = cycle
+
+
+class DependencyGraph:
+    """Граф зависимостей задач с поддержкой топологического порядка.
+
+    Ребро blocker -> task означает, что task нельзя начать, пока blocker
+    не завершена. В графе только задачи, у которых есть зависимости;
+    для них хранятся списки смежности, признак незавершенности и дедлайн.
+
+    Топологический порядок обновляется при добавлении ребра алгоритмом
+    Пирса-Келли: перестраивается только участок между концами ребра,
+    там же обнаруживается цикл. Удаление ребра порядок не нарушает.
+    Для каждой задачи хранится число незавершенных блокирующих задач,
+    поэтому проверка "можно ли начать" не обходит граф.
+    """
+
+    def __init__(self):
+        self._lock = threading.RLock()
+        self._clear()
+
+    def _clear(self):
+        self._successors = {}   # ИД -> множество зависящих задач
+        self._predecessors = {}  # ИД -> множество блокирующих задач
+        self._position = {}     # ИД -> номер в топологическом порядке
+        self._next_position = 0
+        self._open = set()      # Незавершенные задачи графа
+        self._deadline = {}     # ИД -> дедлайн (date) или None
+        self._blockers = {}     # ИД -> число незавершенных блокирующих
+        self.rejected = []      # Ребра из базы, замыкавшие цикл
+
+    def load(self, edges, tasks):
+        """Строит граф по ребрам (task_id, depends_on) и задачам Task.
+
+        Начальный порядок строится алгоритмом Кана за O(V + E). Ребра,
+        замыкающие цикл (их можно записать в базу в обход TaskScheduler),
+        пропускаются и сохраняются в rejected.
+        """
+        with self._lock:
+            self._clear()
+            successors = {}
+            indegree = {}
+            for task_id, depends_on in edges:
+                successors.setdefault(depends_on, []).append(task_id)
+                successors.setdefault(task_id, [])
+                indegree[task_id] = indegree.get(task_id, 0) + 1
+                indegree.setdefault(depends_on, 0)
+            for node in successors:
+                self._add_node(node, positioned=False)
+            for task in tasks:
+                self._set_task(task.id, task)
+            queue = [node for node, degree in indegree.items() if not degree]
+            while queue:
+                node = queue.pop()
+                self._add_node(node)
+                for successor in successors[node]:
+                    self._link(node, successor)
+                    indegree[successor] -= 1
+                    if not indegree[successor]:
+                        queue.append(successor)
+            for node in successors:
+                if node not in self._position:
+                    self._add_node(node)
+            # Остались только ребра внутри циклов и после них
+            for node, targets in successors.items():
+                for successor in targets:
+                    if successor not in self._successors[node]:
+                        try:
+                            self.add_edge(node, successor)
+                        except CycleError as ex:
+                            logger.warning("%s", ex)
+                            self.rejected.append((successor, node))
+
+    def add_edge(self, blocker, task):
+        """Добавляет зависимость task от blocker.
+
+        Если зависимость замкнула бы цикл, граф не меняется, а
+        выбрасывается CycleError.
+        """
+        with self._lock:
+            if blocker == task:
+                raise CycleError([task, task])
+            self._add_node(blocker)
+            self._add_node(task)
+            if task in self._successors[blocker]:
+                return
+            lower = self._position[task]
+            upper = self._position[blocker]
+            if lower < upper:
+                forward = self._search(task, self._successors,
+                                       lambda pos: pos <= upper, blocker)
+                backward = self._search(blocker, self._predecessors,
+                                        lambda pos: pos >= lower)
+                self._reorder(backward, forward)
+            self._link(blocker, task)
+
+    def remove_edge(self, blocker, task):
+        """Удаляет зависимость task от blocker."""
+        with self._lock:
+            if task not in self._successors.get(blocker, ()):
+                return
+            self._successors[blocker].discard(task)
+            self._predecessors[task].discard(blocker)
+            if blocker in self._open:
+                self._blockers[task] -= 1
+            self._drop_if_isolated(blocker)
+            self._drop_if_isolated(task)
+
+    def remove_task(self, task_id):
+        """Убирает удаленную задачу вместе с ее зависимостями."""
+        with self._lock:
+            if task_id not in self._position:
+                return
+            for successor in list(self._successors[task_id]):
+                self.remove_edge(task_id, successor)
+            for predecessor in list(self._predecessors.get(task_id, ())):
+                self.remove_edge(predecessor, task_id)
+            self._drop_if_isolated(task_id)
+
+    def update_task(self, task):
+        """Обновляет статус и дедлайн задачи, если она есть в графе."""
+        with self._lock:
+            if task.id in self._position:
+                self._set_task(task.id, task)
+
+    def apply_changes(self, changes):
+        """Обновляет граф по ChangeSet из TaskScheduler."""
+        with self._lock:
+            for task_id in changes.deleted:
+                self.remove_task(task_id)
+            for task in changes.tasks:
+                self.update_task(task)
+
+    def blockers(self, task_id):
+        """Возвращает id задач, от которых зависит задача."""
+        with self._lock:
+            return set(self._predecessors.get(task_id, ()))
+
+    def dependents(self, task_id):
+        """Возвращает id задач, зависящих от задачи."""
+        with self._lock:
+            return set(self._successors.get(task_id, ()))
+
+    def is_blocked(self, task_id):
+        """Проверяет, есть ли у задачи незавершенные блокирующие задачи."""
+        with self._lock:
+            return self._blockers.get(task_id, 0) > 0
+
+    def blocked(self):
+        """Возвращает id незавершенных задач, которые еще нельзя начать."""
+        with self._lock:
+            return {task_id for task_id, count in self._blockers.items()
+                    if count and task_id in self._open}
+
+    def order(self):
+        """Возвращает id задач графа в топологическом порядке."""
+        with self._lock:
+            return sorted(self._position, key=self._position.get)
+
+    def find_cycle(self, blocker, task):
+        """Возвращает цикл, который замкнула бы зависимость, или None."""
+        with self._lock:
+            if blocker == task:
+                return [task, task]
+            if blocker not in self._position or task not in self._position:
+                return None
+            path = self._path(task, blocker)
+            return None if path is None else path + [task]
+
+    def critical_path(self, today=None, days_per_task=1):
+        """Считает критический путь незавершенных задач графа.
+
+        Каждая незавершенная задача занимает days_per_task дней, работа
+        начинается today (по умолчанию сегодня). Для задач в
+        топологическом порядке считается самое раннее окончание, а в
+        обратном - самое позднее, при котором успеваются дедлайны самой
+        задачи и всех зависящих от нее. Критический путь - цепочка задач
+        с наименьшим запасом между ними. Возвращает CriticalPath или
+        None, если ни у одной задачи графа нет дедлайна.
+        """
+        today = (today or date.today()).toordinal()
+        with self._lock:
+            order = sorted(self._position, key=self._position.get)
+            duration = {node: days_per_task if node in self._open else 0
+                        for node in order}
+            earliest = {}
+            for node in order:
+                earliest[node] = max(
+                    (earliest[p] for p in self._predecessors.get(node, ())),
+                    default=today) + duration[node]
+            latest = {}
+            for node in reversed(order):
+                deadline = self._deadline.get(node)
+                bounds = [latest[s] - duration[s]
+                          for s in self._successors[node]
+                          if latest[s] is not None]
+                if deadline is not None:
+                    bounds.append(deadline.toordinal())
+                latest[node] = min(bounds, default=None)
+            slack = {node: latest[node] - earliest[node] for node in order
+                     if latest[node] is not None and node in self._open}
+            if not slack:
+                return None
+            # Цепочка идет назад от задачи с наименьшим запасом через
+            # блокирующие задачи, которые определили ее раннее окончание
+            node = min(slack, key=lambda n: (slack[n], -self._position[n]))
+            path = [node]
+            while True:
+                start = earliest[node] - duration[node]
+                previous = [p for p in self._predecessors.get(node, ())
+                            if earliest[p] == start]
+                if not previous:
+                    break
+                node = min(previous, key=lambda n: (slack.get(n, math.inf),
+                                                    self._position[n]))
+                path.append(node)
+            path.reverse()
+            return CriticalPath([node for node in path if node in self._open],
+                                min(slack.values()))
+
+    def _set_task(self, task_id, task):
+        """Запоминает статус и дедлайн задачи и пересчитывает блокировки."""
+        is_open = task.status in OPEN_STATUSES
+        was_open = task_id in self._open
+        deadline = task.deadline
+        self._deadline[task_id] = (deadline if isinstance(deadline, date)
+                                   else None)
+        if is_open == was_open:
+            return
+        if is_open:
+            self._open.add(task_id)
+        else:
+            self._open.discard(task_id)
+        delta = 1 if is_open else -1
+        for successor in self._successors.get(task_id, ()):
+            self._blockers[successor] += delta
+
+    def _add_node(self, node, positioned=True):
+        """Добавляет задачу в граф, ставя ее в конец порядка."""
+        self._successors.setdefault(node, set())
+        self._predecessors.setdefault(node, set())
+        self._blockers.setdefault(node, 0)
+        if positioned and node not in self._position:
+            self._position[node] = self._next_position
+            self._next_position += 1
+
+    def _link(self, blocker, task):
+        self._successors[blocker].add(task)
+        self._predecessors[task].add(blocker)
+        if blocker in self._open:
+            self._blockers[task] += 1
+
+    def _drop_if_isolated(self, node):
+        """Убирает из графа задачу без зависимостей."""
+        if (node in self._position and not self._successors[node]
+                and not self._predecessors[node]):
+            for index in (self._position, self._successors,
+                          self._predecessors, self._blockers,
+                          self._deadline):
+                index.pop(node, None)
+            self._open.discard(node)
+
+    def _search(self, start, edges, inside, target=None):
+        """Обходит в глубину задачи, позиции которых удовлетворяют inside.
+
+        Если по пути встречается target, выбрасывается CycleError.
+        Возвращает найденные задачи.
+        """
+        seen = {start}
+        stack = [start]
+        while stack:
+            node = stack.pop()
+            for neighbour in edges[node]:
+                if neighbour == target:
+                    raise CycleError(self._path(start, target) + [start])
+                if neighbour not in seen and inside(
+                        self._position[neighbour]):
+                    seen.add(neighbour)
+                    stack.append(neighbour)
+        return seen
+
+    def _reorder(self, backward, forward):
+        """Ставит backward перед forward на освободившихся позициях."""
+        nodes = (sorted(backward, key=self._position.get)
+                 + sorted(forward, key=self._position.get))
+        positions = sorted(self._position[node] for node in nodes)
+        for node, position in zip(nodes, positions):
+            self._position[node] = position
+
+    def _path(self, start, target):
+        """Возвращает путь по ребрам графа от start до target или None."""
+        parents = {start: None}
+        stack = [start]
+        while stack:
+            node = stack.pop()
+            if node == target:
+                path = []
+                while node is not None:
+                    path.append(node)
+                    node = parents[node]
+                return path[::-1]
+            for neighbour in self._successors[node]:
+                if neighbour not in parents:
+                    parents[neighbour] = node
+                    stack.append(neighbour)
+        return None
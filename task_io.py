@@ -0,0 +1,136 @@
+import csv
+import json
+import os
+import sys
+import time
+from datetime import date, datetime
+
+from db import COLUMNS
+from task import to_db
+
+# Поддерживаемые форматы: расширение файла -> формат
+FORMATS = {".csv": "csv", ".jsonl": "jsonl", ".ndjson": "jsonl"}
+
+# Поля, которые берутся из файла при загрузке; id назначает база
+IMPORT_COLUMNS = COLUMNS[1:]
+
+# Поля с датами: имя -> тип, которым проверяется значение из файла
+DATE_COLUMNS = {"deadline": date, "created": datetime}
+
+
+def detect_format(path, fmt=None):
+    """Возвращает формат файла: fmt или формат по расширению path.
+
+    path - путь или открытый файл (берется его имя).
+    """
+    name = str(getattr(path, "name", path))
+    if fmt is None:
+        fmt = FORMATS.get(os.path.splitext(name)[1].lower())
+    if fmt not in FORMATS.values():
+        raise ValueError(f"Неизвестный формат файла задач '{name}'. "
+                         "Поддерживаются csv и jsonl.")
+    return fmt
+
+
+def read_records(file, fmt):
+    """Построчно читает записи задач из открытого файла.
+
+    Отдает кортежи значений в порядке IMPORT_COLUMNS. Для CSV первая
+    строка - заголовок с именами полей, для JSONL каждая строка - объект
+    JSON. Отсутствующие и пустые поля отдаются как None, так же, как
+    NULL выгружается в файл: пустая дата создания - None, и база
+    подставит текущее время. Даты приводятся к виду, в котором их
+    хранит приложение. Если имени задачи нет или дата некорректна,
+    вызывает ValueError с номером строки файла.
+    """
+    if fmt == "csv":
+        reader = csv.DictReader(file)
+        rows = ((reader.line_num, row) for row in reader)
+    else:
+        rows = ((number, json.loads(line))
+                for number, line in enumerate(file, 1) if line.strip())
+    for number, row in rows:
+        try:
+            record = _record(row)
+        except ValueError as ex:
+            raise ValueError(f"Строка {number}: {ex}") from None
+        yield record
+
+
+def _record(row):
+    """Возвращает кортеж значений задачи из словаря полей файла."""
+    values = []
+    for column in IMPORT_COLUMNS:
+        value = row.get(column)
+        if value == "":
+            value = None
+        if column in DATE_COLUMNS and value is not None:
+            try:
+                value = to_db(DATE_COLUMNS[column].fromisoformat(value))
+            except (TypeError, ValueError):
+                raise ValueError(
+                    f"некорректное значение {column} '{value}'") from None
+        values.append(value)
+    if values[0] is None:
+        raise ValueError("не указано имя задачи (task_name)")
+    return tuple(values)
+
+
+def write_records(file, records, fmt):
+    """Записывает кортежи значений в порядке COLUMNS в открытый файл.
+
+    Возвращает число записей.
+    """
+    count = 0
+    if fmt == "csv":
+        writer = csv.writer(file)
+        writer.writerow(COLUMNS)
+        for record in records:
+            writer.writerow(record)
+            count += 1
+    else:
+        for record in records:
+            file.write(json.dumps(dict(zip(COLUMNS, record)),
+                                  ensure_ascii=False))
+            file.write("\n")
+            count += 1
+    return count
+
+
+def counting(records, on_progress, every=5000):
+    """Пропускает записи, вызывая on_progress(count) каждые every записей."""
+    count = 0
+    for record in records:
+        yield record
+        count += 1
+        if count % every == 0:
+            on_progress(count)
+    if count % every:
+        on_progress(count)
+
+
+class ProgressPrinter:
+    """Выводит число обработанных записей и скорость в одну строку.
+
+    Экземпляр передается как on_progress в import_tasks и export_tasks;
+    close() завершает строку.
+    """
+
+    def __init__(self, label, stream=None):
+        self.label = label
+        self.stream = stream or sys.stderr
+        self.start = time.perf_counter()
+        self.count = 0
+
+    def __call__(self, count):
+        self.count = count
+        elapsed = time.perf_counter() - self.start
+        rate = count / elapsed if elapsed else 0
+        self.stream.write(f"\r{self.label}: {count} записей, "
+                          f"{rate:.0f} в секунду")
+        self.stream.flush()
+
+    def close(self):
+        if self.count:
+            self.stream.write("\n")
+            self.stream.flush()
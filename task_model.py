@@ -0,0 +1,449 @@
+import re
+import unicodedata
+from bisect import bisect_left
+from string import ascii_lowercase
+
+from PyQt6.QtCore import QAbstractTableModel, QModelIndex, Qt, pyqtSignal
+
+from db import SORT_COLUMNS
+from recurrence import is_occurrence, sort_key, split_occurrence_id
+from task import Task, to_db
+
+# Заголовки видимых колонок таблицы задач
+HEADERS = ["ИД", "Имя задачи", "Описание",
+           "Приоритет", "Статус", "Дедлайн", "Комментарий"]
+
+# Поля Task, соответствующие колонкам таблицы
+FIELDS = Task._fields[:len(HEADERS)]
+
+# Поля Task, по которым работает полнотекстовый поиск (SEARCH_COLUMNS)
+SEARCH_FIELDS = ("task_name", "description", "priority",
+                 "status", "deadline", "comment")
+
+# Сколько результатов поиска загружать целиком. Если найдено не больше,
+# уточнение запроса фильтрует их в памяти без нового запроса к базе.
+NARROW_LIMIT = 2000
+
+# Слово в токенизаторе unicode61: буквы и цифры, "_" - разделитель
+_WORD = re.compile(r"[^\W_]+")
+
+
+def _fold(text: str) -> str:
+    """Приводит текст к виду токенов FTS5 unicode61.
+
+    Токенизатор снимает только один диакритический знак с латинской
+    буквы (é -> e, но не ǖ), а кириллицу не меняет: й и ё остаются
+    отдельными буквами.
+    """
+    text = unicodedata.normalize("NFD", str(text).lower())
+    folded = []
+    marks = []  # Знаки после последней буквы
+    for char in text + " ":
+        if unicodedata.combining(char):
+            marks.append(char)
+            continue
+        if len(marks) != 1 or not folded or folded[-1] not in ascii_lowercase:
+            folded.extend(marks)
+        marks = []
+        folded.append(char)
+    return unicodedata.normalize("NFC", "".join(folded[:-1]))
+
+
+def search_words(text: str):
+    """Возвращает слова запроса для поиска в памяти.
+
+    Возвращает None, если запрос нельзя точно проверить без базы: слово
+    со знаками препинания FTS5 ищет как фразу.
+    """
+    words = [_fold(word) for word in text.split()]
+    if not all(_WORD.fullmatch(word) for word in words):
+        return None
+    return words
+
+
+def matches_search(task: Task, words) -> bool:
+    """Проверяет задачу так же, как запрос к полнотекстовому индексу.
+
+    Каждое слово должно быть началом какого-нибудь слова в полях поиска.
+    """
+    tokens = _WORD.findall(" ".join(_fold(to_db(getattr(task, field)) or "")
+                                    for field in SEARCH_FIELDS))
+    return all(any(token.startswith(word) for token in tokens)
+               for word in words)
+
+
+class _Descending:
+    """Обертка ключа, меняющая порядок сравнения на обратный."""
+
+    __slots__ = ("value",)
+
+    def __init__(self, value) -> None:
+        self.value = value
+
+    def __lt__(self, other: "_Descending") -> bool:
+        return other.value < self.value
+
+    def __eq__(self, other: "_Descending") -> bool:
+        return self.value == other.value
+
+
+class TaskTableModel(QAbstractTableModel):
+    """Модель задач с ленивой постраничной подгрузкой из базы данных.
+
+    Строки хранятся записями Task (кортежами) в одном списке, а
+    представление создает только видимые ячейки. Следующая страница
+    запрашивается через canFetchMore/fetchMore, когда пользователь
+    прокручивает таблицу. Сортировка и фильтры по полям выполняются в базе:
+    страницы читаются через get_tasks_by_params по ключу (значение поля
+    сортировки, ИД). В режиме поиска страницы берутся из полнотекстового
+    индекса в порядке релевантности. Если найдено не больше NARROW_LIMIT
+    задач, они загружаются сразу, и уточнение запроса (search с текстом,
+    продолжающим предыдущий) отбирает задачи из них без запроса к базе.
+
+    Если передан runner (DbRunner), страницы читаются в фоновом потоке,
+    а строки добавляются в модель по готовности результата.
+
+    В режиме архива (set_archive) страницы и поиск читаются из архива
+    завершенных задач, а изменения задач в таблицу не попадают.
+    """
+
+    # Ошибка чтения страницы из базы
+    load_failed = pyqtSignal(object)
+
+    def __init__(self, scheduler, page_size: int = 200,
+                 runner=None, parent=None) -> None:
+        super().__init__(parent)
+        self.scheduler = scheduler
+        self.page_size = page_size
+        self.runner = runner
+        self._fetching = False  # Запрос следующей страницы уже выполняется
+        self._rows = []         # Загруженные строки задач
+        self._by_id = {}        # Загруженные строки по ИД задачи
+        self._has_more = True   # Есть ли в базе еще не загруженные строки
+        self._search = None     # Текст поиска или None, если показаны все
+        self._offset = 0        # Сколько результатов поиска уже получено
+        self._results = None    # Все найденные задачи по ИД или None
+        self._order_by = "deadline"  # Поле сортировки
+        self._descending = False     # Сортировка по убыванию
+        self._filters = {}           # Фильтры: поле -> значение
+        self._archive = False        # Показываются задачи из архива
+
+    def _key(self, task: Task):
+        """Ключ сортировки строки в том же порядке, что и запрос к базе.
+
+        Тот же ключ, что у вхождений повторяющихся задач в
+        recurrence.expand, поэтому они встают между строками базы.
+        """
+        key = sort_key(task, self._order_by)
+        return _Descending(key) if self._descending else key
+
+    def _position(self, task: Task) -> int:
+        """Находит позицию строки в отсортированном списке."""
+        if self._search is not None:
+            # Результаты поиска упорядочены по релевантности
+            if task.id in self._by_id:
+                return self._rows.index(self._by_id[task.id])
+            return len(self._rows)
+        return bisect_left(self._rows, self._key(task), key=self._key)
+
+    def _matches(self, task: Task, filters: dict = None) -> bool:
+        """Проверяет, проходит ли задача фильтры (по умолчанию текущие)."""
+        if filters is None:
+            filters = self._filters
+        return all(to_db(getattr(task, field)) == to_db(value)
+                   for field, value in filters.items())
+
+    def rowCount(self, parent: QModelIndex = QModelIndex()) -> int:
+        if parent.isValid():
+            return 0
+        return len(self._rows)
+
+    def columnCount(self, parent: QModelIndex = QModelIndex()) -> int:
+        if parent.isValid():
+            return 0
+        return len(HEADERS)
+
+    def data(self, index: QModelIndex,
+             role: int = Qt.ItemDataRole.DisplayRole):
+        if role != Qt.ItemDataRole.DisplayRole or not index.isValid():
+            return None
+        value = self._rows[index.row()][index.column()]
+        if index.column() == 0 and is_occurrence(value):
+            # Вхождение повторяющейся задачи еще не сохранено в базе
+            return f"↻{split_occurrence_id(value)[0]}"
+        return "" if value is None else str(value)
+
+    def headerData(self, section: int, orientation: Qt.Orientation,
+                   role: int = Qt.ItemDataRole.DisplayRole):
+        if (role == Qt.ItemDataRole.DisplayRole
+                and orientation == Qt.Orientation.Horizontal):
+            return HEADERS[section]
+        return super().headerData(section, orientation, role)
+
+    def sort(self, column: int,
+             order: Qt.SortOrder = Qt.SortOrder.AscendingOrder) -> None:
+        """Сортирует задачи по колонке запросом к базе.
+
+        Вызывается представлением при щелчке по заголовку. Сортировка
+        выходит из режима поиска, так как результаты поиска упорядочены
+        по релевантности. Колонки без индекса (is_sortable) не
+        сортируются: каждая страница сортировала бы всю таблицу.
+        """
+        if not self.is_sortable(column):
+            return
+        descending = order == Qt.SortOrder.DescendingOrder
+        if ((FIELDS[column], descending) == (self._order_by, self._descending)
+                and self._search is None):
+            return  # Порядок не изменился
+        self._order_by = FIELDS[column]
+        self._descending = descending
+        self.reload()
+
+    def is_sortable(self, column: int) -> bool:
+        """Проверяет, что база сортирует колонку по индексу."""
+        return 0 <= column < len(FIELDS) and FIELDS[column] in SORT_COLUMNS
+
+    def sort_order(self) -> tuple:
+        """Возвращает текущую сортировку: (колонка, Qt.SortOrder)."""
+        order = (Qt.SortOrder.DescendingOrder if self._descending
+                 else Qt.SortOrder.AscendingOrder)
+        return FIELDS.index(self._order_by), order
+
+    def set_filters(self, **filters) -> None:
+        """Показывает только задачи с указанными значениями полей.
+
+        Значение None снимает фильтр по полю, например
+        set_filters(status=Status.NEW, priority=None).
+        """
+        self._filters = {field: value for field, value in filters.items()
+                         if value is not None}
+        self.reload(self._search)
+
+    def set_archive(self, archive: bool) -> None:
+        """Переключает таблицу между текущими задачами и архивом."""
+        if archive == self._archive:
+            return
+        self._archive = archive
+        self.reload(self._search)
+
+    def canFetchMore(self, parent: QModelIndex) -> bool:
+        return not parent.isValid() and self._has_more and not self._fetching
+
+    def fetchMore(self, parent: QModelIndex) -> None:
+        """Запрашивает следующую страницу задач."""
+        if parent.isValid() or self._fetching:
+            return
+        self._fetching = True
+        after = None
+        if self._rows:
+            last = self._rows[-1]
+            # Ключ (значение поля сортировки, ИД) последней строки
+            after = (getattr(last, self._order_by), last.id)
+        limit = self.page_size
+        if self._search is not None and not self._rows:
+            limit = max(limit, NARROW_LIMIT)  # Первая страница поиска
+        # Параметры запроса фиксируются до передачи в фоновый поток
+        args = (self._search, after, self._offset, limit, self._order_by,
+                self._descending, dict(self._filters), self._archive)
+        if self.runner is None:
+            self._append_page(self._load_page(*args))
+        else:
+            self.runner.submit(self._load_page, *args,
+                               on_result=self._append_page,
+                               on_error=self._page_failed, channel=self)
+
+    def _load_page(self, search, after, offset, limit,
+                   order_by, descending, filters, archive=False) -> tuple:
+        """Читает страницу из базы, может выполняться в фоновом потоке.
+
+        Возвращает признак, что в базе есть еще строки, число полученных
+        записей и сами строки. Страница поиска не отфильтрована.
+        """
+        if archive:
+            if search is None:
+                page = self.scheduler.get_archived_tasks(
+                    order_by=order_by, descending=descending,
+                    after=after, limit=limit, **filters)
+            else:
+                page = self.scheduler.search_archive(search, limit, offset)
+            return len(page) == limit, len(page), page
+        if search is None:
+            page = self.scheduler.get_tasks_by_params(
+                order_by=order_by, descending=descending,
+                after=after, limit=limit, **filters)
+            return len(page) == limit, len(page), page
+        record_ids = self.scheduler.search_tasks(search, limit, offset)
+        page = self.scheduler.get_tasks_by_ids(record_ids)
+        return len(record_ids) == limit, len(record_ids), page
+
+    def _append_page(self, result: tuple) -> None:
+        """Добавляет в модель полученную страницу задач."""
+        self._has_more, count, page = result
+        self._fetching = False
+        if self._search is not None:
+            if not self._has_more and self._offset == 0:
+                # Найдены все задачи, уточнять запрос можно в памяти
+                self._results = {task.id: task for task in page}
+            self._offset += count
+            page = [task for task in page if self._matches(task)]
+        # Пропускаем задачи, уже добавленные в таблицу после сохранения
+        page = [task for task in page if task.id not in self._by_id]
+        if not page:
+            if self._has_more and self._search is not None:
+                # Вся страница поиска отсеяна фильтрами, берем следующую
+                self.fetchMore(QModelIndex())
+            return
+
+        first = len(self._rows)
+        self.beginInsertRows(QModelIndex(), first, first + len(page) - 1)
+        self._rows.extend(page)
+        self._by_id.update((task.id, task) for task in page)
+        self.endInsertRows()
+
+    def _page_failed(self, error) -> None:
+        """Прекращает подгрузку, если страницу не удалось прочитать."""
+        self._fetching = False
+        self._has_more = False
+        self.load_failed.emit(error)
+
+    def search(self, text: str) -> None:
+        """Показывает задачи, найденные по тексту.
+
+        Если текст продолжает предыдущий запрос и все его результаты
+        загружены, новые результаты отбираются из них в фоновом потоке.
+        Иначе запрос выполняется в базе. Пустой текст показывает все задачи.
+        """
+        text = text.strip() or None
+        if text == self._search:
+            return
+        words = search_words(text) if text else None
+        if (words is None or self._results is None
+                or not text.startswith(self._search)):
+            self.reload(text)
+            return
+        # Загруженные результаты остаются надмножеством результатов для
+        # любого продолжения текста, пока уточнение выполняется
+        self._search = text
+        tasks = list(self._results.values())
+        if self.runner is None:
+            self._show_results(_narrow(tasks, words))
+        else:
+            self.runner.submit(_narrow, tasks, words,
+                               on_result=self._show_results, channel=self)
+
+    def _show_results(self, tasks: list) -> None:
+        """Показывает уточненные результаты поиска вместо текущих."""
+        self.beginResetModel()
+        self._results = {task.id: task for task in tasks}
+        self._rows = [task for task in tasks if self._matches(task)]
+        self._by_id = {task.id: task for task in self._rows}
+        self._offset = len(tasks)
+        self._has_more = False
+        self.endResetModel()
+
+    def reload(self, search: str = None) -> None:
+        """Сбрасывает загруженные строки и загружает первую страницу.
+
+        Если передан search, показываются только найденные задачи.
+        Незавершенный запрос предыдущей страницы отменяется.
+        """
+        if self.runner is not None:
+            self.runner.cancel(self)
+        self._fetching = False
+        self.beginResetModel()
+        self._rows = []
+        self._by_id = {}
+        self._has_more = True
+        self._search = search or None
+        self._offset = 0
+        self._results = None
+        self.endResetModel()
+        self.fetchMore(QModelIndex())
+
+    def task_at(self, row: int) -> Task:
+        """Возвращает данные задачи в указанной строке."""
+        return self._rows[row]
+
+    def insert_task(self, task: Task) -> None:
+        """Вставляет новую задачу на ее место без перезагрузки таблицы."""
+        self._update_result(task)
+        if not self._matches(task):
+            return
+        row = self._position(task)
+        if (self._search is None
+                and row == len(self._rows) and self._has_more):
+            return  # Задача за пределами загруженного окна придет с fetchMore
+        self.beginInsertRows(QModelIndex(), row, row)
+        self._rows.insert(row, task)
+        self._by_id[task.id] = task
+        self.endInsertRows()
+
+    def update_task(self, task: Task) -> None:
+        """Заменяет измененную задачу, переставляя ее при смене ключа."""
+        self._update_result(task)
+        old = self._by_id.get(task.id)
+        if old is None:
+            self.insert_task(task)
+            return
+        if not self._matches(task):
+            self.remove_task(task.id)  # Задача больше не проходит фильтр
+            return
+        if self._search is None and self._key(old) != self._key(task):
+            self.remove_task(task.id)
+            self.insert_task(task)
+            return
+        row = self._position(old)
+        self._rows[row] = task
+        self._by_id[task.id] = task
+        self.dataChanged.emit(self.index(row, 0),
+                              self.index(row, self.columnCount() - 1))
+
+    def apply_changes(self, tasks, deleted) -> None:
+        """Применяет изменения, сделанные в базе другими окнами.
+
+        В режиме поиска обновляются только уже показанные задачи, новые
+        задачи появятся при следующем поиске. В режиме архива изменения
+        пропускаются: они относятся к текущим задачам.
+        """
+        if self._archive:
+            return
+        for record_id in deleted:
+            self.remove_task(record_id)
+        for task in tasks:
+            if self._search is None or task.id in self._by_id:
+                self.update_task(task)
+            else:
+                self._update_result(task)
+
+    def _update_result(self, task: Task) -> None:
+        """Обновляет задачу в загруженных результатах поиска.
+
+        Задача, которой не было среди результатов, могла начать подходить
+        под запрос, поэтому следующее уточнение выполняется в базе.
+        """
+        if self._results is None:
+            return
+        if task.id in self._results:
+            self._results[task.id] = task
+        else:
+            self._results = None
+
+    def remove_task(self, record_id: int) -> None:
+        """Убирает удаленную задачу из таблицы."""
+        if self._results is not None:
+            self._results.pop(record_id, None)
+        old = self._by_id.get(record_id)
+        if old is None:
+            return
+        row = self._position(old)
+        del self._by_id[record_id]
+        self.beginRemoveRows(QModelIndex(), row, row)
+        del self._rows[row]
+        self.endRemoveRows()
+        if self._search is not None:
+            self._offset -= 1  # Следующие результаты сдвинулись на одну
+
+
+def _narrow(tasks, words) -> list:
+    """Отбирает задачи, подходящие под слова запроса, сохраняя порядок."""
+    return [task for task in tasks if matches_search(task, words)]
@@ -1,39 +1,760 @@
-from db import DB_Connector
-
-
-class TaskScheduler:
-    def __init__(self, db_file):
-        self.db_connector = DB_Connector(db_file)
-
-    def add_task(self,
-                 task_name, description,
-                 priority, status, deadline, comment):
-        self.db_connector.add_record(task_name,
-                                     description, priority,
-                                     status, deadline, comment)
-
-    def delete_task(self, record_id):
-        self.db_connector.delete_record(record_id)
-
-    def update_task(self, record_id,
-                    task_name, description, priority,
-                    status, deadline, comment):
-        self.db_connector.update_record(record_id,
-                                        task_name,
-                                        description, priority, status,
-                                        deadline, comment)
-
-    def get_all_tasks(self):
-        return self.db_connector.get_all_records()
-
-    def get_tasks_by_params(self, **params):
-        return self.db_connector.get_records_by_params(**params)
-
-    def close(self):
-        self.db_connector.close_connection()
-
-
-if __name__ == "__main__":
-    scheduler = TaskScheduler("scheduler.db")
-
-    scheduler.close()
+import logging
+import os
+import threading
+from collections import Counter, namedtuple
+from contextlib import contextmanager, nullcontext
+from datetime import date, timedelta
+
+from db import DB_Connector
+from deadlines import OPEN_STATUSES
+from query_cache import QueryCache, freeze
+from recurrence import (FREQUENCIES, expand, find_occurrence, is_occurrence,
+                        make_series, split_occurrence_id)
+from task import Priority, Status, Task, to_db
+from task_graph import CycleError, DependencyGraph
+from task_io import counting, detect_format, read_records, write_records
+
+logger = logging.getLogger(__name__)
+
+# Отметка об удаленной задаче, которую получает слой отображения
+Tombstone = namedtuple("Tombstone", ["id"])
+
+# Изменения задач после некоторой версии журнала: version - новая версия,
+# tasks - добавленные или измененные задачи, deleted - id удаленных задач.
+# reset - изменения после запрошенной версии уже удалены из журнала:
+# tasks и deleted пусты, а задачи нужно перечитать целиком
+ChangeSet = namedtuple("ChangeSet", ["version", "tasks", "deleted", "reset"],
+                       defaults=[False])
+
+# Сводка по задачам: всего, по статусам, по приоритетам, по парам
+# (статус, приоритет) и число незавершенных задач с дедлайном в прошлом,
+# сегодня и в ближайшие 7 дней начиная с сегодня. Статусы и приоритеты -
+# перечисления, неизвестные надписи и None остаются как есть
+Stats = namedtuple("Stats", ["total", "by_status", "by_priority",
+                             "by_status_priority", "overdue", "due_today",
+                             "due_week"])
+
+# Завершенные задачи старше ARCHIVE_AFTER_DAYS дней (по дедлайну, а без
+# него - по дате создания) переносятся в архив
+CLOSED_STATUSES = (Status.CANCELLED, Status.DONE)
+ARCHIVE_AFTER_DAYS = 90
+
+# Сколько последних версий журнала изменений хранить для синхронизации
+# окон; окно, отставшее сильнее, перечитывает задачи целиком
+CHANGE_LOG_SIZE = 100000
+
+_STATUSES = {status.label: status for status in Status}
+_PRIORITIES = {priority.label: priority for priority in Priority}
+
+
+def _db_values(values):
+    """Приводит поля задачи (перечисления, даты) к виду для базы."""
+    return tuple(map(to_db, values))
+
+
+def _db_params(params):
+    """Приводит значения параметров фильтра к виду для базы."""
+    converted = {}
+    for key, value in params.items():
+        if value is not None and (key.endswith("__in") or key == "after"):
+            value = _db_values(value)
+        else:
+            value = to_db(value)
+        converted[key] = value
+    return converted
+
+
+class TaskScheduler:
+    """Работа с задачами. Чтение возвращает записи Task.
+
+    Приоритет, статус и даты можно передавать как перечислениями Priority,
+    Status и объектами date, так и строками в формате базы.
+
+    Результаты чтения кэшируются (cache_size запросов, не дольше cache_ttl
+    секунд). Кэш сбрасывается при каждом изменении через TaskScheduler и
+    при изменении базы другими процессами (PRAGMA data_version).
+
+    instrumentation передается в DB_Connector для замеров запросов.
+
+    Подписчики (add_listener) получают ChangeSet после каждого изменения,
+    сделанного через этот TaskScheduler.
+    """
+
+    def __init__(self, db_file, cache_size=128, cache_ttl=60.0,
+                 instrumentation=None):
+        self.db_connector = DB_Connector(db_file, row_factory=Task.from_row,
+                                         instrumentation=instrumentation)
+        self.cache = QueryCache(cache_size, cache_ttl)
+        self._version_lock = threading.Lock()
+        self._data_version = self.db_connector.data_version()
+        self._listeners = []
+        self._graph = None
+        self._graph_lock = threading.RLock()
+
+    def _cached(self, key, fn, *args, **kwargs):
+        """Возвращает результат чтения из кэша или выполняет запрос."""
+        if self.db_connector.pool.holds_writer():
+            # Внутри транзакции видны незафиксированные изменения
+            return fn(*args, **kwargs)
+        self._check_data_version()
+        key = freeze((key, args, kwargs))
+        hit, result = self.cache.get(key)
+        if not hit:
+            generation = self.cache.generation
+            result = fn(*args, **kwargs)
+            self.cache.put(key, result, generation)
+        # Списки копируются, чтобы вызывающий не изменил кэш
+        return list(result) if isinstance(result, list) else result
+
+    def _check_data_version(self):
+        """Сбрасывает кэш, если базу изменило другое соединение."""
+        version = self.db_connector.data_version()
+        with self._version_lock:
+            if version != self._data_version:
+                self._data_version = version
+                self.cache.clear()
+
+    def invalidate_cache(self):
+        """Сбрасывает кэш результатов чтения."""
+        self.cache.clear()
+
+    def cache_stats(self):
+        """Возвращает счетчики попаданий и промахов кэша."""
+        return self.cache.stats()
+
+    def stats(self, today=None):
+        """Возвращает сводку Stats по всем задачам.
+
+        Считается по таблице счетчиков, которую ведут триггеры, поэтому
+        не читает задачи и не зависит от их числа. today - дата, от
+        которой считаются просроченные задачи (по умолчанию сегодня).
+        Вхождения повторяющихся задач не учитываются, пока они не
+        сохранены отдельными задачами, архивные задачи - тоже.
+        """
+        today = to_db(today or date.today())
+        week = to_db(date.fromisoformat(today) + timedelta(days=7))
+        by_status = Counter()
+        by_priority = Counter()
+        by_status_priority = Counter()
+        overdue = due_today = due_week = 0
+        for status, priority, deadline, count in self._cached(
+                "stats", self.db_connector.get_summary):
+            status = _STATUSES.get(status, status or None)
+            priority = _PRIORITIES.get(priority, priority or None)
+            by_status[status] += count
+            by_priority[priority] += count
+            by_status_priority[status, priority] += count
+            if status in OPEN_STATUSES and deadline:
+                if deadline < today:
+                    overdue += count
+                elif deadline == today:
+                    due_today += count
+                if today <= deadline < week:
+                    due_week += count
+        return Stats(sum(by_status.values()), dict(by_status),
+                     dict(by_priority), dict(by_status_priority),
+                     overdue, due_today, due_week)
+
+    def add_listener(self, listener):
+        """Подписывает listener(changes) на изменения задач.
+
+        changes - ChangeSet с измененными задачами и id удаленных. Для
+        одиночных изменений version в нем равна None. Подписчик
+        вызывается после commit в потоке, который выполнил изменение;
+        изменения внутри batch() приходят одним ChangeSet после его
+        завершения. ChangeSet с reset=True означает, что изменения
+        потеряны и задачи нужно перечитать.
+        """
+        self._listeners.append(listener)
+
+    def remove_listener(self, listener):
+        """Отписывает listener от изменений задач."""
+        if listener in self._listeners:
+            self._listeners.remove(listener)
+
+    def _notify(self, changes):
+        """Передает изменения подписчикам, не прерывая запись их ошибками."""
+        for listener in list(self._listeners):
+            try:
+                listener(changes)
+            except Exception:
+                logger.exception("Ошибка подписчика изменений задач")
+
+    def _listening(self):
+        """Проверяет, нужно ли сейчас оповещать подписчиков.
+
+        Внутри открытой транзакции изменения еще могут быть отменены, о
+        них оповещает batch() после commit.
+        """
+        return (bool(self._listeners)
+                and not self.db_connector.pool.holds_writer())
+
+    def _change_version(self):
+        """Возвращает версию журнала для оповещения после изменения."""
+        return self.get_change_version() if self._listening() else None
+
+    def _notify_since(self, version):
+        """Оповещает подписчиков обо всех изменениях после version."""
+        if version is None:
+            return
+        while True:
+            changes = self.get_changes_since(version)
+            if changes.reset:
+                # Журнал очищен дальше version: граф перечитается, а
+                # подписчики получат признак перечитать задачи
+                self.reload_dependencies()
+                self._notify(changes)
+                break
+            if changes.version == version:
+                break
+            self._notify(changes)
+            version = changes.version
+
+    def add_task(self,
+                 task_name, description,
+                 priority, status, deadline, comment):
+        """Добавляет задачу и возвращает id новой записи."""
+        record_id = self.db_connector.add_record(task_name,
+                                                 description, to_db(priority),
+                                                 to_db(status),
+                                                 to_db(deadline), comment)
+        self.invalidate_cache()
+        if self._listening():
+            self._notify(ChangeSet(
+                None, [self.db_connector.get_record(record_id)], []))
+        return record_id
+
+    def delete_task(self, record_id):
+        """Удаляет задачу и возвращает Tombstone или None.
+
+        Удаленное вхождение повторяющейся задачи больше не создается.
+        """
+        if is_occurrence(record_id):
+            return self._mark_occurrence(record_id)
+        deleted = self.db_connector.delete_record(record_id)
+        self.invalidate_cache()
+        if deleted and self._listening():
+            self._notify(ChangeSet(None, [], [record_id]))
+        return Tombstone(record_id) if deleted else None
+
+    def update_task(self, record_id,
+                    task_name, description, priority,
+                    status, deadline, comment):
+        """Обновляет задачу и возвращает обновленную запись.
+
+        Измененное вхождение повторяющейся задачи сохраняется отдельной
+        задачей, она и возвращается.
+        """
+        if is_occurrence(record_id):
+            return self._mark_occurrence(record_id, (
+                task_name, description, priority, status, deadline,
+                comment))
+        task = self.db_connector.update_record(record_id,
+                                               task_name,
+                                               description, to_db(priority),
+                                               to_db(status), to_db(deadline),
+                                               comment)
+        self.invalidate_cache()
+        if task is not None and self._listening():
+            self._notify(ChangeSet(None, [task], []))
+        return task
+
+    def add_tasks(self, tasks, chunk_size=500):
+        """Добавляет задачи пачками в одной транзакции.
+
+        tasks - кортежи (task_name, description, priority, status,
+        deadline, comment). Возвращает число добавленных задач.
+        """
+        version = self._change_version()
+        count = self.db_connector.add_records(map(_db_values, tasks),
+                                              chunk_size)
+        self.invalidate_cache()
+        self._notify_since(version)
+        return count
+
+    def update_tasks(self, tasks, chunk_size=500):
+        """Обновляет задачи пачками в одной транзакции.
+
+        tasks - кортежи (record_id, task_name, description, priority,
+        status, deadline, comment). Вхождения повторяющихся задач
+        сохраняются отдельными задачами, как в update_task. Возвращает
+        число обновленных задач и вхождений.
+        """
+        tasks = list(tasks)
+        occurrences = [task for task in tasks if is_occurrence(task[0])]
+        if occurrences:
+            with self.batch():
+                count = sum(self.update_task(*task) is not None
+                            for task in occurrences)
+                return count + self.update_tasks(
+                    [task for task in tasks if not is_occurrence(task[0])],
+                    chunk_size)
+        version = self._change_version()
+        count = self.db_connector.update_records(map(_db_values, tasks),
+                                                 chunk_size)
+        self.invalidate_cache()
+        self._notify_since(version)
+        return count
+
+    def delete_tasks(self, record_ids, chunk_size=500):
+        """Удаляет задачи по списку id в одной транзакции.
+
+        Вхождения повторяющихся задач удаляются, как в delete_task.
+        Возвращает число удаленных задач и вхождений.
+        """
+        record_ids = list(record_ids)
+        occurrences = [record_id for record_id in record_ids
+                       if is_occurrence(record_id)]
+        if occurrences:
+            with self.batch():
+                count = sum(self.delete_task(record_id) is not None
+                            for record_id in occurrences)
+                return count + self.delete_tasks(
+                    [record_id for record_id in record_ids
+                     if not is_occurrence(record_id)], chunk_size)
+        version = self._change_version()
+        count = self.db_connector.delete_records(record_ids, chunk_size)
+        self.invalidate_cache()
+        self._notify_since(version)
+        return count
+
+    def import_tasks(self, source, fmt=None, chunk_size=5000,
+                     rebuild_indexes=True, on_progress=None):
+        """Загружает задачи из файла CSV или JSONL одной транзакцией.
+
+        source - путь к файлу или открытый текстовый файл, fmt - "csv" или
+        "jsonl" (по умолчанию по расширению файла). Файл читается
+        потоком, поля описаны в task_io.read_records; id назначаются
+        заново. Остальные параметры передаются в
+        DB_Connector.import_records. Возвращает число задач.
+        """
+        fmt = detect_format(source, fmt)
+        if hasattr(source, "read"):
+            opened = nullcontext(source)
+        else:
+            opened = open(source, encoding="utf-8", newline="")
+        version = self._change_version()
+        try:
+            with opened as file:
+                count = self.db_connector.import_records(
+                    read_records(file, fmt), chunk_size, rebuild_indexes,
+                    on_progress)
+        finally:
+            self.invalidate_cache()
+        self._notify_since(version)
+        return count
+
+    def export_tasks(self, target, fmt=None, batch_size=5000,
+                     on_progress=None, **params):
+        """Выгружает задачи в файл CSV или JSONL потоком.
+
+        target - путь к файлу или открытый текстовый файл, fmt - "csv" или
+        "jsonl" (по умолчанию по расширению файла). params - фильтр и
+        сортировка, как у get_tasks_by_params (по умолчанию по id).
+        Задачи читаются пачками по batch_size через fetchmany, поэтому
+        память не зависит от их числа. Файл по пути заменяется целиком
+        после успешной выгрузки. on_progress(count) вызывается каждые
+        batch_size задач. Возвращает число задач.
+        """
+        params.setdefault("order_by", "id")
+        records = self.db_connector.iter_records(batch_size, raw=True,
+                                                 **_db_params(params))
+        if on_progress is not None:
+            records = counting(records, on_progress, batch_size)
+        fmt = detect_format(target, fmt)
+        if hasattr(target, "write"):
+            return write_records(target, records, fmt)
+
+        temp_path = f"{target}.{os.getpid()}.tmp"
+        try:
+            with open(temp_path, "w", encoding="utf-8", newline="") as file:
+                count = write_records(file, records, fmt)
+            os.replace(temp_path, target)
+        finally:
+            if os.path.exists(temp_path):
+                os.remove(temp_path)
+        return count
+
+    @contextmanager
+    def batch(self):
+        """Открывает общую транзакцию для нескольких операций.
+
+        with scheduler.batch():
+            scheduler.add_task(...)
+            scheduler.delete_task(...)
+        """
+        version = self._change_version()
+        try:
+            with self.db_connector.transaction() as connector:
+                yield connector
+        except BaseException:
+            # Отмененные зависимости могли остаться в графе
+            self.reload_dependencies()
+            raise
+        finally:
+            self.invalidate_cache()
+        self._notify_since(version)
+
+    def get_task(self, record_id):
+        if is_occurrence(record_id):
+            return find_occurrence(self._get_series(), record_id)
+        return self._cached("get_task", self.db_connector.get_record,
+                            record_id)
+
+    def get_all_tasks(self):
+        """Возвращает все задачи и вхождения серий до горизонта.
+
+        Горизонт - recurrence.HORIZON_DAYS от сегодня.
+        """
+        return self._cached("get_all_tasks", self._all_tasks)
+
+    def _all_tasks(self):
+        return self._expand(self.db_connector.get_all_records(),
+                            {"order_by": "deadline"})
+
+    def get_tasks_page(self, after=None, limit=200):
+        if after is not None:
+            after = _db_values(after)
+        return self._cached("get_tasks_page",
+                            self.db_connector.get_records_page, after, limit)
+
+    def get_tasks_by_ids(self, record_ids):
+        return self._cached("get_tasks_by_ids",
+                            self.db_connector.get_records_by_ids,
+                            list(record_ids))
+
+    def search_tasks(self, text, limit=100, offset=0):
+        """Возвращает id задач, найденных по тексту, по релевантности."""
+        return self._cached("search_tasks", self.db_connector.search,
+                            text, limit, offset)
+
+    def get_tasks_by_params(self, **params):
+        """Возвращает задачи по параметрам фильтра (см. build_select).
+
+        В результат добавляются вхождения повторяющихся задач с
+        дедлайнами в окне запроса, см. recurrence.expand.
+        """
+        return self._cached("get_tasks_by_params", self._tasks_by_params,
+                            **_db_params(params))
+
+    def _tasks_by_params(self, **params):
+        return self._expand(
+            self.db_connector.get_records_by_params(**params), params)
+
+    def _expand(self, tasks, params):
+        """Добавляет к задачам вхождения серий из окна запроса."""
+        series = self._get_series()
+        return expand(tasks, series, params) if series else tasks
+
+    def _get_series(self):
+        """Возвращает повторяющиеся задачи списком Series."""
+        return self._cached("series", self._load_series)
+
+    def _load_series(self):
+        rules = self.db_connector.get_recurrences()
+        if not rules:
+            return []
+        templates = self.db_connector.get_records_by_ids(
+            [rule[0] for rule in rules])
+        return make_series(rules, templates,
+                           self.db_connector.get_occurrence_exceptions())
+
+    def archive_tasks(self, older_than_days=ARCHIVE_AFTER_DAYS, today=None,
+                      batch_size=500, limit=None, on_progress=None):
+        """Переносит в архив завершенные задачи старше older_than_days.
+
+        Возраст считается от today (по умолчанию сегодня) до дедлайна
+        задачи, а у задачи без дедлайна - до даты ее создания. Перенос
+        идет короткими транзакциями по batch_size задач (см.
+        DB_Connector.archive_records), поэтому его можно запускать в
+        фоне, не останавливая работу с задачами; limit ограничивает число
+        задач за один вызов. Для подписчиков перенесенные задачи -
+        удаленные. Возвращает число задач.
+        """
+        before = (today or date.today()) - timedelta(days=older_than_days)
+        version = self._change_version()
+        try:
+            count = self.db_connector.archive_records(
+                _db_values(CLOSED_STATUSES), to_db(before), batch_size,
+                limit, on_progress)
+        finally:
+            self.invalidate_cache()
+        self._notify_since(version)
+        return count
+
+    def restore_tasks(self, record_ids):
+        """Возвращает задачи из архива. Возвращает число задач.
+
+        Зависимости задач теряются при переносе в архив и после
+        восстановления их нужно добавить заново.
+        """
+        version = self._change_version()
+        count = self.db_connector.restore_records(record_ids)
+        self.invalidate_cache()
+        self._notify_since(version)
+        return count
+
+    def get_archived_tasks(self, **params):
+        """Возвращает задачи архива по параметрам фильтра (см. build_select).
+
+        Обычные запросы читают только Scheduler, архив читается лишь
+        этим методом и search_archive.
+        """
+        return self._cached("get_archived_tasks",
+                            self.db_connector.get_archived_records,
+                            **_db_params(params))
+
+    def search_archive(self, text, limit=100, offset=0):
+        """Возвращает задачи архива, найденные по тексту."""
+        return self._cached("search_archive", self.db_connector.search_archive,
+                            text, limit, offset)
+
+    def add_recurring_task(self, task_name, description, priority, status,
+                           deadline, comment, frequency, interval=1,
+                           until=None):
+        """Добавляет повторяющуюся задачу и возвращает ее id.
+
+        Задача хранится одной записью - первым вхождением с дедлайном
+        deadline, остальные вхождения создаются при чтении. frequency -
+        recurrence.DAILY, WEEKLY или MONTHLY, повтор каждые interval
+        дней, недель или месяцев, until - последняя дата повторов.
+        """
+        with self.batch():
+            record_id = self.add_task(task_name, description, priority,
+                                      status, deadline, comment)
+            self.set_recurrence(record_id, frequency, interval, until)
+        return record_id
+
+    def set_recurrence(self, task_id, frequency, interval=1, until=None):
+        """Делает задачу повторяющейся или меняет правило повторения.
+
+        Дедлайн задачи - дата начала серии, без него вхождений не будет,
+        поэтому такая задача не может повторяться (ValueError). Возвращает
+        False, если задачи нет.
+        """
+        if frequency not in FREQUENCIES:
+            raise ValueError(f"Недопустимая частота повторения "
+                             f"'{frequency}'.")
+        if interval < 1:
+            raise ValueError("Интервал повторения должен быть больше 0.")
+        task = self.get_task(task_id)
+        if task is None:
+            return False
+        if not isinstance(task.deadline, date):
+            raise ValueError("У повторяющейся задачи должен быть дедлайн.")
+        saved = self.db_connector.set_recurrence(task_id, frequency,
+                                                 interval, to_db(until))
+        self.invalidate_cache()
+        return saved
+
+    def remove_recurrence(self, task_id):
+        """Прекращает повторение задачи. Возвращает True, если оно было."""
+        removed = self.db_connector.remove_recurrence(task_id)
+        self.invalidate_cache()
+        return removed
+
+    def get_recurrence(self, task_id):
+        """Возвращает правило Recurrence задачи или None."""
+        for series in self._get_series():
+            if series.rule.task_id == task_id:
+                return series.rule
+        return None
+
+    def _mark_occurrence(self, record_id, fields=None):
+        """Заменяет вхождение серии задачей с полями fields или удаляет.
+
+        Возвращает новую задачу, Tombstone удаленного вхождения или None,
+        если такого вхождения нет.
+        """
+        if self.get_task(record_id) is None:
+            return None
+        series_id, day = split_occurrence_id(record_id)
+        task_id = None
+        with self.batch():
+            if fields is not None:
+                task_id = self.db_connector.add_record(*_db_values(fields))
+            self.db_connector.mark_occurrence(series_id, day.isoformat(),
+                                              task_id)
+        if task_id is None:
+            return Tombstone(record_id)
+        return self.get_task(task_id)
+
+    def get_change_version(self):
+        """Возвращает текущую версию журнала изменений."""
+        return self.db_connector.get_change_version()
+
+    def get_changes_since(self, version, limit=1000):
+        """Возвращает ChangeSet с изменениями после version.
+
+        Несколько изменений одной задачи схлопываются в одно: задача либо
+        попадает в tasks в текущем виде, либо ее id - в deleted. Если
+        изменений больше limit, остальные вернет следующий вызов с
+        новой версией. Если часть изменений после version уже удалена из
+        журнала (trim_change_log), возвращается ChangeSet с reset=True и
+        текущей версией.
+        """
+        changes = self.db_connector.get_changes_since(version, limit)
+        # Горизонт проверяется после чтения: очистка журнала между
+        # запросами приведет к лишнему перечитыванию, но не к потере
+        if version < self.db_connector.get_change_horizon():
+            return ChangeSet(self.get_change_version(), [], [], True)
+        if not changes:
+            return ChangeSet(version, [], [])
+        last_operation = {}
+        for _, task_id, operation in changes:
+            last_operation[task_id] = operation
+        deleted = [task_id for task_id, operation in last_operation.items()
+                   if operation == "delete"]
+        changed = [task_id for task_id, operation in last_operation.items()
+                   if operation != "delete"]
+        # Задача могла быть удалена позже последней прочитанной версии:
+        # ее не будет среди записей, а удаление придет следующим вызовом
+        tasks = self.db_connector.get_records_by_ids(changed)
+        return ChangeSet(changes[-1][0], tasks, deleted)
+
+    def prune_changes(self, before_version):
+        """Очищает журнал изменений до указанной версии."""
+        return self.db_connector.prune_changes(before_version)
+
+    def trim_change_log(self, keep=CHANGE_LOG_SIZE):
+        """Оставляет в журнале изменений последние keep версий.
+
+        Возвращает число удаленных записей журнала.
+        """
+        return self.prune_changes(self.get_change_version() - keep + 1)
+
+    def iter_tasks(self, batch_size=500, **params):
+        """Построчно отдает задачи, читая их из базы пачками.
+
+        Принимает те же параметры, что и get_tasks_by_params, например
+        iter_tasks(order_by="deadline", status=Status.NEW).
+        """
+        return self.db_connector.iter_records(batch_size,
+                                              **_db_params(params))
+
+    def dependency_graph(self):
+        """Возвращает граф зависимостей задач (см. task_graph).
+
+        Граф загружается из базы при первом обращении, а затем
+        обновляется при изменениях через этот TaskScheduler. Зависимости,
+        измененные другими процессами, подхватывает reload_dependencies().
+        """
+        with self._graph_lock:
+            if self._graph is None:
+                graph = DependencyGraph()
+                # Подписка до чтения, чтобы не пропустить изменения задач
+                self.add_listener(graph.apply_changes)
+                edges = self.db_connector.get_dependencies()
+                nodes = list({task_id for edge in edges for task_id in edge})
+                tasks = []
+                for start in range(0, len(nodes), 500):
+                    tasks.extend(self.db_connector.get_records_by_ids(
+                        nodes[start:start + 500]))
+                graph.load(edges, tasks)
+                self._graph = graph
+            return self._graph
+
+    def reload_dependencies(self):
+        """Сбрасывает граф зависимостей; он загрузится заново."""
+        with self._graph_lock:
+            if self._graph is not None:
+                self.remove_listener(self._graph.apply_changes)
+                self._graph = None
+
+    @contextmanager
+    def _changing_dependencies(self):
+        """Блок изменения зависимостей в базе и в графе.
+
+        Блокировки берутся в том же порядке, что и при любой записи
+        внутри batch(): сначала транзакция (соединение для записи), затем
+        граф. Если изменение не удалось зафиксировать, граф загружается
+        заново.
+        """
+        try:
+            with self.db_connector.transaction(), self._graph_lock:
+                yield self.dependency_graph()
+        except CycleError:
+            raise  # Проверка выполняется до записи, граф не изменен
+        except BaseException:
+            self.reload_dependencies()
+            raise
+
+    def add_dependency(self, task_id, depends_on):
+        """Делает задачу task_id зависимой от задачи depends_on.
+
+        Если зависимость замкнула бы цикл, выбрасывается CycleError с
+        задачами цикла. Возвращает True, если зависимость добавлена, и
+        False, если она уже была или одной из задач нет.
+        """
+        with self._changing_dependencies() as graph:
+            cycle = graph.find_cycle(depends_on, task_id)
+            if cycle is not None:
+                raise CycleError(cycle)
+            added = self.db_connector.add_dependency(task_id, depends_on)
+            if added:
+                graph.add_edge(depends_on, task_id)
+                for task in self.db_connector.get_records_by_ids(
+                        [task_id, depends_on]):
+                    graph.update_task(task)
+        return added
+
+    def remove_dependency(self, task_id, depends_on):
+        """Удаляет зависимость. Возвращает True, если она была."""
+        with self._changing_dependencies() as graph:
+            removed = self.db_connector.remove_dependency(task_id, depends_on)
+            graph.remove_edge(depends_on, task_id)
+        return removed
+
+    def find_dependency_cycle(self, task_id, depends_on):
+        """Возвращает цикл, который замкнула бы зависимость, или None."""
+        return self.dependency_graph().find_cycle(depends_on, task_id)
+
+    def get_blockers(self, task_id):
+        """Возвращает id задач, от которых зависит задача."""
+        return self.dependency_graph().blockers(task_id)
+
+    def get_dependents(self, task_id):
+        """Возвращает id задач, зависящих от задачи."""
+        return self.dependency_graph().dependents(task_id)
+
+    def is_blocked(self, task_id):
+        """Проверяет, ждет ли задача завершения других задач."""
+        return self.dependency_graph().is_blocked(task_id)
+
+    def get_ready_tasks(self, limit=None, **params):
+        """Возвращает незавершенные задачи, которые можно начать.
+
+        Задачи идут по дедлайну; params - дополнительный фильтр, как у
+        get_tasks_by_params. Заблокированные задачи отсеиваются по графу
+        в памяти, без запросов к таблице зависимостей.
+        """
+        blocked = self.dependency_graph().blocked()
+        params.setdefault("order_by", "deadline")
+        ready = []
+        tasks = self.iter_tasks(status__in=OPEN_STATUSES, **params)
+        try:
+            for task in tasks:
+                if task.id not in blocked:
+                    ready.append(task)
+                    if len(ready) == limit:
+                        break
+        finally:
+            tasks.close()
+        return ready
+
+    def critical_path(self, today=None, days_per_task=1):
+        """Возвращает критический путь незавершенных зависимых задач.
+
+        Подробности - в DependencyGraph.critical_path. Возвращает
+        CriticalPath(task_ids, slack) или None.
+        """
+        return self.dependency_graph().critical_path(today, days_per_task)
+
+    def close(self):
+        self.db_connector.close_connection()
+
+
+if __name__ == "__main__":
+    scheduler = TaskScheduler("scheduler.db")
+
+    scheduler.close()
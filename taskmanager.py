@@ -1,365 +1,653 @@
-import sys
-from PyQt6.QtWidgets import (
-    QApplication,
-    QWidget,
-    QVBoxLayout,
-    QHBoxLayout,
-    QLabel,
-    QLineEdit,
-    QPushButton,
-    QTableWidget,
-    QAbstractItemView,
-    QMessageBox,
-    QComboBox,
-    QTableWidgetItem,
-)
-from task_scheduler import TaskScheduler  # Импортируем класс TaskScheduler
-from datetime import datetime
-
-
-class MainWindow(QWidget):
-    def __init__(self) -> None:
-        super().__init__()
-        self.setWindowTitle("Таск Менеджер")
-        self.setMinimumWidth(750)
-
-        self.scheduler = TaskScheduler("scheduler.db")
-        main_layout = QVBoxLayout()
-
-        # Верхняя часть
-        top_layout = QVBoxLayout()
-        self.create_input_fields(top_layout)  # Создаем поля ввода
-        self.create_buttons(top_layout)        # Создаем кнопки
-        self.create_search_button(top_layout)  # Создаем кнопку поиска
-        main_layout.addLayout(top_layout)
-
-        # Средняя часть
-        mid_layout = QHBoxLayout()
-        self.create_middle_section(mid_layout)  # Создаем среднюю секцию
-        main_layout.addLayout(mid_layout)
-
-        # Нижняя часть
-        bottom_layout = QVBoxLayout()
-        self.create_table(bottom_layout)        # Создаем таблицу
-        self.create_delete_button(bottom_layout)  # Создаем кнопку удалить
-        main_layout.addLayout(bottom_layout)
-
-        self.setLayout(main_layout)
-        self.load_tasks()  # Загружаем задачи при запуске
-
-    def create_search_button(self, layout: QVBoxLayout) -> None:
-        """Поиск по таблице."""
-        # Добавление текстового поля для поиска
-        self.search_input = QLineEdit()
-        self.search_input.setPlaceholderText("Поиск...")
-        layout.addWidget(self.search_input)
-
-        search_button = QPushButton("Поиск")
-        layout.addWidget(search_button)
-        search_button.clicked.connect(self.search_tasks)
-
-    def search_tasks(self) -> None:
-        """Ищет задачи по введенному тексту в любом поле таблицы."""
-        search_text = self.search_input.text().lower()  # текст для поиска
-        found_rows = []  # Список для найденных строк
-
-        for row in range(self.table.rowCount()):
-            for column in range(self.table.columnCount()):
-                item = self.table.item(row, column)
-                if item and search_text in item.text().lower():
-                    found_rows.append(row)
-                    break  # Если нашли, выходим из внутреннего цикла
-
-        # Скрываем все строки, а затем показываем только найденные
-        for row in range(self.table.rowCount()):
-            self.table.setRowHidden(row, True)
-
-        for row in found_rows:
-            self.table.setRowHidden(row, False)
-        self.search_input.clear()
-
-    def create_delete_button(self, layout: QVBoxLayout) -> None:
-        """Создает кнопку для удаления выбранной задачи."""
-        delete_button = QPushButton("Удалить")
-        layout.addWidget(delete_button)
-
-        # Подключаем кнопку удаления к методу delete_task
-        delete_button.clicked.connect(self.delete_task)
-
-    def create_input_fields(self, layout: QVBoxLayout) -> None:
-        """Создает поля ввода и соответствующие метки."""
-        # Список надписей на метках
-        labels = ["ИД", "Имя задачи",
-                  "Описание", "Приоритет", "Статус", "Дедлайн", "Комментарий"]
-
-        # Создаем текстовые поля и комбобоксы
-        self.id_input = QLineEdit()  # ИД
-        self.id_input.setDisabled(True)  # Поле ИД недоступно
-        self.task_name_input = QLineEdit()  # Имя задачи
-        self.description_input = QLineEdit()  # Описание
-        self.priority_combo = QComboBox()  # Приоритет
-        self.priority_combo.addItems(["низкий", "средний", "высокий"])
-        self.status_combo = QComboBox()  # Статус
-        self.status_combo.addItems(["новая задача", "в работе",
-                                    "отменена", "решено"])
-
-        # Устанавливаем маску для поля "Дедлайн"
-        self.deadline_input = QLineEdit()  # Дедлайн
-        self.deadline_input.setInputMask("9999-99-99;_")  # дата ГГГГ-ММ-ДД
-        self.comment_input = QLineEdit()  # Комментарий
-
-        # Создаем горизонтальные Layout для размещения меток и полей
-        for i, label in enumerate(labels):
-            input_layout = QHBoxLayout()  # Новый layout для метки и поля
-            input_layout.addWidget(QLabel(label))  # Добавляем метку
-
-            # Условие для выбора соответствующего поля ввода
-            if i == 0:
-                input_widget = self.id_input
-            elif i == 1:
-                input_widget = self.task_name_input
-            elif i == 2:
-                input_widget = self.description_input
-            elif i == 3:
-                input_widget = self.priority_combo
-            elif i == 4:
-                input_widget = self.status_combo
-            elif i == 5:
-                input_widget = self.deadline_input
-            else:  # Комментарий
-                input_widget = self.comment_input
-
-            input_widget.setDisabled(True)  # все текстовые поля недоступны
-            input_layout.addWidget(input_widget)  # Добавляем поле ввода
-            layout.addLayout(input_layout)  # Добавляем в вертикальный
-
-    def create_buttons(self, layout: QVBoxLayout) -> None:
-        """Создает кнопки в верхней части."""
-        button_layout = QHBoxLayout()
-
-        # Создание кнопок
-        self.new_task_button = QPushButton("Новая задача")
-        self.edit_button = QPushButton("Редактировать")
-        self.cancel_button = QPushButton("Отмена")
-        self.save_button = QPushButton("Сохранить")
-
-        # По умолчанию кнопка отмены и сохранения неактивны
-        self.cancel_button.setDisabled(True)
-        self.save_button.setDisabled(True)
-
-        # Подключение сигналов к слотам
-        self.new_task_button.clicked.connect(self.new_task)
-        self.edit_button.clicked.connect(self.edit_task)
-        self.cancel_button.clicked.connect(self.cancel_task)
-        self.save_button.clicked.connect(self.save_task)  # сохраняет в БД
-
-        # Добавляем кнопки на layout
-        button_layout.addWidget(self.new_task_button)
-        button_layout.addWidget(self.edit_button)
-        button_layout.addWidget(self.cancel_button)
-        button_layout.addWidget(self.save_button)
-
-        layout.addLayout(button_layout)
-
-    def new_task(self) -> None:
-        """Создает новую задачу."""
-        for input_field in [self.task_name_input,
-                            self.description_input,
-                            self.deadline_input,
-                            self.comment_input]:
-            input_field.clear()
-            input_field.setEnabled(True)  # Делаем поля доступными для записи
-        self.id_input.clear()
-        self.priority_combo.setEnabled(True)  # Активируем выбор приоритета
-        self.status_combo.setEnabled(True)    # Активируем выбор статуса
-        self.new_task_button.setDisabled(True)    # Деактивируем кнопку отмены
-        self.edit_button.setDisabled(True)      # Деактивируем кнопку сохранить
-        self.cancel_button.setEnabled(True)    # Активируем кнопку отмены
-        self.save_button.setEnabled(True)      # Активируем кнопку сохранить
-        self.table.setDisabled(True)  # Деактивируем таблицу
-
-    def edit_task(self) -> None:
-        """Редактирует существующую задачу."""
-        selected_row = self.table.currentRow()
-        if selected_row < 0:
-            QMessageBox.warning(self, "Ошибка", "Сначала выберите задачу.")
-            return
-
-        task_data = [self.table.item(selected_row, i).text() for i in range(7)]
-
-        # Заполняем поля ввода данными задачи
-        self.id_input.setText(task_data[0])  # ИД, поле не редактируется
-        self.task_name_input.setText(task_data[1])
-        self.description_input.setText(task_data[2])
-        self.priority_combo.setCurrentText(task_data[3])
-        self.status_combo.setCurrentText(task_data[4])
-        self.deadline_input.setText(task_data[5])
-        self.comment_input.setText(task_data[6])
-
-        # Делаем поля доступными для редактирования
-        for input_field in [self.task_name_input,
-                            self.description_input,
-                            self.deadline_input,
-                            self.comment_input]:
-            input_field.setEnabled(True)
-
-        # Активируем выбор для комбобоксов
-        self.priority_combo.setEnabled(True)
-        self.status_combo.setEnabled(True)
-        self.new_task_button.setDisabled(True)    # Деактивируем кнопку отмены
-        self.edit_button.setDisabled(True)      # Деактивируем кнопку сохранить
-        self.cancel_button.setEnabled(True)    # Активируем кнопку отмены
-        self.save_button.setEnabled(True)      # Активируем кнопку сохранить
-        self.table.setDisabled(True)  # Деактивируем таблицу
-
-    def cancel_task(self) -> None:
-        """Отменяет изменения с подтверждением."""
-        for input_field in [self.task_name_input,
-                            self.description_input,
-                            self.deadline_input, self.comment_input]:
-            input_field.clear()
-            input_field.setDisabled(True)  # Делаем поля недоступными
-
-        # Сброс значений для комбобоксов
-        self.priority_combo.setCurrentIndex(0)
-        self.priority_combo.setDisabled(True)  # Деактивируем выбор приоритета
-        self.status_combo.setCurrentIndex(0)
-        self.status_combo.setDisabled(True)    # Деактивируем выбор статуса
-        self.new_task_button.setEnabled(True)    # Активируем кнопку отмены
-        self.edit_button.setEnabled(True)      # Активируем кнопку сохранить
-        self.cancel_button.setDisabled(True)    # Деактивируем кнопку отмены
-        self.save_button.setDisabled(True)      # Деактивируем кнопку сохранить
-        self.table.setEnabled(True)  # Активируем таблицу
-
-    def save_task(self) -> None:
-        """Сохраняет задачу и взаимодействует с базой данных."""
-        #  добавить обработку на пустые поля
-        task_name = self.task_name_input.text()
-        description = self.description_input.text()
-        priority = self.priority_combo.currentText()
-        status = self.status_combo.currentText()
-        deadline = self.deadline_input.text()
-        comment = self.comment_input.text()
-        if (task_name != '') and (description != '') and (deadline != '--'):
-            try:
-                date_object = datetime.strptime(deadline, "%Y-%m-%d").date()
-            except Exception:
-                now = datetime.now().date()
-                date_object = datetime.strptime(
-                    '{:%Y-%m-}{}'.format(now, now.day - 1), "%Y-%m-%d").date()
-
-            if date_object >= datetime.now().date():
-
-                # Если редактируем задачу
-                if self.table.currentRow() >= 0:
-                    record_id = int(self.table.item(
-                        self.table.currentRow(), 0).text())
-                    self.scheduler.update_task(record_id,
-                                               task_name, description,
-                                               priority, status,
-                                               deadline, comment)
-                else:  # Если создаем новую задачу
-                    self.scheduler.add_task(task_name, description,
-                                            priority, status,
-                                            deadline, comment)
-
-                self.load_tasks()  # Обновляем таблицу задач
-                self.cancel_task()  # Деактивируем изменения
-            else:
-                QMessageBox.warning(self,
-                                    "Ошибка", "Не корректная дата дедлайна."
-                                    )
-            self.new_task_button.setEnabled(True)    # Активируем кнопку отмены
-            self.edit_button.setEnabled(True)      # Актив. кнопку сохранить
-            self.table.setEnabled(True)  # Активируем таблицу
-
-        else:
-            QMessageBox.warning(self,
-                                "Ошибка", "Не Заполнены обязательные поля."
-                                )
-
-    def load_tasks(self) -> None:
-        """Загружает и отображает все задачи из базы данных в таблице."""
-        tasks = self.scheduler.get_all_tasks()
-        self.table.setEditTriggers(
-            QAbstractItemView.EditTrigger.AllEditTriggers)
-        self.table.setRowCount(0)  # Очищаем таблицу
-
-        for task in tasks:
-            row_position = self.table.rowCount()
-            self.table.insertRow(row_position)
-            for col, value in enumerate(task):
-                item = QTableWidgetItem(str(value))
-                self.table.setItem(row_position, col, item)
-        self.table.setEditTriggers(
-            QAbstractItemView.EditTrigger.NoEditTriggers)
-
-    def delete_task(self) -> None:
-        """Удаляет выбранную задачу из таблицы и базы данных."""
-        selected_row = self.table.currentRow()  # Получаем выбранную строку
-        if selected_row < 0:
-            # Предупреждение при отсутствии выбора
-            QMessageBox.warning(self, "Ошибка", "Сначала выберите задачу.")
-            return
-
-        # Получаем ИД задачи для удаления
-        record_id = int(self.table.item(selected_row, 0).text())
-        self.scheduler.delete_task(record_id)  # Вызываем метод удаления
-
-    # Обновляем таблицу задач после удаления
-        self.load_tasks()
-
-    def create_middle_section(self, layout: QHBoxLayout) -> None:
-        """Создает среднюю секцию с полем ввода и кнопкой."""
-        pass
-
-    def create_table(self, layout: QVBoxLayout) -> None:
-        """Создает таблицу в нижней части."""
-        self.table = QTableWidget(0, 7)  # Начинаем с 0 строк и 7 колонок
-        self.table.setHorizontalHeaderLabels(
-            ["ИД", "Имя задачи", "Описание",
-             "Приоритет", "Статус", "Дедлайн", "Комментарий"]
-        )
-
-        # Установить режим выделения для целых строк
-        self.table.setSelectionMode(
-            QAbstractItemView.SelectionMode.SingleSelection
-        )
-        self.table.setSelectionBehavior(
-            QAbstractItemView.SelectionBehavior.SelectRows
-        )
-        # Подключаем заполнение полей
-        self.table.itemClicked.connect(self.populate_fields_from_selection)
-        # Запрет ручной правки таблицы
-        self.table.setEditTriggers(
-            QAbstractItemView.EditTrigger.NoEditTriggers)
-        layout.addWidget(self.table)
-
-    def populate_fields_from_selection(self, item) -> None:
-        """Заполняет поля данными из выделенной строки таблицы."""
-        selected_row = self.table.currentRow()
-        task_data = [self.table.item(selected_row, i).text() for i in range(7)]
-
-        self.id_input.setText(task_data[0])  # ИД
-        self.task_name_input.setText(task_data[1])
-        self.description_input.setText(task_data[2])
-        self.priority_combo.setCurrentText(task_data[3])
-        self.status_combo.setCurrentText(task_data[4])
-        self.deadline_input.setText(task_data[5])
-        self.comment_input.setText(task_data[6])
-
-        # Делаем поля недоступными
-        for input_field in [self.task_name_input,
-                            self.description_input,
-                            self.deadline_input, self.comment_input]:
-            input_field.setDisabled(True)
-
-        self.priority_combo.setEnabled(False)  # Деактивируем выбор приоритета
-        self.status_combo.setEnabled(False)    # Деактивируем выбор статуса
-
-
-if __name__ == "__main__":
-    app = QApplication(sys.argv)
-    window = MainWindow()
-    window.show()
-    sys.exit(app.exec())
+import logging
+import sys
+from functools import partial
+from PyQt6.QtCore import Qt, QTimer
+from PyQt6.QtWidgets import (
+    QApplication,
+    QWidget,
+    QVBoxLayout,
+    QHBoxLayout,
+    QLabel,
+    QLineEdit,
+    QPushButton,
+    QTableView,
+    QAbstractItemView,
+    QMessageBox,
+    QComboBox,
+    QSpinBox,
+    QCheckBox,
+)
+from task_scheduler import TaskScheduler  # Импортируем класс TaskScheduler
+from task_model import TaskTableModel
+from deadline_notifier import DeadlineNotifier
+from workers import DbRunner
+from datetime import datetime
+from task import PRIORITY_LABELS, STATUS_LABELS, Priority, Status, Task
+from recurrence import FREQUENCIES
+from logging_setup import setup_logging
+
+logger = logging.getLogger(__name__)
+
+# Как часто проверять изменения, сделанные другими окнами, мс
+SYNC_INTERVAL_MS = 2000
+
+# Пауза после ввода, после которой выполняется поиск, мс
+SEARCH_DELAY_MS = 250
+
+# Как часто переносить старые завершенные задачи в архив и очищать журнал
+# изменений, мс, и сколько задач переносить за раз, чтобы закрытие окна
+# не ждало долгого переноса. Первый раз - через ARCHIVE_DELAY_MS после
+# запуска, чтобы не замедлять загрузку первой страницы
+ARCHIVE_INTERVAL_MS = 60 * 60 * 1000
+ARCHIVE_DELAY_MS = 60 * 1000
+ARCHIVE_LIMIT = 5000
+
+# Пункты списка повторения: первый - без повторения, остальные по
+# порядку recurrence.FREQUENCIES
+REPEAT_LABELS = ["не повторять", "дней", "недель", "месяцев"]
+
+
+class MainWindow(QWidget):
+    def __init__(self, archive: bool = True) -> None:
+        """archive - периодически переносить старые задачи в архив."""
+        super().__init__()
+        self.setWindowTitle("Таск Менеджер")
+        self.setMinimumWidth(750)
+
+        self.scheduler = TaskScheduler("scheduler.db")
+        # Все запросы к базе выполняются в фоновых потоках
+        self.runner = DbRunner(self)
+        # ИД задачи, открытой кнопкой "Редактировать"; None - форма
+        # создает новую задачу
+        self.editing_id = None
+        main_layout = QVBoxLayout()
+
+        # Верхняя часть
+        top_layout = QVBoxLayout()
+        self.create_input_fields(top_layout)  # Создаем поля ввода
+        self.create_buttons(top_layout)        # Создаем кнопки
+        self.create_search_button(top_layout)  # Создаем кнопку поиска
+        self.create_filters(top_layout)        # Создаем фильтры
+        self.create_deadline_notifier(top_layout)  # Создаем оповещения
+        main_layout.addLayout(top_layout)
+
+        # Средняя часть
+        mid_layout = QHBoxLayout()
+        self.create_middle_section(mid_layout)  # Создаем среднюю секцию
+        main_layout.addLayout(mid_layout)
+
+        # Нижняя часть
+        bottom_layout = QVBoxLayout()
+        self.create_table(bottom_layout)        # Создаем таблицу
+        self.create_delete_button(bottom_layout)  # Создаем кнопку удалить
+        main_layout.addLayout(bottom_layout)
+
+        self.setLayout(main_layout)
+
+        # Версия журнала изменений, с которой сверяется таблица. Читаем ее
+        # до загрузки задач, чтобы не пропустить изменения между ними.
+        self.change_version = self.scheduler.get_change_version()
+        self.load_tasks()  # Загружаем задачи при запуске
+        self.create_sync_timer()
+        self.create_archive_timer(archive)
+
+    def create_sync_timer(self) -> None:
+        """Запускает таймер проверки изменений из других окон."""
+        self.sync_timer = QTimer(self)
+        self.sync_timer.setInterval(SYNC_INTERVAL_MS)
+        self.sync_timer.timeout.connect(self.poll_changes)
+        self.sync_timer.start()
+
+    def create_archive_timer(self, archive: bool) -> None:
+        """Создает таймер переноса старых завершенных задач в архив.
+
+        Если archive истинно, перенос выполняется в фоновом потоке через
+        ARCHIVE_DELAY_MS после запуска и затем каждые
+        ARCHIVE_INTERVAL_MS. Перенесенные задачи уходят из таблицы через
+        журнал изменений, как удаленные. Тот же таймер удаляет из
+        журнала изменений версии старше CHANGE_LOG_SIZE последних.
+        """
+        self.archive_timer = QTimer(self)
+        self.archive_timer.timeout.connect(self.archive_tasks)
+        if archive:
+            self.archive_timer.start(ARCHIVE_DELAY_MS)
+
+    def archive_tasks(self) -> None:
+        """Переносит в архив очередную порцию завершенных задач."""
+        self.archive_timer.setInterval(ARCHIVE_INTERVAL_MS)
+        self.runner.submit(self.scheduler.archive_tasks,
+                           limit=ARCHIVE_LIMIT, on_error=self.show_db_error,
+                           channel="archive")
+        self.runner.submit(self.scheduler.trim_change_log,
+                           on_error=self.show_db_error, channel="trim")
+
+    def poll_changes(self) -> None:
+        """Запрашивает изменения задач после последней известной версии."""
+        self.runner.submit(self.scheduler.get_changes_since,
+                           self.change_version,
+                           on_result=self.apply_changes, channel="changes")
+
+    def apply_changes(self, changes) -> None:
+        """Применяет к таблице только изменившиеся задачи.
+
+        Если окно отстало от очищенного журнала изменений
+        (changes.reset), таблица, сводка и дедлайны перечитываются.
+        """
+        self.change_version = changes.version
+        if changes.reset:
+            self.clear_search()
+            self.load_tasks()
+            self.refresh_stats()
+            self.deadline_notifier.apply_changes(changes)
+            return
+        self.model.apply_changes(changes.tasks, changes.deleted)
+        if changes.tasks or changes.deleted:
+            self.refresh_stats()
+        self.deadline_notifier.apply_changes(changes)
+
+    def create_deadline_notifier(self, layout: QVBoxLayout) -> None:
+        """Создает строку оповещений о дедлайнах задач."""
+        self.deadline_label = QLabel()
+        layout.addWidget(self.deadline_label)
+        self.deadline_notifier = DeadlineNotifier(self.scheduler, self)
+        self.deadline_notifier.due.connect(
+            lambda task: self.show_deadline("Срок сегодня", task))
+        self.deadline_notifier.overdue.connect(
+            lambda task: self.show_deadline("Просрочена", task))
+        self.deadline_notifier.start(self.runner)
+
+    def show_deadline(self, text: str, task: Task) -> None:
+        """Показывает оповещение о дедлайне задачи."""
+        logger.info("%s: задача %d '%s', дедлайн %s", text, task.id,
+                    task.task_name, task.deadline)
+        self.deadline_label.setText(
+            f"{text}: {task.task_name} ({task.deadline})")
+
+    def create_search_button(self, layout: QVBoxLayout) -> None:
+        """Поиск по таблице."""
+        # Добавление текстового поля для поиска
+        self.search_input = QLineEdit()
+        self.search_input.setPlaceholderText("Поиск...")
+        layout.addWidget(self.search_input)
+
+        search_button = QPushButton("Поиск")
+        layout.addWidget(search_button)
+        search_button.clicked.connect(self.search_tasks)
+
+        # Архив завершенных задач читается только по запросу
+        self.archive_checkbox = QCheckBox("Архив")
+        self.archive_checkbox.toggled.connect(self.show_archive)
+        layout.addWidget(self.archive_checkbox)
+
+        # Поиск по мере ввода: запрос выполняется, когда пользователь
+        # сделал паузу, а не на каждый символ
+        self.search_timer = QTimer(self)
+        self.search_timer.setSingleShot(True)
+        self.search_timer.setInterval(SEARCH_DELAY_MS)
+        self.search_timer.timeout.connect(self.search_tasks)
+        self.search_input.textChanged.connect(self.search_timer.start)
+        self.search_input.returnPressed.connect(self.search_tasks)
+
+    def search_tasks(self) -> None:
+        """Ищет задачи по введенному тексту в любом поле таблицы."""
+        self.search_timer.stop()
+        search_text = self.search_input.text()  # текст для поиска
+
+        # Поиск выполняет полнотекстовый индекс в базе в фоновом потоке,
+        # уточнение запроса отбирает задачи из уже найденных. Пустой
+        # запрос показывает все задачи.
+        self.model.search(search_text)
+
+    def show_archive(self, archive: bool) -> None:
+        """Показывает в таблице архив или текущие задачи.
+
+        Архивные задачи только просматриваются, изменять их нельзя.
+        """
+        self.model.set_archive(archive)
+        for button in [self.new_task_button, self.edit_button,
+                       self.delete_button]:
+            button.setDisabled(archive)
+
+    def clear_search(self) -> None:
+        """Очищает поле поиска, не запуская новый поиск."""
+        self.search_timer.stop()
+        self.search_input.blockSignals(True)
+        self.search_input.clear()
+        self.search_input.blockSignals(False)
+
+    def sort_changed(self, column: int, order: Qt.SortOrder) -> None:
+        """Сбрасывает поиск после сортировки.
+
+        Если колонку нельзя сортировать, модель сортировку не меняет, и
+        указатель сортировки возвращается на прежнюю колонку.
+        """
+        if self.model.is_sortable(column):
+            # Сортировка выходит из режима поиска
+            self.clear_search()
+            return
+        header = self.table.horizontalHeader()
+        header.blockSignals(True)
+        header.setSortIndicator(*self.model.sort_order())
+        header.blockSignals(False)
+
+    def create_filters(self, layout: QVBoxLayout) -> None:
+        """Создает фильтры таблицы по статусу и приоритету."""
+        filter_layout = QHBoxLayout()
+
+        self.status_filter = QComboBox()
+        self.status_filter.addItems(["все статусы"] + STATUS_LABELS)
+        self.priority_filter = QComboBox()
+        self.priority_filter.addItems(["все приоритеты"] + PRIORITY_LABELS)
+
+        # Фильтрация выполняется запросом к базе
+        self.status_filter.currentIndexChanged.connect(self.apply_filters)
+        self.priority_filter.currentIndexChanged.connect(self.apply_filters)
+
+        filter_layout.addWidget(QLabel("Статус"))
+        filter_layout.addWidget(self.status_filter)
+        filter_layout.addWidget(QLabel("Приоритет"))
+        filter_layout.addWidget(self.priority_filter)
+        layout.addLayout(filter_layout)
+
+    def apply_filters(self) -> None:
+        """Показывает задачи с выбранными статусом и приоритетом."""
+        status = self.status_filter.currentIndex()
+        priority = self.priority_filter.currentIndex()
+        # Первый пункт списка - без фильтра
+        self.model.set_filters(
+            status=Status(status - 1) if status > 0 else None,
+            priority=Priority(priority - 1) if priority > 0 else None)
+
+    def create_delete_button(self, layout: QVBoxLayout) -> None:
+        """Создает кнопку для удаления выбранной задачи."""
+        self.delete_button = QPushButton("Удалить")
+        layout.addWidget(self.delete_button)
+
+        # Подключаем кнопку удаления к методу delete_task
+        self.delete_button.clicked.connect(self.delete_task)
+
+    def create_input_fields(self, layout: QVBoxLayout) -> None:
+        """Создает поля ввода и соответствующие метки."""
+        # Список надписей на метках
+        labels = ["ИД", "Имя задачи",
+                  "Описание", "Приоритет", "Статус", "Дедлайн", "Комментарий"]
+
+        # Создаем текстовые поля и комбобоксы
+        self.id_input = QLineEdit()  # ИД
+        self.id_input.setDisabled(True)  # Поле ИД недоступно
+        self.task_name_input = QLineEdit()  # Имя задачи
+        self.description_input = QLineEdit()  # Описание
+        self.priority_combo = QComboBox()  # Приоритет
+        self.priority_combo.addItems(PRIORITY_LABELS)
+        self.status_combo = QComboBox()  # Статус
+        self.status_combo.addItems(STATUS_LABELS)
+
+        # Устанавливаем маску для поля "Дедлайн"
+        self.deadline_input = QLineEdit()  # Дедлайн
+        self.deadline_input.setInputMask("9999-99-99;_")  # дата ГГГГ-ММ-ДД
+        self.comment_input = QLineEdit()  # Комментарий
+
+        # Создаем горизонтальные Layout для размещения меток и полей
+        for i, label in enumerate(labels):
+            input_layout = QHBoxLayout()  # Новый layout для метки и поля
+            input_layout.addWidget(QLabel(label))  # Добавляем метку
+
+            # Условие для выбора соответствующего поля ввода
+            if i == 0:
+                input_widget = self.id_input
+            elif i == 1:
+                input_widget = self.task_name_input
+            elif i == 2:
+                input_widget = self.description_input
+            elif i == 3:
+                input_widget = self.priority_combo
+            elif i == 4:
+                input_widget = self.status_combo
+            elif i == 5:
+                input_widget = self.deadline_input
+            else:  # Комментарий
+                input_widget = self.comment_input
+
+            input_widget.setDisabled(True)  # все текстовые поля недоступны
+            input_layout.addWidget(input_widget)  # Добавляем поле ввода
+            layout.addLayout(input_layout)  # Добавляем в вертикальный
+
+        # Повторение новой задачи: каждые N дней, недель или месяцев
+        repeat_layout = QHBoxLayout()
+        repeat_layout.addWidget(QLabel("Повторять каждые"))
+        self.repeat_interval = QSpinBox()
+        self.repeat_interval.setRange(1, 365)
+        self.repeat_combo = QComboBox()
+        self.repeat_combo.addItems(REPEAT_LABELS)
+        for input_widget in [self.repeat_interval, self.repeat_combo]:
+            input_widget.setDisabled(True)
+            repeat_layout.addWidget(input_widget)
+        layout.addLayout(repeat_layout)
+
+    def create_buttons(self, layout: QVBoxLayout) -> None:
+        """Создает кнопки в верхней части."""
+        button_layout = QHBoxLayout()
+
+        # Создание кнопок
+        self.new_task_button = QPushButton("Новая задача")
+        self.edit_button = QPushButton("Редактировать")
+        self.cancel_button = QPushButton("Отмена")
+        self.save_button = QPushButton("Сохранить")
+
+        # По умолчанию кнопка отмены и сохранения неактивны
+        self.cancel_button.setDisabled(True)
+        self.save_button.setDisabled(True)
+
+        # Подключение сигналов к слотам
+        self.new_task_button.clicked.connect(self.new_task)
+        self.edit_button.clicked.connect(self.edit_task)
+        self.cancel_button.clicked.connect(self.cancel_task)
+        self.save_button.clicked.connect(self.save_task)  # сохраняет в БД
+
+        # Добавляем кнопки на layout
+        button_layout.addWidget(self.new_task_button)
+        button_layout.addWidget(self.edit_button)
+        button_layout.addWidget(self.cancel_button)
+        button_layout.addWidget(self.save_button)
+
+        layout.addLayout(button_layout)
+
+    def new_task(self) -> None:
+        """Создает новую задачу."""
+        for input_field in [self.task_name_input,
+                            self.description_input,
+                            self.deadline_input,
+                            self.comment_input]:
+            input_field.clear()
+            input_field.setEnabled(True)  # Делаем поля доступными для записи
+        self.id_input.clear()
+        self.editing_id = None
+        self.repeat_combo.setEnabled(True)     # Повторять можно новую задачу
+        self.repeat_interval.setEnabled(True)
+        self.priority_combo.setEnabled(True)  # Активируем выбор приоритета
+        self.status_combo.setEnabled(True)    # Активируем выбор статуса
+        self.new_task_button.setDisabled(True)    # Деактивируем кнопку отмены
+        self.edit_button.setDisabled(True)      # Деактивируем кнопку сохранить
+        self.cancel_button.setEnabled(True)    # Активируем кнопку отмены
+        self.save_button.setEnabled(True)      # Активируем кнопку сохранить
+        self.table.setDisabled(True)  # Деактивируем таблицу
+
+    def edit_task(self) -> None:
+        """Редактирует существующую задачу."""
+        selected_row = self.table.currentIndex().row()
+        if selected_row < 0:
+            QMessageBox.warning(self, "Ошибка", "Сначала выберите задачу.")
+            return
+
+        task = self.model.task_at(selected_row)
+        self.editing_id = task.id
+        task_data = ["" if value is None else str(value)
+                     for value in task[:7]]
+
+        # Заполняем поля ввода данными задачи
+        self.id_input.setText(task_data[0])  # ИД, поле не редактируется
+        self.task_name_input.setText(task_data[1])
+        self.description_input.setText(task_data[2])
+        self.priority_combo.setCurrentText(task_data[3])
+        self.status_combo.setCurrentText(task_data[4])
+        self.deadline_input.setText(task_data[5])
+        self.comment_input.setText(task_data[6])
+
+        # Делаем поля доступными для редактирования
+        for input_field in [self.task_name_input,
+                            self.description_input,
+                            self.deadline_input,
+                            self.comment_input]:
+            input_field.setEnabled(True)
+
+        # Активируем выбор для комбобоксов
+        self.priority_combo.setEnabled(True)
+        self.status_combo.setEnabled(True)
+        self.new_task_button.setDisabled(True)    # Деактивируем кнопку отмены
+        self.edit_button.setDisabled(True)      # Деактивируем кнопку сохранить
+        self.cancel_button.setEnabled(True)    # Активируем кнопку отмены
+        self.save_button.setEnabled(True)      # Активируем кнопку сохранить
+        self.table.setDisabled(True)  # Деактивируем таблицу
+
+    def cancel_task(self) -> None:
+        """Отменяет изменения с подтверждением."""
+        for input_field in [self.task_name_input,
+                            self.description_input,
+                            self.deadline_input, self.comment_input]:
+            input_field.clear()
+            input_field.setDisabled(True)  # Делаем поля недоступными
+        self.editing_id = None
+
+        # Сброс значений для комбобоксов
+        self.priority_combo.setCurrentIndex(0)
+        self.priority_combo.setDisabled(True)  # Деактивируем выбор приоритета
+        self.status_combo.setCurrentIndex(0)
+        self.status_combo.setDisabled(True)    # Деактивируем выбор статуса
+        self.repeat_combo.setCurrentIndex(0)
+        self.repeat_combo.setDisabled(True)
+        self.repeat_interval.setValue(1)
+        self.repeat_interval.setDisabled(True)
+        self.new_task_button.setEnabled(True)    # Активируем кнопку отмены
+        self.edit_button.setEnabled(True)      # Активируем кнопку сохранить
+        self.cancel_button.setDisabled(True)    # Деактивируем кнопку отмены
+        self.save_button.setDisabled(True)      # Деактивируем кнопку сохранить
+        self.table.setEnabled(True)  # Активируем таблицу
+
+    def save_task(self) -> None:
+        """Сохраняет задачу и взаимодействует с базой данных."""
+        #  добавить обработку на пустые поля
+        task_name = self.task_name_input.text()
+        description = self.description_input.text()
+        priority = self.priority_combo.currentText()
+        status = self.status_combo.currentText()
+        deadline = self.deadline_input.text()
+        comment = self.comment_input.text()
+        if (task_name != '') and (description != '') and (deadline != '--'):
+            try:
+                date_object = datetime.strptime(deadline, "%Y-%m-%d").date()
+            except Exception:
+                now = datetime.now().date()
+                date_object = datetime.strptime(
+                    '{:%Y-%m-}{}'.format(now, now.day - 1), "%Y-%m-%d").date()
+
+            if date_object >= datetime.now().date():
+
+                # Если редактируем задачу. Выделение в таблице не
+                # годится: строка остается выбранной и после сохранения
+                record_id = self.editing_id
+                if record_id is not None:
+                    self.runner.submit(self.scheduler.update_task, record_id,
+                                       task_name, description,
+                                       priority, status, deadline, comment,
+                                       on_result=partial(self.on_task_updated,
+                                                         replaces=record_id),
+                                       on_error=self.show_db_error)
+                elif self.repeat_combo.currentIndex() > 0:
+                    # Вхождения серии появятся при загрузке таблицы
+                    self.runner.submit(
+                        self.scheduler.add_recurring_task,
+                        task_name, description, priority, status, deadline,
+                        comment,
+                        FREQUENCIES[self.repeat_combo.currentIndex() - 1],
+                        self.repeat_interval.value(),
+                        on_result=lambda _: self.load_tasks(),
+                        on_error=self.show_db_error)
+                else:  # Если создаем новую задачу
+                    self.runner.submit(self.insert_task,
+                                       task_name, description,
+                                       priority, status, deadline, comment,
+                                       on_result=self.on_task_inserted,
+                                       on_error=self.show_db_error)
+
+                self.cancel_task()  # Деактивируем изменения
+            else:
+                QMessageBox.warning(self,
+                                    "Ошибка", "Не корректная дата дедлайна."
+                                    )
+            self.new_task_button.setEnabled(True)    # Активируем кнопку отмены
+            self.edit_button.setEnabled(True)      # Актив. кнопку сохранить
+            self.table.setEnabled(True)  # Активируем таблицу
+
+        else:
+            QMessageBox.warning(self,
+                                "Ошибка", "Не Заполнены обязательные поля."
+                                )
+
+    def insert_task(self, *fields) -> Task:
+        """Добавляет задачу в базу и возвращает ее запись.
+
+        Выполняется в фоновом потоке.
+        """
+        return self.scheduler.get_task(self.scheduler.add_task(*fields))
+
+    def on_task_inserted(self, task) -> None:
+        """Вставляет в таблицу только новую строку."""
+        if task is not None:
+            self.model.insert_task(task)
+
+    def on_task_updated(self, task, replaces: int = None) -> None:
+        """Обновляет в таблице только измененную строку.
+
+        replaces - ИД строки, которую заменила задача, например
+        вхождения повторяющейся задачи, сохраненного отдельной задачей.
+        """
+        if task is None:
+            return
+        if replaces is not None and replaces != task.id:
+            self.model.remove_task(replaces)
+        self.model.update_task(task)
+
+    def on_task_deleted(self, tombstone) -> None:
+        """Убирает из таблицы только удаленную строку."""
+        if tombstone is None:
+            return
+        self.model.remove_task(tombstone.id)
+        if tombstone.id == self.editing_id:
+            self.cancel_task()  # Редактировать больше нечего
+
+    def show_db_error(self, error) -> None:
+        """Показывает ошибку, возникшую при работе с базой данных."""
+        logger.error("Ошибка базы данных", exc_info=error)
+        QMessageBox.warning(self, "Ошибка", f"Ошибка базы данных: {error}")
+
+    def load_tasks(self) -> None:
+        """Загружает и отображает все задачи из базы данных в таблице."""
+        # Модель загружает первую страницу, остальные - при прокрутке
+        self.model.reload()
+
+    def delete_task(self) -> None:
+        """Удаляет выбранную задачу из таблицы и базы данных."""
+        selected_row = self.table.currentIndex().row()  # Выбранная строка
+        if selected_row < 0:
+            # Предупреждение при отсутствии выбора
+            QMessageBox.warning(self, "Ошибка", "Сначала выберите задачу.")
+            return
+
+        # Получаем ИД задачи для удаления
+        record_id = self.model.task_at(selected_row).id
+        self.runner.submit(self.scheduler.delete_task, record_id,
+                           on_result=self.on_task_deleted,
+                           on_error=self.show_db_error)
+
+    def create_middle_section(self, layout: QHBoxLayout) -> None:
+        """Создает сводку по задачам: статусы, сроки и срочные задачи."""
+        self.stats_labels = {}
+        for name in ["total", *STATUS_LABELS, "urgent",
+                     "overdue", "due_today", "due_week"]:
+            label = QLabel()
+            layout.addWidget(label)
+            self.stats_labels[name] = label
+        self.refresh_stats()
+
+    def refresh_stats(self) -> None:
+        """Запрашивает сводку по задачам в фоновом потоке."""
+        self.runner.submit(self.scheduler.stats, on_result=self.show_stats,
+                           channel="stats")
+
+    def show_stats(self, stats) -> None:
+        """Показывает сводку по задачам."""
+        texts = {
+            "total": f"Всего: {stats.total}",
+            "urgent": "Высокий в работе: {}".format(
+                stats.by_status_priority.get(
+                    (Status.IN_PROGRESS, Priority.HIGH), 0)),
+            "overdue": f"Просрочено: {stats.overdue}",
+            "due_today": f"Сегодня: {stats.due_today}",
+            "due_week": f"На неделе: {stats.due_week}",
+        }
+        for status in Status:
+            texts[status.label] = (f"{status.label.capitalize()}: "
+                                   f"{stats.by_status.get(status, 0)}")
+        for name, text in texts.items():
+            self.stats_labels[name].setText(text)
+
+    def create_table(self, layout: QVBoxLayout) -> None:
+        """Создает таблицу в нижней части."""
+        # Модель подгружает задачи страницами, таблица рисует только
+        # видимые строки
+        self.model = TaskTableModel(self.scheduler, runner=self.runner)
+        self.model.load_failed.connect(self.show_db_error)
+        self.table = QTableView()
+        self.table.setModel(self.model)
+        # Щелчок по заголовку сортирует задачи запросом к базе,
+        # по умолчанию - по дедлайну
+        self.table.horizontalHeader().setSortIndicator(
+            5, Qt.SortOrder.AscendingOrder)
+        self.table.setSortingEnabled(True)
+        self.table.horizontalHeader().sortIndicatorChanged.connect(
+            self.sort_changed)
+
+        # Установить режим выделения для целых строк
+        self.table.setSelectionMode(
+            QAbstractItemView.SelectionMode.SingleSelection
+        )
+        self.table.setSelectionBehavior(
+            QAbstractItemView.SelectionBehavior.SelectRows
+        )
+        # Подключаем заполнение полей
+        self.table.clicked.connect(self.populate_fields_from_selection)
+        # Запрет ручной правки таблицы
+        self.table.setEditTriggers(
+            QAbstractItemView.EditTrigger.NoEditTriggers)
+        layout.addWidget(self.table)
+
+    def populate_fields_from_selection(self, index) -> None:
+        """Заполняет поля данными из выделенной строки таблицы."""
+        selected_row = index.row()
+        task_data = ["" if value is None else str(value)
+                     for value in self.model.task_at(selected_row)[:7]]
+
+        self.id_input.setText(task_data[0])  # ИД
+        self.task_name_input.setText(task_data[1])
+        self.description_input.setText(task_data[2])
+        self.priority_combo.setCurrentText(task_data[3])
+        self.status_combo.setCurrentText(task_data[4])
+        self.deadline_input.setText(task_data[5])
+        self.comment_input.setText(task_data[6])
+
+        # Делаем поля недоступными
+        for input_field in [self.task_name_input,
+                            self.description_input,
+                            self.deadline_input, self.comment_input]:
+            input_field.setDisabled(True)
+
+        self.priority_combo.setEnabled(False)  # Деактивируем выбор приоритета
+        self.status_combo.setEnabled(False)    # Деактивируем выбор статуса
+
+    def closeEvent(self, event) -> None:
+        """Дожидается фоновых запросов и закрывает базу данных."""
+        self.sync_timer.stop()
+        self.archive_timer.stop()
+        self.search_timer.stop()
+        self.deadline_notifier.stop()
+        self.runner.wait()
+        self.scheduler.close()
+        super().closeEvent(event)
+
+
+if __name__ == "__main__":
+    setup_logging()
+    app = QApplication(sys.argv)
+    window = MainWindow()
+    window.show()
+    sys.exit(app.exec())
@@ -0,0 +1,15 @@
+import os
+import sys
+
+import pytest
+
+# Модули приложения лежат в корне репозитория
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(
+    __file__))))
+os.environ.setdefault("QT_QPA_PLATFORM", "offscreen")
+
+
+@pytest.fixture
+def db_file(tmp_path):
+    """Путь к новой базе во временном каталоге."""
+    return str(tmp_path / "scheduler.db")
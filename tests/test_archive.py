@@ -0,0 +1,53 @@
+import sqlite3
+from datetime import date
+
+from task_scheduler import TaskScheduler
+
+TODAY = date(2025, 6, 1)
+OLD = date(2025, 1, 1)
+
+
+def _add(scheduler, name, status="решено"):
+    return scheduler.add_task(name, "", "низкий", status, OLD, "")
+
+
+def test_rearchived_id_is_not_found_by_old_text(db_file):
+    scheduler = TaskScheduler(db_file)
+    try:
+        task_id = _add(scheduler, "старый отчет")
+        assert scheduler.archive_tasks(today=TODAY) == 1
+        # Та же запись снова в Scheduler, например восстановлена из
+        # резервной копии, и уже с другим текстом
+        with sqlite3.connect(db_file) as connection:
+            connection.execute(
+                "INSERT INTO Scheduler (id, task_name, description, "
+                "priority, status, deadline, comment) VALUES "
+                "(?, 'новый план', '', 'низкий', 'решено', ?, '')",
+                (task_id, OLD.isoformat()))
+        connection.close()
+        scheduler.invalidate_cache()
+
+        assert scheduler.archive_tasks(today=TODAY) == 1
+        assert scheduler.search_archive("отчет") == []
+        assert [task.task_name for task in
+                scheduler.search_archive("план")] == ["новый план"]
+    finally:
+        scheduler.close()
+
+
+def test_restore_does_not_bring_back_dependencies(db_file):
+    scheduler = TaskScheduler(db_file)
+    try:
+        done = _add(scheduler, "готово")
+        waiting = _add(scheduler, "ждет", status="новая задача")
+        assert scheduler.add_dependency(waiting, done)
+        assert scheduler.archive_tasks(today=TODAY) == 1
+        assert scheduler.get_blockers(waiting) == set()
+
+        assert scheduler.restore_tasks([done]) == 1
+        assert scheduler.get_task(done).task_name == "готово"
+        assert scheduler.get_blockers(waiting) == set()
+        assert scheduler.add_dependency(waiting, done)
+        assert scheduler.get_blockers(waiting) == {done}
+    finally:
+        scheduler.close()
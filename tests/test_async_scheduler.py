@@ -0,0 +1,51 @@
+import asyncio
+import time
+
+import pytest
+
+from async_scheduler import AsyncTaskScheduler
+
+FIELDS = ("описание", "низкий", "новая задача", "2025-01-01", "")
+
+
+def test_failed_request_is_rolled_back(db_file):
+    async def run():
+        async with AsyncTaskScheduler(db_file) as scheduler:
+            inner = scheduler.scheduler
+
+            def half_done():
+                inner.add_task("не сохранится", *FIELDS)
+                raise ValueError("ошибка на середине запроса")
+
+            # Медленный запрос задерживает поток записи, и следующие
+            # запросы попадают в одну группу
+            slow = scheduler._write(time.sleep, 0.2)
+            await asyncio.sleep(0.05)
+            failed = scheduler._write(half_done)
+            saved = scheduler.add_task("сохранится", *FIELDS)
+            await slow
+            with pytest.raises(ValueError):
+                await failed
+            await saved
+            tasks = await scheduler.get_all_tasks()
+        return [task.task_name for task in tasks]
+
+    assert asyncio.run(run()) == ["сохранится"]
+
+
+def test_closed_caller_loop_does_not_stop_writer(db_file):
+    scheduler = AsyncTaskScheduler(db_file)
+    closed = asyncio.new_event_loop()
+    future = closed.create_future()
+    closed.close()
+    scheduler._requests.put((scheduler.scheduler.add_task,
+                             ("первая",) + FIELDS, closed, future))
+
+    async def run():
+        # Если поток записи остановился, ответа не будет
+        record_id = await asyncio.wait_for(
+            scheduler.add_task("вторая", *FIELDS), 10)
+        await scheduler.close()
+        return record_id
+
+    assert asyncio.run(run()) == 2
@@ -0,0 +1,89 @@
+import sqlite3
+from datetime import datetime
+
+from deadlines import DeadlineWatcher
+from task_scheduler import ChangeSet, TaskScheduler
+
+FIELDS = ("описание", "низкий", "новая задача", "2025-03-01", "")
+
+
+def _add(scheduler, count):
+    scheduler.add_tasks((f"задача {i}",) + FIELDS for i in range(count))
+
+
+def test_trim_keeps_last_versions(db_file):
+    scheduler = TaskScheduler(db_file)
+    try:
+        _add(scheduler, 10)
+        assert scheduler.get_change_version() == 10
+        assert scheduler.trim_change_log(keep=3) == 7
+        assert scheduler.get_change_version() == 10
+
+        # Версия не уменьшается, даже если журнал очищен целиком
+        scheduler.prune_changes(11)
+        assert scheduler.get_change_version() == 10
+        _add(scheduler, 1)
+        assert scheduler.get_change_version() == 11
+    finally:
+        scheduler.close()
+
+
+def test_reader_behind_horizon_gets_reset(db_file):
+    scheduler = TaskScheduler(db_file)
+    try:
+        _add(scheduler, 10)
+        scheduler.trim_change_log(keep=3)  # Остались версии 8, 9 и 10
+        changes = scheduler.get_changes_since(7)
+        assert not changes.reset
+        assert [task.id for task in changes.tasks] == [8, 9, 10]
+
+        changes = scheduler.get_changes_since(6)
+        assert changes == ChangeSet(10, [], [], True)
+
+        scheduler.prune_changes(11)
+        assert scheduler.get_changes_since(10) == ChangeSet(10, [], [])
+        assert scheduler.get_changes_since(9).reset
+    finally:
+        scheduler.close()
+
+
+def test_listeners_get_reset_when_log_was_trimmed(db_file):
+    scheduler = TaskScheduler(db_file)
+    received = []
+    try:
+        _add(scheduler, 3)
+        scheduler.dependency_graph()
+        scheduler.add_listener(received.append)
+        version = scheduler.get_change_version()
+        # Другой процесс изменил задачи и очистил журнал
+        with sqlite3.connect(db_file) as connection:
+            connection.execute("DELETE FROM Scheduler WHERE id = 1")
+            connection.execute("DELETE FROM Scheduler_changes")
+        connection.close()
+        scheduler._notify_since(version)
+        assert [changes.reset for changes in received] == [True]
+        assert scheduler._graph is None  # Граф перечитается
+    finally:
+        scheduler.close()
+
+
+def test_deadline_watcher_reloads_on_reset(db_file):
+    scheduler = TaskScheduler(db_file)
+    try:
+        _add(scheduler, 3)
+        watcher = DeadlineWatcher(scheduler,
+                                  clock=lambda: datetime(2025, 3, 1, 9))
+        watcher.start()
+        watcher.poll()
+        assert set(watcher._fired) == {1, 2, 3}
+        with sqlite3.connect(db_file) as connection:
+            connection.execute("DELETE FROM Scheduler WHERE id = 1")
+            connection.execute("UPDATE Scheduler SET deadline = "
+                               "'2025-03-02' WHERE id = 2")
+        connection.close()
+        watcher.apply_changes(ChangeSet(10, [], [], True))
+        assert set(watcher._tasks) == {2, 3}
+        assert set(watcher._fired) == {3}
+        watcher.stop()
+    finally:
+        scheduler.close()
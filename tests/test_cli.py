@@ -0,0 +1,94 @@
+from datetime import date, timedelta
+
+import pytest
+
+import cli
+import db
+from task_scheduler import TaskScheduler
+
+FIELDS = ("описание", "низкий", "новая задача")
+
+
+def _ids(output):
+    return [int(line.split("\t")[0]) for line in output.splitlines()]
+
+
+def test_list_pages_include_occurrences(db_file, capsys, monkeypatch):
+    monkeypatch.setattr(cli, "PAGE_SIZE", 3)
+    start = date.today()
+    scheduler = TaskScheduler(db_file)
+    try:
+        for day in range(5):
+            scheduler.add_task(f"задача {day}", *FIELDS,
+                               start + timedelta(days=day), "")
+        scheduler.add_recurring_task("повтор", *FIELDS, start, "", "daily",
+                                     until=start + timedelta(days=3))
+    finally:
+        scheduler.close()
+
+    assert cli.main(["--db", db_file, "list"]) == 0
+    ids = _ids(capsys.readouterr().out)
+    assert len(ids) == len(set(ids)) == 9  # 6 задач и 3 вхождения
+    assert sum(record_id < 0 for record_id in ids) == 3
+
+    assert cli.main(["--db", db_file, "list", "-n", "4"]) == 0
+    assert _ids(capsys.readouterr().out) == ids[:4]
+
+
+def test_delete_reports_deleted_count(db_file, capsys):
+    scheduler = TaskScheduler(db_file)
+    try:
+        for name in ("первая", "вторая"):
+            scheduler.add_task(name, *FIELDS, "2025-01-01", "")
+    finally:
+        scheduler.close()
+
+    assert cli.main(["--db", db_file, "delete", "1", "7", "1"]) == 1
+    assert capsys.readouterr().err == ("Удалено задач: 1\n"
+                                       "Не найдено задач: 1\n")
+    assert cli.main(["--db", db_file, "delete", "2"]) == 0
+    assert capsys.readouterr().err == "Удалено задач: 1\n"
+
+
+def test_delete_occurrence(db_file, capsys):
+    scheduler = TaskScheduler(db_file)
+    try:
+        scheduler.add_recurring_task("повтор", *FIELDS, date.today(), "",
+                                     "daily", until=date.today()
+                                     + timedelta(days=2))
+        occurrence = scheduler.get_tasks_by_params(order_by="deadline")[1]
+    finally:
+        scheduler.close()
+
+    assert cli.main(["--db", db_file, "delete", str(occurrence.id)]) == 0
+    assert capsys.readouterr().err == "Удалено задач: 1\n"
+    assert cli.main(["--db", db_file, "list"]) == 0
+    assert occurrence.id not in _ids(capsys.readouterr().out)
+
+
+def test_sort_columns_match_db():
+    assert tuple(cli.SORT_COLUMNS) == db.SORT_COLUMNS
+
+
+def test_repeat_requires_deadline(db_file, capsys):
+    with pytest.raises(SystemExit) as error:
+        cli.main(["--db", db_file, "add", "повтор", "--repeat", "daily"])
+    assert error.value.code == 2
+    assert "--deadline" in capsys.readouterr().err
+
+    assert cli.main(["--db", db_file, "add", "повтор", "--repeat", "daily",
+                     "--deadline", "2025-01-01"]) == 0
+    assert capsys.readouterr().out == "1\n"
+
+
+def test_stats_lists_statuses_in_order(db_file, capsys):
+    scheduler = TaskScheduler(db_file)
+    try:
+        for status in ("решено", "новая задача", "в работе", "решено"):
+            scheduler.add_task("задача", "", "низкий", status, None, "")
+    finally:
+        scheduler.close()
+
+    assert cli.main(["--db", db_file, "stats"]) == 0
+    assert capsys.readouterr().out.splitlines()[:4] == [
+        "Всего\t4", "новая задача\t1", "в работе\t1", "решено\t2"]
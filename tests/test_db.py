@@ -0,0 +1,160 @@
+import multiprocessing
+import sqlite3
+
+import pytest
+
+from db import MIGRATIONS, SORT_COLUMNS, DB_Connector, build_select
+
+
+def test_build_select_filters_and_order():
+    sql, values = build_select({"status": "в работе",
+                                "deadline__lt": "2025-01-01",
+                                "priority__in": ["низкий", "высокий"],
+                                "order_by": "deadline", "limit": 50})
+    assert sql == ("SELECT * FROM Scheduler WHERE status = ? "
+                   "AND deadline < ? AND priority IN (?, ?) "
+                   "ORDER BY deadline ASC, id ASC LIMIT ?")
+    assert values == ["в работе", "2025-01-01", "низкий", "высокий", 50]
+
+
+def test_build_select_keyset_after():
+    sql, values = build_select({"order_by": "deadline",
+                                "after": ("2025-01-01", 7)})
+    assert "(deadline, id) > (?, ?)" in sql
+    assert values == ["2025-01-01", 7]
+
+    sql, values = build_select({"order_by": "deadline", "descending": True,
+                                "after": ("2025-01-01", 7)})
+    assert "((deadline, id) < (?, ?) OR deadline IS NULL)" in sql
+    assert "ORDER BY deadline DESC, id DESC" in sql
+
+
+def test_build_select_keyset_after_null():
+    # NULL идут первыми: после них - остальные NULL с большим id и все
+    # записи со значением
+    sql, values = build_select({"order_by": "deadline",
+                                "after": (None, 7)})
+    assert ("WHERE ((deadline IS NULL AND id > ?) OR deadline IS NOT NULL)"
+            in sql)
+    assert values == [7]
+
+
+def test_build_select_after_without_order_uses_id():
+    sql, values = build_select({"after": (3,), "limit": 2})
+    assert sql == ("SELECT * FROM Scheduler WHERE id > ? "
+                   "ORDER BY id ASC LIMIT ?")
+    assert values == [3, 2]
+
+
+def test_build_select_other_table():
+    sql, _ = build_select({}, table="Scheduler_archive")
+    assert sql == "SELECT * FROM Scheduler_archive"
+
+
+@pytest.mark.parametrize("params", [{"name": "x"}, {"status__like": "x"},
+                                    {"order_by": "id; DROP TABLE x"}])
+def test_build_select_rejects_unknown_names(params):
+    with pytest.raises(ValueError):
+        build_select(params)
+
+
+def _tables(connection):
+    return {row[0] for row in connection.execute(
+        "SELECT name FROM sqlite_master WHERE type IN ('table', 'trigger')")}
+
+
+def test_fresh_database_gets_all_migrations(db_file):
+    DB_Connector(db_file).close_connection()
+    connection = sqlite3.connect(db_file)
+    assert connection.execute(
+        "PRAGMA user_version").fetchone()[0] == len(MIGRATIONS)
+    assert {"Scheduler", "Scheduler_fts", "Scheduler_changes",
+            "Scheduler_summary",
+            "Scheduler_archive"} <= _tables(connection)
+
+
+@pytest.mark.parametrize("table", ["Scheduler", "Scheduler_archive"])
+@pytest.mark.parametrize("column", SORT_COLUMNS)
+def test_sort_pages_use_index(db_file, table, column):
+    connector = DB_Connector(db_file)
+    try:
+        for descending in (False, True):
+            for after in (None, ("значение", 10)):
+                sql, values = build_select(
+                    {"order_by": column, "descending": descending,
+                     "after": after, "limit": 200}, table)
+                plan = connector.connection.execute(
+                    "EXPLAIN QUERY PLAN " + sql, values).fetchall()
+                assert plan
+                assert not any("TEMP B-TREE" in row[-1] for row in plan)
+    finally:
+        connector.close_connection()
+
+
+def _old_database(db_file, rows):
+    """Создает базу без миграций, как до появления user_version."""
+    connection = sqlite3.connect(db_file)
+    connection.execute("""CREATE TABLE Scheduler (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        task_name TEXT NOT NULL, description TEXT, priority TEXT,
+        status TEXT, deadline TEXT, comment TEXT,
+        created TIMESTAMP DEFAULT CURRENT_TIMESTAMP)""")
+    connection.executemany(
+        "INSERT INTO Scheduler (task_name, description, priority, status, "
+        "deadline, comment) VALUES (?, ?, ?, ?, ?, ?)",
+        [(f"задача {i}", "описание", ["низкий", "высокий"][i % 2],
+          ["новая задача", "решено"][i % 3 == 0],
+          None if i % 5 == 0 else f"2025-01-{i % 28 + 1:02}", "")
+         for i in range(rows)])
+    connection.commit()
+    connection.close()
+
+
+def test_upgrade_backfills_summary(db_file):
+    _old_database(db_file, 500)
+    connector = DB_Connector(db_file)
+    summary = sorted(connector.get_summary())
+    connector.close_connection()
+    connection = sqlite3.connect(db_file)
+    expected = sorted(connection.execute(
+        "SELECT IFNULL(status, ''), IFNULL(priority, ''), "
+        "IFNULL(deadline, ''), COUNT(*) FROM Scheduler GROUP BY 1, 2, 3"))
+    assert summary == expected
+
+
+def _open(db_file, barrier):
+    barrier.wait()
+    DB_Connector(db_file).close_connection()
+
+
+def _before_summary(db_file, rows):
+    """Создает базу, в которой еще не применена миграция счетчиков (6)."""
+    _old_database(db_file, rows)
+    DB_Connector(db_file).close_connection()
+    connection = sqlite3.connect(db_file)
+    connection.executescript("""
+        DROP TABLE Scheduler_summary;
+        DROP TRIGGER Scheduler_summary_insert;
+        DROP TRIGGER Scheduler_summary_delete;
+        DROP TRIGGER Scheduler_summary_update;
+        PRAGMA user_version = 5;
+    """)
+    connection.close()
+
+
+@pytest.mark.parametrize("trial", range(10))
+def test_concurrent_upgrade(tmp_path, trial):
+    db_file = str(tmp_path / "scheduler.db")
+    _before_summary(db_file, 5000)
+    context = multiprocessing.get_context("fork")
+    barrier = context.Barrier(8)
+    processes = [context.Process(target=_open, args=(db_file, barrier))
+                 for _ in range(8)]
+    for process in processes:
+        process.start()
+    for process in processes:
+        process.join(60)
+    assert [process.exitcode for process in processes] == [0] * 8
+    connection = sqlite3.connect(db_file)
+    assert connection.execute(
+        "SELECT SUM(count) FROM Scheduler_summary").fetchone()[0] == 5000
@@ -0,0 +1,88 @@
+from datetime import date, datetime
+
+from deadlines import DeadlineWatcher
+from task import Priority, Status, Task
+from task_scheduler import ChangeSet
+
+
+class FakeScheduler:
+    """Источник задач и оповещений для DeadlineWatcher без базы."""
+
+    def __init__(self, tasks):
+        self.tasks = tasks
+        self.listeners = []
+
+    def add_listener(self, listener):
+        self.listeners.append(listener)
+
+    def remove_listener(self, listener):
+        self.listeners.remove(listener)
+
+    def iter_tasks(self, **params):
+        return iter(self.tasks)
+
+    def change(self, *tasks):
+        for listener in self.listeners:
+            listener(ChangeSet(0, list(tasks), []))
+
+
+def _task(record_id, status=Status.NEW, deadline=date(2025, 3, 1)):
+    return Task(record_id, f"задача {record_id}", "", Priority.LOW, status,
+                deadline, "", None)
+
+
+def _watcher(tasks, now):
+    events = []
+    scheduler = FakeScheduler(tasks)
+    watcher = DeadlineWatcher(
+        scheduler, on_due=lambda task: events.append(("due", task.id)),
+        on_overdue=lambda task: events.append(("overdue", task.id)),
+        clock=lambda: now[0])
+    watcher.start()
+    return scheduler, watcher, events
+
+
+def test_reopened_task_fires_again():
+    now = [datetime(2025, 3, 1, 9)]
+    scheduler, watcher, events = _watcher([_task(1)], now)
+    watcher.poll()
+    assert events == [("due", 1)]
+
+    scheduler.change(_task(1, Status.DONE))
+    assert watcher._fired == {}
+    scheduler.change(_task(1))
+    watcher.poll()
+    assert events == [("due", 1), ("due", 1)]
+
+
+def test_changed_deadline_fires_again():
+    now = [datetime(2025, 3, 1, 9)]
+    scheduler, watcher, events = _watcher([_task(1)], now)
+    watcher.poll()
+    scheduler.change(_task(1, deadline=date(2025, 3, 2)))
+    now[0] = datetime(2025, 3, 2, 9)
+    watcher.poll()
+    assert events == [("due", 1), ("due", 1)]
+
+    scheduler.change(_task(1, deadline=None))
+    assert watcher._fired == {}
+
+
+def test_fired_does_not_grow_with_closed_tasks():
+    now = [datetime(2025, 3, 5, 9)]
+    tasks = [_task(record_id) for record_id in range(1, 101)]
+    scheduler, watcher, events = _watcher(tasks, now)
+    watcher.poll()
+    assert len(events) == 100  # Все задачи просрочены
+    scheduler.change(*(task._replace(status=Status.DONE) for task in tasks))
+    assert watcher._fired == {}
+    assert watcher.overdue() == []
+
+
+def test_unchanged_deadline_does_not_fire_twice():
+    now = [datetime(2025, 3, 1, 9)]
+    scheduler, watcher, events = _watcher([_task(1)], now)
+    watcher.poll()
+    scheduler.change(_task(1, Status.IN_PROGRESS))
+    watcher.poll()
+    assert events == [("due", 1)]
@@ -0,0 +1,70 @@
+from datetime import date, timedelta
+
+import pytest
+from PyQt6.QtWidgets import QApplication
+
+from task_scheduler import TaskScheduler
+from taskmanager import MainWindow
+
+DEADLINE = (date.today() + timedelta(days=7)).isoformat()
+
+
+@pytest.fixture
+def window(tmp_path, monkeypatch):
+    # Окно открывает scheduler.db в текущем каталоге
+    monkeypatch.chdir(tmp_path)
+    app = QApplication.instance() or QApplication([])  # noqa: F841
+    window = MainWindow(archive=False)
+    yield window
+    window.close()
+
+
+def _fill(window, name):
+    window.new_task()
+    window.task_name_input.setText(name)
+    window.description_input.setText("описание")
+    window.deadline_input.setText(DEADLINE)
+
+
+def _save(window):
+    window.save_task()
+    window.runner.wait()
+    QApplication.processEvents()
+
+
+def _names(window):
+    scheduler = TaskScheduler("scheduler.db")
+    try:
+        return [(task.id, task.task_name) for task in
+                scheduler.get_tasks_by_params(order_by="id")]
+    finally:
+        scheduler.close()
+
+
+def test_new_task_after_delete_does_not_overwrite_selected(window):
+    for name in ["A", "B"]:
+        _fill(window, name)
+        _save(window)
+    window.table.selectRow(0)
+    window.delete_task()
+    window.runner.wait()
+    QApplication.processEvents()
+    assert window.table.currentIndex().row() >= 0
+
+    _fill(window, "C")
+    _save(window)
+    assert _names(window) == [(2, "B"), (3, "C")]
+
+
+def test_new_task_after_edit_is_inserted(window):
+    _fill(window, "A")
+    _save(window)
+    window.table.selectRow(0)
+    window.edit_task()
+    window.task_name_input.setText("A2")
+    _save(window)
+    assert _names(window) == [(1, "A2")]
+
+    _fill(window, "B")
+    _save(window)
+    assert _names(window) == [(1, "A2"), (2, "B")]
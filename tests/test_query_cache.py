@@ -0,0 +1,86 @@
+import sqlite3
+
+import query_cache
+from query_cache import QueryCache, freeze
+from task_scheduler import TaskScheduler
+
+FIELDS = ("описание", "низкий", "новая задача", "2025-01-01", "")
+
+
+def test_lru_evicts_least_recently_used():
+    cache = QueryCache(maxsize=2)
+    cache.put("a", 1)
+    cache.put("b", 2)
+    assert cache.get("a") == (True, 1)  # "b" теперь самый старый
+    cache.put("c", 3)
+    assert cache.get("b") == (False, None)
+    assert cache.get("a") == (True, 1)
+    assert cache.get("c") == (True, 3)
+
+
+def test_entries_expire_after_ttl(monkeypatch):
+    now = [100.0]
+    monkeypatch.setattr(query_cache.time, "monotonic", lambda: now[0])
+    cache = QueryCache(ttl=10)
+    cache.put("a", 1)
+    now[0] += 9.9
+    assert cache.get("a") == (True, 1)
+    now[0] += 0.1
+    assert cache.get("a") == (False, None)
+    assert cache.stats()["size"] == 0
+
+
+def test_put_after_clear_is_dropped():
+    cache = QueryCache()
+    generation = cache.generation
+    cache.clear()  # Данные изменились, пока выполнялся запрос
+    cache.put("a", "старый результат", generation)
+    assert cache.get("a") == (False, None)
+    cache.put("a", "новый результат", cache.generation)
+    assert cache.get("a") == (True, "новый результат")
+
+
+def test_zero_size_disables_cache():
+    cache = QueryCache(maxsize=0)
+    cache.put("a", 1)
+    assert cache.get("a") == (False, None)
+
+
+def test_stats():
+    cache = QueryCache(maxsize=4)
+    cache.clear()  # Пустой кэш: сбрасывать нечего
+    cache.put("a", 1)
+    cache.get("a")
+    cache.get("b")
+    cache.clear()
+    assert cache.stats() == {"hits": 1, "misses": 1, "hit_rate": 0.5,
+                             "size": 0, "maxsize": 4, "invalidations": 1}
+
+
+def test_freeze_makes_hashable_keys():
+    key = freeze({"status__in": ["новая задача", "в работе"],
+                  "after": ("2025-01-01", 7), "limit": 50})
+    assert hash(key) == hash(freeze({"limit": 50,
+                                     "after": ["2025-01-01", 7],
+                                     "status__in": ("новая задача",
+                                                    "в работе")}))
+
+
+def test_scheduler_cache_sees_own_and_external_writes(db_file):
+    scheduler = TaskScheduler(db_file)
+    try:
+        scheduler.add_task("первая", *FIELDS)
+        assert len(scheduler.get_tasks_by_params(status="новая задача")) == 1
+        assert len(scheduler.get_tasks_by_params(status="новая задача")) == 1
+        assert scheduler.cache_stats()["hits"] == 1
+
+        scheduler.add_task("вторая", *FIELDS)
+        assert len(scheduler.get_tasks_by_params(status="новая задача")) == 2
+
+        # Изменение из другого соединения замечается по data_version
+        with sqlite3.connect(db_file) as connection:
+            connection.execute("DELETE FROM Scheduler WHERE id = 1")
+        connection.close()
+        assert len(scheduler.get_tasks_by_params(status="новая задача")) == 1
+    finally:
+        scheduler.close()
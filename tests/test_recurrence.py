@@ -0,0 +1,189 @@
+from datetime import date
+
+import pytest
+
+from recurrence import (DAILY, MONTHLY, WEEKLY, Recurrence, Series, expand,
+                        find_occurrence, is_occurrence, occurrence_dates,
+                        occurrence_id, split_occurrence_id)
+from task import Priority, Status, Task
+from task_scheduler import TaskScheduler
+
+START = date(2025, 1, 31)
+HORIZON = date(2025, 12, 31)
+
+
+def _series(frequency, interval=1, until=None, skipped=(), start=START):
+    template = Task(7, "отчет", "", Priority.LOW, Status.IN_PROGRESS, start,
+                    "", None)
+    return Series(Recurrence(7, frequency, interval, until), template,
+                  set(skipped))
+
+
+def _dates(frequency, interval, first, last, until=None):
+    rule = Recurrence(7, frequency, interval, until)
+    return list(occurrence_dates(rule, START, first, last))
+
+
+def test_monthly_keeps_day_of_month():
+    assert _dates(MONTHLY, 1, START, date(2025, 5, 31)) == [
+        date(2025, 2, 28), date(2025, 3, 31), date(2025, 4, 30),
+        date(2025, 5, 31)]
+    # Окно с середины года и интервал в два месяца
+    assert _dates(MONTHLY, 2, date(2025, 6, 1), date(2025, 12, 31)) == [
+        date(2025, 7, 31), date(2025, 9, 30), date(2025, 11, 30)]
+    assert _dates(MONTHLY, 12, START, date(2028, 3, 1)) == [
+        date(2026, 1, 31), date(2027, 1, 31), date(2028, 1, 31)]
+
+
+def test_weekly_and_daily():
+    assert _dates(WEEKLY, 2, date(2025, 2, 20), date(2025, 3, 31)) == [
+        date(2025, 2, 28), date(2025, 3, 14), date(2025, 3, 28)]
+    assert _dates(DAILY, 1, date(2025, 1, 1), date(2025, 2, 2)) == [
+        date(2025, 2, 1), date(2025, 2, 2)]
+    assert _dates(DAILY, 3, START, HORIZON,
+                  until=date(2025, 2, 9)) == [date(2025, 2, 3),
+                                              date(2025, 2, 6),
+                                              date(2025, 2, 9)]
+
+
+@pytest.mark.parametrize("day", [date(1, 1, 1), date(2025, 2, 28),
+                                 date(9999, 12, 31)])
+def test_occurrence_id_round_trip(day):
+    record_id = occurrence_id(123456, day)
+    assert is_occurrence(record_id)
+    assert split_occurrence_id(record_id) == (123456, day)
+    assert not is_occurrence(123456)
+
+
+def test_expand_skips_changed_occurrences():
+    series = _series(WEEKLY, skipped=[date(2025, 2, 14)])
+    page = expand([], [series], {"order_by": "deadline",
+                                 "deadline__le": "2025-02-28"}, HORIZON)
+    assert [task.deadline for task in page] == [
+        date(2025, 2, 7), date(2025, 2, 21), date(2025, 2, 28)]
+    assert all(task.status is Status.NEW for task in page)
+    assert find_occurrence([series], page[0].id) == page[0]
+    skipped = occurrence_id(7, date(2025, 2, 14))
+    assert find_occurrence([series], skipped) is None
+    not_in_series = occurrence_id(7, date(2025, 2, 15))
+    assert find_occurrence([series], not_in_series) is None
+
+
+def test_expand_pages_by_deadline():
+    series = _series(DAILY, until=date(2025, 2, 10))
+    task = series.template._replace(id=1, deadline=date(2025, 2, 5))
+    seen = []
+    after = None
+    for _ in range(10):
+        params = {"order_by": "deadline", "after": after, "limit": 4}
+        rows = [task] if after is None or (
+            ("2025-02-05", 1) > after) else []
+        page = expand(rows, [series], params, HORIZON)
+        seen.extend(page)
+        if len(page) < 4:
+            break
+        after = (page[-1].deadline.isoformat(), page[-1].id)
+    assert [row.deadline.day for row in seen] == [
+        1, 2, 3, 4, 5, 5, 6, 7, 8, 9, 10]
+    assert len({row.id for row in seen}) == len(seen)
+
+
+def test_expand_applies_filters_and_horizon():
+    series = _series(DAILY)
+    assert expand([], [series], {"status": "в работе"}, HORIZON) == []
+    page = expand([], [series], {"status": "новая задача",
+                                 "deadline__gt": "2025-12-29"}, HORIZON)
+    assert [task.deadline for task in page] == [
+        date(2025, 12, 30), date(2025, 12, 31)]
+
+
+def test_scheduler_materializes_changed_occurrence(db_file):
+    scheduler = TaskScheduler(db_file)
+    try:
+        series_id = scheduler.add_recurring_task(
+            "отчет", "", "низкий", "новая задача", date(2025, 1, 31), "",
+            MONTHLY, until=date(2025, 4, 30))
+        tasks = scheduler.get_tasks_by_params(order_by="deadline")
+        assert [task.deadline for task in tasks] == [
+            date(2025, 1, 31), date(2025, 2, 28), date(2025, 3, 31),
+            date(2025, 4, 30)]
+        march = tasks[2]
+        assert split_occurrence_id(march.id) == (series_id,
+                                                 date(2025, 3, 31))
+
+        saved = scheduler.update_task(march.id, "отчет за март", "",
+                                      "высокий", "в работе",
+                                      date(2025, 4, 2), "")
+        assert not is_occurrence(saved.id)
+        scheduler.delete_task(tasks[3].id)
+        names = [(task.task_name, task.deadline) for task in
+                 scheduler.get_tasks_by_params(order_by="deadline")]
+        assert names == [("отчет", date(2025, 1, 31)),
+                         ("отчет", date(2025, 2, 28)),
+                         ("отчет за март", date(2025, 4, 2))]
+    finally:
+        scheduler.close()
+
+
+def test_materialized_occurrence_is_logged_with_its_id(db_file):
+    scheduler = TaskScheduler(db_file)
+    try:
+        series_id = scheduler.add_recurring_task(
+            "отчет", "", "низкий", "новая задача", date(2025, 1, 31), "",
+            MONTHLY, until=date(2025, 4, 30))
+        version = scheduler.get_change_version()
+        changed = occurrence_id(series_id, date(2025, 2, 28))
+        saved = scheduler.update_task(changed, "отчет за февраль", "",
+                                      "низкий", "в работе",
+                                      date(2025, 2, 28), "")
+        changes = scheduler.get_changes_since(version)
+        assert changes.deleted == [changed]
+        assert [task.id for task in changes.tasks] == [saved.id]
+
+        version = changes.version
+        deleted = occurrence_id(series_id, date(2025, 3, 31))
+        scheduler.delete_task(deleted)
+        assert scheduler.get_changes_since(version).deleted == [deleted]
+    finally:
+        scheduler.close()
+
+
+def test_update_tasks_materializes_occurrences(db_file):
+    scheduler = TaskScheduler(db_file)
+    try:
+        series_id = scheduler.add_recurring_task(
+            "отчет", "", "низкий", "новая задача", date(2025, 1, 31), "",
+            MONTHLY, until=date(2025, 3, 31))
+        task_id = scheduler.add_task("звонок", "", "низкий", "новая задача",
+                                     date(2025, 2, 1), "")
+        fields = ("новое", "", "высокий", "в работе", date(2025, 2, 28), "")
+        count = scheduler.update_tasks([
+            (occurrence_id(series_id, date(2025, 2, 28)),) + fields,
+            (task_id,) + fields,
+            (999,) + fields])
+        assert count == 2
+        tasks = scheduler.get_tasks_by_params(order_by="deadline")
+        assert [(is_occurrence(task.id), task.task_name, task.deadline)
+                for task in tasks] == [
+            (False, "отчет", date(2025, 1, 31)),
+            (False, "новое", date(2025, 2, 28)),
+            (False, "новое", date(2025, 2, 28)),
+            (True, "отчет", date(2025, 3, 31))]
+    finally:
+        scheduler.close()
+
+
+def test_recurrence_needs_deadline(db_file):
+    scheduler = TaskScheduler(db_file)
+    try:
+        task_id = scheduler.add_task("отчет", "", "низкий", "новая задача",
+                                     None, "")
+        with pytest.raises(ValueError):
+            scheduler.set_recurrence(task_id, MONTHLY)
+        with pytest.raises(ValueError):
+            scheduler.add_recurring_task("отчет", "", "низкий",
+                                         "новая задача", None, "", DAILY)
+        assert [task.id for task in scheduler.get_all_tasks()] == [task_id]
+        assert scheduler.set_recurrence(99, MONTHLY) is False
+    finally:
+        scheduler.close()
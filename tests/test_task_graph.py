@@ -0,0 +1,144 @@
+import threading
+import time
+from datetime import date
+
+import pytest
+
+from task import Priority, Status, Task
+from task_graph import CycleError, DependencyGraph
+from task_scheduler import ChangeSet, TaskScheduler
+
+FIELDS = ("описание", "низкий", "новая задача", "2025-01-01", "")
+
+
+def _task(record_id, status=Status.NEW, deadline=None):
+    return Task(record_id, f"задача {record_id}", "", Priority.LOW, status,
+                deadline, "", None)
+
+
+def _graph(edges, tasks=None):
+    """Граф по ребрам (блокирующая, зависящая) с незавершенными задачами."""
+    nodes = {node for edge in edges for node in edge}
+    graph = DependencyGraph()
+    graph.load([(task, blocker) for blocker, task in edges],
+               tasks or [_task(node) for node in nodes])
+    return graph
+
+
+def _before(order, first, second):
+    return order.index(first) < order.index(second)
+
+
+def test_order_respects_edges():
+    edges = [(1, 2), (2, 3), (1, 4), (4, 3), (5, 1)]
+    graph = _graph(edges)
+    order = graph.order()
+    assert all(_before(order, blocker, task) for blocker, task in edges)
+
+    # Ребро против текущего порядка переставляет участок между концами
+    graph.add_edge(6, 7)
+    graph.add_edge(7, 5)
+    edges += [(6, 7), (7, 5)]
+    if _before(order, 2, 4):
+        graph.add_edge(4, 2)
+        edges.append((4, 2))
+    else:
+        graph.add_edge(2, 4)
+        edges.append((2, 4))
+    with pytest.raises(CycleError):
+        graph.add_edge(3, 6)
+    order = graph.order()
+    assert all(_before(order, blocker, task) for blocker, task in edges)
+
+
+def test_cycle_is_detected_and_graph_unchanged():
+    graph = _graph([(1, 2), (2, 3)])
+    assert graph.find_cycle(3, 1) == [1, 2, 3, 1]
+    with pytest.raises(CycleError) as error:
+        graph.add_edge(3, 1)
+    assert error.value.cycle == [1, 2, 3, 1]
+    assert graph.dependents(3) == set()
+    assert graph.find_cycle(1, 1) == [1, 1]
+    assert graph.find_cycle(1, 7) is None  # Задачи 7 нет в графе
+
+
+def test_load_rejects_cycle_edges():
+    graph = _graph([(1, 2), (2, 3), (3, 1)])
+    assert len(graph.rejected) == 1
+    order = graph.order()
+    assert sorted(order) == [1, 2, 3]
+    assert sum(len(graph.dependents(node)) for node in order) == 2
+
+
+def test_blocked_follows_status_changes():
+    graph = _graph([(1, 3), (2, 3)])
+    assert graph.blocked() == {3}
+    graph.apply_changes(ChangeSet(0, [_task(1, Status.DONE)], []))
+    assert graph.is_blocked(3)
+    graph.apply_changes(ChangeSet(0, [_task(2, Status.CANCELLED)], []))
+    assert not graph.is_blocked(3)
+    graph.apply_changes(ChangeSet(0, [_task(2)], []))
+    assert graph.is_blocked(3)
+    graph.apply_changes(ChangeSet(0, [], [2]))
+    assert graph.blocked() == set()
+    assert graph.order() == [1, 3]
+
+
+def test_critical_path():
+    today = date(2025, 1, 1)
+    tasks = [_task(1), _task(2), _task(3, deadline=date(2025, 1, 3)),
+             _task(4, deadline=date(2025, 1, 10)), _task(5, Status.DONE)]
+    graph = _graph([(1, 2), (2, 3), (5, 3), (1, 4)], tasks)
+    path = graph.critical_path(today)
+    # Три дня работы по цепочке 1 -> 2 -> 3 при дедлайне через два дня
+    assert path.task_ids == [1, 2, 3]
+    assert path.slack == -1
+    assert _graph([(1, 2)]).critical_path(today) is None
+
+
+def test_dependencies_survive_reload(db_file):
+    scheduler = TaskScheduler(db_file)
+    try:
+        first = scheduler.add_task("первая", *FIELDS)
+        second = scheduler.add_task("вторая", *FIELDS)
+        assert scheduler.add_dependency(second, first)
+        assert not scheduler.add_dependency(second, first)
+        with pytest.raises(CycleError):
+            scheduler.add_dependency(first, second)
+        scheduler.reload_dependencies()
+        assert scheduler.get_blockers(second) == {first}
+        assert scheduler.remove_dependency(second, first)
+        scheduler.reload_dependencies()
+        assert not scheduler.is_blocked(second)
+    finally:
+        scheduler.close()
+
+
+def test_add_dependency_does_not_deadlock_with_batch(db_file):
+    scheduler = TaskScheduler(db_file)
+    first = scheduler.add_task("первая", *FIELDS)
+    second = scheduler.add_task("вторая", *FIELDS)
+    scheduler.dependency_graph()
+    in_batch = threading.Event()
+
+    def write_in_batch():
+        # Поток держит соединение для записи и затем обращается к графу
+        with scheduler.batch():
+            scheduler.update_task(first, "первая", *FIELDS)
+            in_batch.set()
+            time.sleep(0.2)
+            scheduler.is_blocked(second)
+
+    def add_dependency():
+        in_batch.wait()
+        scheduler.add_dependency(second, first)
+
+    threads = [threading.Thread(target=write_in_batch, daemon=True),
+               threading.Thread(target=add_dependency, daemon=True)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join(10)
+    assert not any(thread.is_alive() for thread in threads)
+    assert scheduler.get_blockers(second) == {first}
+    scheduler.close()
@@ -0,0 +1,102 @@
+import io
+import sqlite3
+
+import pytest
+
+from task_io import read_records
+from task_scheduler import TaskScheduler
+
+TASKS = [
+    ("с дедлайном", "описание", "низкий", "новая задача", "2025-03-01",
+     "комментарий"),
+    ("без дедлайна", "", "высокий", "в работе", None, ""),
+    ("без описания", None, "средний", "решено", "2025-01-15", None),
+    ("тот же дедлайн", "а, \"б\"\nв", "низкий", "новая задача",
+     "2025-03-01", ""),
+]
+
+
+def _rows(db_file):
+    with sqlite3.connect(db_file) as connection:
+        rows = connection.execute(
+            "SELECT task_name, description, priority, status, deadline, "
+            "comment, created FROM Scheduler ORDER BY id").fetchall()
+    connection.close()
+    return rows
+
+
+@pytest.mark.parametrize("fmt", ["csv", "jsonl"])
+def test_round_trip(tmp_path, fmt):
+    source = TaskScheduler(str(tmp_path / "source.db"))
+    target = TaskScheduler(str(tmp_path / "target.db"))
+    try:
+        source.add_tasks(TASKS)
+        path = str(tmp_path / f"tasks.{fmt}")
+        assert source.export_tasks(path) == len(TASKS)
+        assert target.import_tasks(path) == len(TASKS)
+    finally:
+        source.close()
+        target.close()
+    expected = [row[:6] for row in _rows(str(tmp_path / "source.db"))]
+    # Пустые строки и NULL в файле неразличимы и загружаются как NULL
+    expected = [tuple(value or None for value in row) for row in expected]
+    rows = _rows(str(tmp_path / "target.db"))
+    assert [row[:6] for row in rows] == expected
+    assert [row[6] for row in rows] == [
+        row[6] for row in _rows(str(tmp_path / "source.db"))]
+
+
+def test_paging_after_import(db_file):
+    data = io.StringIO("task_name,deadline\n" + "".join(
+        f"задача {i},{'' if i % 3 else '2025-01-01'}\n" for i in range(10)))
+    scheduler = TaskScheduler(db_file)
+    try:
+        scheduler.import_tasks(data, "csv")
+        seen = []
+        after = None
+        for _ in range(10):
+            page = scheduler.get_tasks_by_params(order_by="deadline",
+                                                 after=after, limit=3)
+            seen.extend(task.id for task in page)
+            if len(page) < 3:
+                break
+            after = (page[-1].deadline, page[-1].id)
+        assert sorted(seen) == list(range(1, 11))
+    finally:
+        scheduler.close()
+
+
+def test_dates_are_normalized():
+    records = list(read_records(io.StringIO(
+        "task_name,deadline,created\n"
+        "задача,20261018,2025-01-01T10:00:00\n"), "csv"))
+    assert records[0][4] == "2026-10-18"
+    assert records[0][6] == "2025-01-01 10:00:00"
+
+
+@pytest.mark.parametrize("text, message", [
+    ("task_name,deadline\nзадача,2025-01-01\nзадача,завтра\n",
+     "Строка 3: некорректное значение deadline"),
+    ("task_name,created\nзадача,вчера\n",
+     "Строка 2: некорректное значение created"),
+    ("task_name,deadline\n,2025-01-01\n", "Строка 2: не указано имя"),
+])
+def test_bad_rows_are_rejected(text, message):
+    with pytest.raises(ValueError, match=message):
+        list(read_records(io.StringIO(text), "csv"))
+
+
+def test_bad_jsonl_row_rolls_back_import(db_file):
+    data = io.StringIO('{"task_name": "первая", "deadline": "2025-01-01"}\n'
+                       '\n'
+                       '{"task_name": "вторая", "deadline": 20250101}\n')
+    scheduler = TaskScheduler(db_file)
+    try:
+        with pytest.raises(ValueError, match="Строка 3"):
+            scheduler.import_tasks(data, "jsonl")
+        assert scheduler.get_all_tasks() == []
+        scheduler.add_task("после ошибки", "", "низкий", "новая задача",
+                           "2025-01-01", "")
+        assert scheduler.search_tasks("ошибки") == [1]
+    finally:
+        scheduler.close()
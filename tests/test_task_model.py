@@ -0,0 +1,122 @@
+import sqlite3
+
+import pytest
+from PyQt6.QtCore import QCoreApplication, QModelIndex, Qt
+
+from task import Task
+from task_model import TaskTableModel, _narrow, search_words
+from task_scheduler import TaskScheduler
+
+# Дедлайны, которые могли попасть в базу мимо приложения
+DEADLINES = [None, "", "2025-03-01", "завтра", "20261018", "2025-03-01",
+             None, "2025-01-15", "", "01.02.2025"]
+
+
+@pytest.fixture
+def scheduler(db_file):
+    scheduler = TaskScheduler(db_file)
+    scheduler.close()
+    with sqlite3.connect(db_file) as connection:
+        connection.executemany(
+            "INSERT INTO Scheduler (task_name, description, priority, "
+            "status, deadline, comment) VALUES (?, '', 'низкий', "
+            "'новая задача', ?, '')",
+            [(f"задача {i}", deadline) for i, deadline in
+             enumerate(DEADLINES)])
+    connection.close()
+    scheduler = TaskScheduler(db_file)
+    yield scheduler
+    scheduler.close()
+
+
+def test_from_row_keeps_stored_deadline():
+    row = (1, "задача", "", "низкий", "новая задача", "20261018", "",
+           "2025-01-01 10:00:00")
+    task = Task.from_row(None, row)
+    assert task.deadline == "20261018"
+    assert task.created.year == 2025
+    assert Task.from_row(None, row[:5] + ("2026-10-18",) + row[6:]
+                         ).deadline.day == 18
+
+
+@pytest.mark.parametrize("descending", [False, True])
+def test_keyset_pages_over_bad_deadlines(scheduler, descending):
+    seen = []
+    after = None
+    # Страниц не больше, чем строк: зацикливание на одном ключе - ошибка
+    for _ in DEADLINES:
+        page = scheduler.get_tasks_by_params(
+            order_by="deadline", descending=descending, after=after,
+            limit=3)
+        seen.extend(task.id for task in page)
+        if len(page) < 3:
+            break
+        after = (page[-1].deadline, page[-1].id)
+    assert sorted(seen) == list(range(1, len(DEADLINES) + 1))
+
+
+def test_model_fetches_all_rows(scheduler):
+    app = QCoreApplication.instance() or QCoreApplication([])  # noqa: F841
+    model = TaskTableModel(scheduler, page_size=3)
+    for _ in DEADLINES:
+        if not model.canFetchMore(QModelIndex()):
+            break
+        model.fetchMore(QModelIndex())
+    ids = [int(model.index(row, 0).data())
+           for row in range(model.rowCount())]
+    assert sorted(ids) == list(range(1, len(DEADLINES) + 1))
+
+
+def test_sort_ignores_unindexed_columns(scheduler):
+    app = QCoreApplication.instance() or QCoreApplication([])  # noqa: F841
+    model = TaskTableModel(scheduler)
+    column = model.sort_order()[0]
+    model.sort(2, Qt.SortOrder.DescendingOrder)  # Описание
+    assert model.sort_order() == (column, Qt.SortOrder.AscendingOrder)
+    model.sort(4, Qt.SortOrder.DescendingOrder)  # Статус
+    assert model.sort_order() == (4, Qt.SortOrder.DescendingOrder)
+
+
+@pytest.mark.parametrize("order", [Qt.SortOrder.AscendingOrder,
+                                   Qt.SortOrder.DescendingOrder])
+def test_occurrences_sort_between_db_rows(scheduler, order):
+    app = QCoreApplication.instance() or QCoreApplication([])  # noqa: F841
+    scheduler.add_recurring_task("повтор", "", "средний", "в работе",
+                                 "2025-02-27", "", "daily",
+                                 until="2025-03-03")
+    model = TaskTableModel(scheduler, page_size=4)
+    for column in (0, 1, 3, 4, 5):
+        model.sort(column, order)
+        while model.canFetchMore(QModelIndex()):
+            model.fetchMore(QModelIndex())
+        rows = [model.task_at(row) for row in range(model.rowCount())]
+        assert len(rows) == len(DEADLINES) + 5
+        assert rows == sorted(rows, key=model._key)
+
+
+TEXTS = ["Мой отчет", "Мои заметки", "Ёлка во дворе", "Елка в лесу",
+         "Йогурт", "Иогурт", "Café на углу", "Cafe у дома", "Über alles",
+         "Uber такси", "Niño", "Nino", "ǖ тон", "snake_case"]
+
+
+@pytest.mark.parametrize("query", ["мой", "мои", "МОЙ", "ёлка", "елка",
+                                   "йог", "иог", "cafe", "café", "über",
+                                   "uber", "niño", "ǖ", "u", "case"])
+def test_narrowing_matches_full_text_search(db_file, query):
+    scheduler = TaskScheduler(db_file)
+    try:
+        scheduler.add_tasks((text, "", "низкий", "новая задача",
+                             "2025-01-01", "") for text in TEXTS)
+        words = search_words(query)
+        assert words is not None
+        narrowed = {task.id for task in _narrow(scheduler.get_all_tasks(),
+                                                words)}
+        assert narrowed == set(scheduler.search_tasks(query, 100))
+    finally:
+        scheduler.close()
+
+
+def test_search_words_rejects_separators():
+    # FTS5 ищет такое слово как фразу из нескольких токенов
+    assert search_words("snake_case") is None
+    assert search_words("отчет-2025") is None
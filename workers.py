@@ -0,0 +1,102 @@
+import logging
+from itertools import count
+
+from PyQt6.QtCore import QObject, QRunnable, QThreadPool, pyqtSignal, pyqtSlot
+
+logger = logging.getLogger(__name__)
+
+
+class Worker(QRunnable):
+    """Выполняет функцию в пуле потоков и сообщает результат через runner."""
+
+    def __init__(self, runner: "DbRunner", job_id: int, fn, args, kwargs):
+        super().__init__()
+        self.runner = runner
+        self.job_id = job_id
+        self.fn = fn
+        self.args = args
+        self.kwargs = kwargs
+        self.cancelled = False  # Отмененная задача не запускается
+
+    def run(self) -> None:
+        if self.cancelled:
+            self.runner.finished.emit(self.job_id, None)
+            return
+        try:
+            result = self.fn(*self.args, **self.kwargs)
+        except Exception as ex:
+            self.runner.failed.emit(self.job_id, ex)
+            return
+        self.runner.finished.emit(self.job_id, result)
+
+
+class DbRunner(QObject):
+    """Выполняет запросы к базе данных вне потока интерфейса.
+
+    Результат возвращается в поток интерфейса через сигналы и передается
+    в on_result (ошибка - в on_error, а без него - в журнал). Задачи с
+    одинаковым channel вытесняют друг друга: новый запрос отменяет еще не
+    начатые, а результаты уже выполняющихся отбрасываются как устаревшие.
+    """
+
+    # Сигналы отправляются из рабочих потоков, слоты выполняются в потоке
+    # интерфейса, где создан DbRunner
+    finished = pyqtSignal(int, object)
+    failed = pyqtSignal(int, object)
+
+    def __init__(self, parent=None, max_threads: int = 4) -> None:
+        super().__init__(parent)
+        self.pool = QThreadPool(self)
+        self.pool.setMaxThreadCount(max_threads)
+        self._ids = count(1)
+        self._jobs = {}         # ИД задачи -> (worker, on_result, on_error)
+        self._channels = {}     # Канал -> ИД последней задачи канала
+        self.finished.connect(self._on_finished)
+        self.failed.connect(self._on_failed)
+
+    def submit(self, fn, *args, on_result=None, on_error=None,
+               channel=None, **kwargs) -> int:
+        """Ставит fn(*args, **kwargs) в очередь и возвращает ИД задачи."""
+        if channel is not None:
+            self.cancel(channel)
+        job_id = next(self._ids)
+        worker = Worker(self, job_id, fn, args, kwargs)
+        self._jobs[job_id] = (worker, on_result, on_error)
+        if channel is not None:
+            self._channels[channel] = job_id
+        self.pool.start(worker)
+        return job_id
+
+    def cancel(self, channel) -> None:
+        """Отменяет последнюю задачу канала, ее результат не будет получен."""
+        job_id = self._channels.pop(channel, None)
+        job = self._jobs.get(job_id)
+        if job is not None:
+            job[0].cancelled = True
+            self._jobs[job_id] = (job[0], None, None)
+
+    def wait(self) -> None:
+        """Ждет завершения всех запущенных задач."""
+        self.pool.waitForDone()
+
+    def _finish(self, job_id: int):
+        """Убирает завершенную задачу и возвращает ее обработчики."""
+        _, on_result, on_error = self._jobs.pop(job_id, (None, None, None))
+        for channel, last_id in list(self._channels.items()):
+            if last_id == job_id:
+                del self._channels[channel]
+        return on_result, on_error
+
+    @pyqtSlot(int, object)
+    def _on_finished(self, job_id: int, result) -> None:
+        on_result, _ = self._finish(job_id)
+        if on_result is not None:
+            on_result(result)
+
+    @pyqtSlot(int, object)
+    def _on_failed(self, job_id: int, error) -> None:
+        _, on_error = self._finish(job_id)
+        if on_error is not None:
+            on_error(error)
+        else:
+            logger.error("Ошибка фонового запроса", exc_info=error)